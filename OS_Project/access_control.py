@@ -5,10 +5,17 @@ Student 3: Role-Based Access Control (RBAC)
 ============================================
 """
 
-from typing import Optional
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
 from file_manager import User, UserManager, FileManager, FileMetadata
 from blockchain import Blockchain
-from datetime import datetime
+from policy import ACTIONS, Policy
+from rate_limiter import RateLimiter
+from log_config import get_logger
+
+logger = get_logger(__name__)
 
 # ============================================
 # Permission Definitions
@@ -35,12 +42,126 @@ PERMISSIONS = {
     }
 }
 
+class DecisionCache:
+    """
+    Bounded LRU cache of (user, file, action) -> allowed
+    
+    Invalidation is O(1): one counter is bumped on every change and each
+    user and file remembers the value of its last change. A cached decision
+    is only used if nothing it depends on changed after it was computed.
+    
+    Change stamps are kept for at most max_entries users and files each;
+    forgetting the oldest raises a floor below which every decision counts
+    as stale, so dropping a stamp never revives an outdated decision.
+    """
+    
+    def __init__(self, max_entries: int = 10000):
+        """
+        Initialize decision cache
+        
+        Args:
+            max_entries: Decisions kept before evicting least recently used
+        """
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.generation = 0
+        self.floor = 0  # Decisions computed before this are stale
+        self.user_stamps: "OrderedDict[str, int]" = OrderedDict()  # Oldest change first
+        self.file_stamps: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = {"user": 0, "file": 0, "policy": 0}
+        self._lock = threading.Lock()
+    
+    def current_generation(self) -> int:
+        """Generation a new decision is computed under (take it before deciding)"""
+        return self.generation
+    
+    def _is_current(self, user_id: str, file_id: str, generation: int) -> bool:
+        return (generation >= self.floor
+                and self.user_stamps.get(user_id, 0) <= generation
+                and self.file_stamps.get(file_id, 0) <= generation)
+    
+    def get(self, user_id: str, file_id: str, action: str) -> Optional[bool]:
+        """Cached decision, or None if missing or stale"""
+        key = (user_id, file_id, action)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or not self._is_current(user_id, file_id, entry[1]):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, user_id: str, file_id: str, action: str, allowed: bool,
+            generation: int):
+        """
+        Store a decision
+        
+        Args:
+            generation: Result of current_generation() taken before the
+                decision was computed, so a concurrent invalidation is never lost
+        """
+        key = (user_id, file_id, action)
+        with self._lock:
+            self.entries[key] = (allowed, generation)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def _stamp(self, stamps: "OrderedDict[str, int]", key: str):
+        """Record a change to key (caller holds the lock)"""
+        self.generation += 1
+        stamps[key] = self.generation
+        stamps.move_to_end(key)
+        if len(stamps) > self.max_entries:
+            _, oldest = stamps.popitem(last=False)
+            self.floor = max(self.floor, oldest)
+    
+    def invalidate_user(self, user_id: str):
+        """Forget decisions for a user (role changed, user added)"""
+        with self._lock:
+            self._stamp(self.user_stamps, user_id)
+            self.invalidations["user"] += 1
+    
+    def invalidate_file(self, file_id: str):
+        """Forget decisions for a file (created, deleted, owner/permissions changed)"""
+        with self._lock:
+            self._stamp(self.file_stamps, file_id)
+            self.invalidations["file"] += 1
+    
+    def invalidate_all(self):
+        """Forget every decision (policy reloaded, metadata reloaded)"""
+        with self._lock:
+            self.generation += 1
+            self.floor = self.generation
+            self.entries.clear()
+            self.user_stamps.clear()
+            self.file_stamps.clear()
+            self.invalidations["policy"] += 1
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit rate and invalidation counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "user_invalidations": self.invalidations["user"],
+                "file_invalidations": self.invalidations["file"],
+                "policy_invalidations": self.invalidations["policy"]
+            }
+
 
 class AccessControl:
     """Manages role-based access control"""
     
     def __init__(self, user_manager: UserManager, file_manager: FileManager, 
-                 blockchain: Blockchain):
+                 blockchain: Blockchain, decision_cache_size: int = 10000,
+                 rate_limiter: Optional[RateLimiter] = None):
         """
         Initialize access control
         
@@ -48,10 +169,112 @@ class AccessControl:
             user_manager: UserManager instance
             file_manager: FileManager instance
             blockchain: Blockchain for logging
+            decision_cache_size: Cached (user, file, action) decisions (0 = disabled)
+            rate_limiter: Throttles (user, action) pairs with too many denials
         """
         self.user_manager = user_manager
         self.file_manager = file_manager
         self.blockchain = blockchain
+        self.rate_limiter = rate_limiter
+        
+        # Cached decisions are invalidated by user and file changes
+        self.decision_cache = DecisionCache(decision_cache_size) if decision_cache_size > 0 else None
+        if self.decision_cache:
+            user_manager.listeners.append(self.decision_cache.invalidate_user)
+            file_manager.metadata_listeners.append(self.decision_cache.invalidate_file)
+            file_manager.reload_listeners.append(self.decision_cache.invalidate_all)
+        
+        # Compiled policy; replaced as a whole on reload
+        self.policy: Policy = None
+        self._install_policy(Policy.from_permissions(PERMISSIONS))
+        self._policy_watch_stop: Optional[threading.Event] = None
+    
+    @property
+    def permissions(self) -> Dict[str, Dict]:
+        """Role permission matrix of the current policy (inheritance resolved)"""
+        return self.policy.permissions
+    
+    @property
+    def decision_table(self) -> Dict:
+        """Flat (role, action, is_owner, is_public) table of the current policy"""
+        return self.policy.decision_table
+    
+    # ============================================
+    # Policy Loading
+    # ============================================
+    
+    def _install_policy(self, policy: Policy):
+        """Swap in a compiled policy (one assignment, safe for concurrent checks)"""
+        self.policy = policy
+        self.user_manager.valid_roles = set(policy.roles)
+        if self.decision_cache:
+            self.decision_cache.invalidate_all()
+    
+    def reload_policy(self, permissions: Optional[Dict] = None):
+        """
+        Replace the policy with a plain permission matrix
+        
+        Args:
+            permissions: Matrix in the PERMISSIONS format (default: PERMISSIONS)
+        """
+        self._install_policy(Policy.from_permissions(
+            permissions if permissions is not None else PERMISSIONS))
+    
+    def load_policy(self, filename: str):
+        """
+        Load a policy file (roles, inheritance, groups, ACLs)
+        
+        The new policy is fully compiled before it replaces the old one,
+        so a broken file leaves the current policy in force.
+        
+        Raises:
+            ValueError, OSError: Policy file is invalid or unreadable
+        """
+        self._install_policy(Policy.load(filename))
+        logger.info("Policy loaded from %s: %d roles", filename, len(self.policy.roles),
+                    extra={"event": "policy_loaded", "path": filename})
+    
+    def watch_policy_file(self, filename: str, interval: float = 2.0) -> threading.Thread:
+        """
+        Reload the policy file whenever it changes
+        
+        Args:
+            filename: Policy file to watch
+            interval: Seconds between modification time checks
+        
+        Returns:
+            The background watcher thread (stop with stop_policy_watch)
+        """
+        self.stop_policy_watch()
+        stop = self._policy_watch_stop = threading.Event()
+        
+        def watch():
+            last_mtime = None
+            while not stop.is_set():
+                try:
+                    mtime = os.stat(filename).st_mtime
+                    if mtime != last_mtime:
+                        last_mtime = mtime
+                        self.load_policy(filename)
+                except (OSError, ValueError) as e:
+                    logger.error("Policy reload failed, keeping current policy: %s", e,
+                                 extra={"event": "policy_reload_failed",
+                                        "path": filename})
+                stop.wait(interval)
+        
+        thread = threading.Thread(target=watch, name="policy-watch", daemon=True)
+        thread.start()
+        return thread
+    
+    def stop_policy_watch(self):
+        """Stop the policy file watcher, if running"""
+        if self._policy_watch_stop:
+            self._policy_watch_stop.set()
+            self._policy_watch_stop = None
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Decision cache counters (empty if caching is disabled)"""
+        return self.decision_cache.stats() if self.decision_cache else {}
     
     def check_permission(self, user_id: str, file_id: str, action: str) -> bool:
         """
@@ -65,10 +288,22 @@ class AccessControl:
         Returns:
             True if allowed, False if denied
         """
+        # Users who keep getting denied are refused without evaluating
+        if self.rate_limiter and self.rate_limiter.is_limited((user_id, action)):
+            return False
+        
+        cache = self.decision_cache
+        if cache:
+            cached = cache.get(user_id, file_id, action)
+            if cached is not None:
+                return cached
+            generation = cache.current_generation()
+        
         # Get user
         user = self.user_manager.get_user(user_id)
         if not user:
-            print(f"✗ User not found: {user_id}")
+            logger.warning("User not found: %s", user_id,
+                           extra={"event": "user_not_found", "user_id": user_id})
             return False
         
         # Get file metadata
@@ -76,20 +311,27 @@ class AccessControl:
         
         # Special case for CREATE (file doesn't exist yet)
         if action == 'CREATE':
-            return self._check_create_permission(user)
+            allowed = self._check_create_permission(user)
         
         # File must exist for other operations
-        if not file_meta:
-            print(f"✗ File not found: {file_id}")
+        elif not file_meta:
+            logger.warning("File not found: %s", file_id,
+                           extra={"event": "file_not_found", "file_id": file_id})
             return False
         
         # Check permission based on role
-        return self._check_role_permission(user, file_meta, action)
+        else:
+            allowed = self._check_role_permission(user, file_meta, action)
+        
+        if cache:
+            cache.put(user_id, file_id, action, allowed, generation)
+        return allowed
     
     def _check_create_permission(self, user: User) -> bool:
         """Check if user can create files"""
-        permission = PERMISSIONS.get(user.role, {}).get('CREATE', False)
-        return permission is True
+        policy = self.policy
+        return any(policy.decision_table.get((role, 'CREATE', False, False), False)
+                   for role in policy.roles_for(user.user_id, user.role))
     
     def _check_role_permission(self, user: User, file_meta: FileMetadata, 
                               action: str) -> bool:
@@ -102,37 +344,56 @@ class AccessControl:
             action: Action to perform
         
         Returns:
-            True if allowed, False if denied
+            True if allowed, False if denied (unknown roles/actions are denied)
         """
-        # Get role's permission for this action
-        role_permission = PERMISSIONS.get(user.role, {}).get(action, False)
-        
-        # Case 1: Admin has full access
-        if user.role == 'Admin':
-            return True
-        
-        # Case 2: Guest permissions
-        if user.role == 'Guest':
-            if action == 'READ' and role_permission == 'public':
-                # Guest can only read public files
-                return file_meta.permissions == 'public'
-            return False
+        return self.policy.evaluate(user.user_id, user.role, file_meta.file_id, action,
+                                    file_meta.owner_id == user.user_id,
+                                    file_meta.permissions == 'public')
+    
+    def check_permissions_bulk(self, user_id: str, file_ids: List[str],
+                               action: str) -> Dict[str, bool]:
+        """
+        Decide the same action for many files at once
         
-        # Case 3: User permissions
-        if user.role == 'User':
-            # User owns the file
-            if file_meta.owner_id == user.user_id:
-                return role_permission in ['own', 'own_or_public', True]
-            
-            # User doesn't own the file
-            if action == 'READ' and role_permission == 'own_or_public':
-                # User can read public files
-                return file_meta.permissions == 'public'
-            
-            return False
+        The user and the four possible role decisions are resolved once,
+        so each file costs one metadata lookup (plus an ACL lookup when the
+        policy has ACLs). Missing users or files are denied silently.
         
-        # Default: deny
-        return False
+        Args:
+            user_id: User attempting the action
+            file_ids: Files to decide
+            action: Action to perform (CREATE, READ, WRITE, DELETE)
+        
+        Returns:
+            Mapping of file_id -> allowed
+        """
+        user = self.user_manager.get_user(user_id)
+        if not user or (self.rate_limiter and self.rate_limiter.is_limited((user_id, action))):
+            return {file_id: False for file_id in file_ids}
+        
+        if action == 'CREATE':
+            allowed = self._check_create_permission(user)
+            return {file_id: allowed for file_id in file_ids}
+        
+        policy = self.policy
+        table = policy.decision_table
+        roles = policy.roles_for(user_id, user.role)
+        decisions = {
+            (is_owner, is_public): any(table.get((role, action, is_owner, is_public), False)
+                                       for role in roles)
+            for is_owner in (False, True) for is_public in (False, True)
+        }
+        
+        metadata = self.file_manager.metadata
+        results = {}
+        for file_id in file_ids:
+            meta = metadata.get(file_id)
+            if meta is None:
+                results[file_id] = False
+                continue
+            results[file_id] = decisions[(meta.owner_id == user_id, meta.permissions == 'public')] \
+                or (bool(policy.acl) and policy.acl_allows(user_id, file_id, action))
+        return results
     
     def get_permission_summary(self, user_id: str) -> dict:
         """
@@ -145,7 +406,7 @@ class AccessControl:
         if not user:
             return {"error": "User not found"}
         
-        role_perms = PERMISSIONS.get(user.role, {})
+        role_perms = self.permissions.get(user.role, {})
         
         summary = {
             "user_id": user_id,
@@ -184,9 +445,9 @@ class AccessControl:
         print(f"\n{'Role':<10} {'CREATE':<20} {'READ':<20} {'WRITE':<20} {'DELETE':<20}")
         print("-" * 90)
         
-        for role, perms in PERMISSIONS.items():
+        for role, perms in self.permissions.items():
             print(f"{role:<10} ", end="")
-            for action in ['CREATE', 'READ', 'WRITE', 'DELETE']:
+            for action in ACTIONS:
                 perm = perms.get(action, False)
                 perm_str = self._describe_permission(perm)
                 print(f"{perm_str:<20} ", end="")
@@ -238,6 +499,8 @@ def sanitize_input(input_str: str) -> str:
 
 if __name__ == "__main__":
     """Demo access control"""
+    import log_config
+    log_config.configure(use_queue=False)
     from blockchain import Blockchain
     from file_manager import UserManager, FileManager
     
@@ -0,0 +1,283 @@
+"""
+============================================
+OS Project: Live Anomaly Detection
+Sliding-window detection of brute-force and scraping on the audit stream
+============================================
+"""
+
+import hashlib
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from blockchain import Blockchain, Block, CallbackQueue, expand_transactions
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def _hash64(value: str, seed: int = 0) -> int:
+    """Stable 64-bit hash (Python's hash() is randomized per process)"""
+    digest = hashlib.blake2b(value.encode(), digest_size=8, salt=seed.to_bytes(16, 'little'))
+    return int.from_bytes(digest.digest(), 'little')
+
+
+class UserWindow:
+    """
+    Ring buffer of per-bucket counters for one user
+    
+    Each slot covers bucket_seconds and holds the attempt count, denial
+    count and a bitmap of file hashes (for estimating distinct files).
+    """
+    
+    __slots__ = ('epochs', 'totals', 'denied', 'bitmaps')
+    
+    def __init__(self, buckets: int):
+        self.epochs = [-1] * buckets
+        self.totals = [0] * buckets
+        self.denied = [0] * buckets
+        self.bitmaps = [0] * buckets
+    
+    def record(self, epoch: int, is_denied: bool, file_bit: int, count: int = 1):
+        slot = epoch % len(self.epochs)
+        if self.epochs[slot] != epoch:
+            self.epochs[slot] = epoch
+            self.totals[slot] = self.denied[slot] = self.bitmaps[slot] = 0
+        self.totals[slot] += count
+        if is_denied:
+            self.denied[slot] += count
+        self.bitmaps[slot] |= file_bit
+    
+    def window(self, epoch: int):
+        """(attempts, denials, combined file bitmap) over live slots"""
+        oldest = epoch - len(self.epochs)
+        totals = denied = bitmap = 0
+        for slot, slot_epoch in enumerate(self.epochs):
+            if slot_epoch > oldest:
+                totals += self.totals[slot]
+                denied += self.denied[slot]
+                bitmap |= self.bitmaps[slot]
+        return totals, denied, bitmap
+
+
+class CountMinWindow:
+    """Sliding-window count-min sketch (one sketch per time bucket)"""
+    
+    def __init__(self, buckets: int, width: int = 1024, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.epochs = [-1] * buckets
+        self.sketches = [array('I', [0]) * (width * depth) for _ in range(buckets)]
+    
+    def _cells(self, key: str):
+        h = _hash64(key)
+        h1, h2 = h & 0xFFFFFFFF, h >> 32
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+    
+    def add(self, epoch: int, key: str, count: int = 1) -> int:
+        """Count key in the current bucket; returns its windowed estimate"""
+        slot = epoch % len(self.epochs)
+        if self.epochs[slot] != epoch:
+            self.epochs[slot] = epoch
+            self.sketches[slot] = array('I', [0]) * (self.width * self.depth)
+        
+        cells = self._cells(key)
+        for cell in cells:
+            self.sketches[slot][cell] += count
+        
+        oldest = epoch - len(self.epochs)
+        live = [self.sketches[s] for s, e in enumerate(self.epochs) if e > oldest]
+        return min(sum(sketch[cell] for sketch in live) for cell in cells)
+
+
+class AnomalyDetector:
+    """
+    Watches new blocks and raises alerts in real time
+    
+    Alerts:
+        DENIAL_BURST  - a user's denials in the window cross a threshold
+        FANOUT        - a user reads too many distinct files (scraping)
+        FILE_TARGETED - one file collects too many denials (any users)
+    
+    Memory is fixed: at most max_users user rings plus one count-min
+    sketch ring for files.
+    """
+    
+    def __init__(self, window_seconds: float = 60.0, buckets: int = 12,
+                 denial_threshold: int = 10, denial_ratio: float = 0.5,
+                 fanout_threshold: int = 100, file_denial_threshold: int = 20,
+                 max_users: int = 10000, bitmap_bits: int = 1024,
+                 clock=time.monotonic):
+        """
+        Initialize anomaly detector
+        
+        Args:
+            window_seconds: Length of the sliding window
+            buckets: Slots the window is divided into
+            denial_threshold: Denials per window that trigger DENIAL_BURST
+            denial_ratio: Minimum share of a user's attempts that were denied
+            fanout_threshold: Distinct files read per window that trigger FANOUT
+            file_denial_threshold: Denials on one file that trigger FILE_TARGETED
+            max_users: Users tracked at once (least recently active dropped)
+            bitmap_bits: Bitmap size for distinct-file estimates
+            clock: Time source (overridable for tests/demos)
+        """
+        self.bucket_seconds = window_seconds / buckets
+        self.buckets = buckets
+        self.denial_threshold = denial_threshold
+        self.denial_ratio = denial_ratio
+        self.fanout_threshold = fanout_threshold
+        self.file_denial_threshold = file_denial_threshold
+        self.max_users = max_users
+        self.bitmap_bits = bitmap_bits
+        self.clock = clock
+        
+        self.users: "OrderedDict[str, UserWindow]" = OrderedDict()
+        self.file_denials = CountMinWindow(buckets)
+        self.last_alert: "OrderedDict[tuple, int]" = OrderedDict()  # (kind, key) -> epoch
+        self.alerts: deque = deque(maxlen=1000)
+        self.handlers: List[Callable[[Dict[str, Any]], None]] = []
+        self.blocks_seen = 0
+        self._lock = threading.Lock()
+        # Alerts raised under _lock, handed to handlers once it is released,
+        # so a handler may log to the ledger (and so re-enter observe)
+        self._deliveries = CallbackQueue(self.handlers, self._handler_failed)
+    
+    def attach(self, blockchain: Blockchain):
+        """Start observing every block appended to the chain"""
+        blockchain.subscribe(self.observe)
+    
+    def detach(self, blockchain: Blockchain):
+        """Stop observing the chain"""
+        blockchain.unsubscribe(self.observe)
+    
+    def on_alert(self, handler: Callable[[Dict[str, Any]], None]):
+        """Register a callback for new alerts"""
+        self.handlers.append(handler)
+    
+    def _estimate_distinct(self, bitmap: int) -> int:
+        """Linear counting estimate of distinct files from a bitmap"""
+        zeros = self.bitmap_bits - bin(bitmap).count('1')
+        if zeros == 0:
+            return self.bitmap_bits * 2  # Saturated; at least this many
+        return round(-self.bitmap_bits * math.log(zeros / self.bitmap_bits))
+    
+    def observe(self, block: Block):
+        """Process one appended block"""
+        epoch = int(self.clock() // self.bucket_seconds)
+        with self._lock:
+            self.blocks_seen += 1
+            for tx in expand_transactions(block):
+                self._observe_transaction(block, tx, epoch)
+        self._deliveries.drain()
+    
+    def _handler_failed(self, alert: Dict[str, Any], error: Exception):
+        logger.exception("Alert handler failed on %s: %s", alert['kind'], error,
+                         extra={"event": "alert_handler_failed", "kind": alert['kind']})
+    
+    def _observe_transaction(self, block: Block, tx: Dict[str, Any], epoch: int):
+        user_id = tx.get('user_id')
+        file_id = tx.get('file_id')
+        if not user_id:
+            return
+        
+        is_denied = tx.get('status') == 'DENIED'
+        # Fan-out only counts reads: bulk creates by an owner are not scraping
+        scraping = file_id and tx.get('action') == 'READ'
+        file_bit = 1 << (_hash64(file_id) % self.bitmap_bits) if scraping else 0
+        
+        window = self.users.get(user_id)
+        if window is None:
+            window = self.users[user_id] = UserWindow(self.buckets)
+            if len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        else:
+            self.users.move_to_end(user_id)
+        
+        count = tx.get('count', 1)
+        window.record(epoch, is_denied, file_bit, count)
+        
+        totals, denied, bitmap = window.window(epoch)
+        if is_denied and denied >= self.denial_threshold and denied >= totals * self.denial_ratio:
+            self._alert('DENIAL_BURST', user_id, denied, self.denial_threshold, block, epoch)
+        
+        if file_bit:
+            distinct = self._estimate_distinct(bitmap)
+            if distinct >= self.fanout_threshold:
+                self._alert('FANOUT', user_id, distinct, self.fanout_threshold, block, epoch)
+        
+        if is_denied and file_id:
+            file_denied = self.file_denials.add(epoch, file_id, count)
+            if file_denied >= self.file_denial_threshold:
+                self._alert('FILE_TARGETED', file_id, file_denied,
+                            self.file_denial_threshold, block, epoch)
+    
+    def _alert(self, kind: str, key: str, value: int, threshold: int,
+               block: Block, epoch: int):
+        """Raise an alert, at most once per key per window"""
+        last = self.last_alert.get((kind, key))
+        if last is not None and epoch - last < self.buckets:
+            return
+        self.last_alert[(kind, key)] = epoch
+        self.last_alert.move_to_end((kind, key))
+        if len(self.last_alert) > self.max_users:
+            self.last_alert.popitem(last=False)
+        
+        alert = {
+            "kind": kind,
+            "key": key,
+            "value": value,
+            "threshold": threshold,
+            "block_index": block.index,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.alerts.append(alert)
+        self._deliveries.put(alert, tuple(self.handlers))
+    
+    def recent_alerts(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent alerts, newest last"""
+        alerts = list(self.alerts)
+        return alerts[-limit:] if limit else alerts
+
+
+# ============================================
+# Demo
+# ============================================
+
+if __name__ == "__main__":
+    """Demo live brute-force and scraping detection"""
+    import log_config
+    log_config.configure(use_queue=False)
+    from file_manager import UserManager, FileManager
+    from access_control import AccessControl
+    
+    print("\n" + "="*70)
+    print("DEMO: Live Anomaly Detection")
+    print("="*70 + "\n")
+    
+    bc = Blockchain()
+    um = UserManager()
+    fm = FileManager(bc, um)
+    fm.access_control = AccessControl(um, fm, bc)
+    
+    detector = AnomalyDetector(denial_threshold=5, fanout_threshold=20, file_denial_threshold=8)
+    detector.on_alert(lambda a: print(f"⚠ ALERT {a['kind']}: {a['key']} "
+                                      f"({a['value']} >= {a['threshold']})"))
+    detector.attach(bc)
+    
+    fm.create_file("vault.txt", "admin001", "secret", "private")
+    for i in range(25):
+        fm.create_file(f"page_{i}.txt", "admin001", "public page", "public")
+    
+    # Brute force: guest keeps trying the private file
+    for _ in range(8):
+        fm.read_file("vault.txt", "guest001")
+    
+    # Scraping: user reads every public page
+    for i in range(25):
+        fm.read_file(f"page_{i}.txt", "user001")
+    
+    print(f"\nBlocks observed: {detector.blocks_seen}, alerts: {len(detector.alerts)}")
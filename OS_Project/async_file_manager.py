@@ -0,0 +1,161 @@
+"""
+============================================
+OS Project: Async File Manager
+asyncio facade over FileManager for high-concurrency servers
+============================================
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from file_manager import FileManager
+
+
+class AsyncFileManager:
+    """Awaitable file operations backed by a bounded thread pool"""
+    
+    def __init__(self, file_manager: FileManager, max_workers: int = 8,
+                 max_pending: int = 256):
+        """
+        Initialize async file manager
+        
+        Args:
+            file_manager: FileManager doing the actual work
+            max_workers: Threads for blocking disk I/O and hashing
+            max_pending: Operations allowed in flight before callers wait
+        """
+        self.file_manager = file_manager
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="fm-io")
+        self.max_pending = max_pending
+        self._slots: Optional[asyncio.Semaphore] = None  # Created in the running loop
+        
+        # Metadata is saved by a single flusher; concurrent changes share a save
+        self.file_manager.autosave_metadata = False
+        self._next_flush: Optional[asyncio.Future] = None
+        self._flushing = False
+        self.flush_count = 0
+    
+    async def _run(self, func, *args):
+        """Run a blocking FileManager call in the executor"""
+        if self._slots is None:
+            # Python < 3.10 binds a Semaphore to the loop current at creation
+            self._slots = asyncio.Semaphore(self.max_pending)
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+    
+    # ============================================
+    # Metadata Flush Coalescing
+    # ============================================
+    
+    async def _persist_metadata(self):
+        """
+        Wait until metadata changes made so far are on disk
+        
+        Callers arriving while a save is running all wait for the next
+        save, so N concurrent changes cost about two saves, not N.
+        """
+        if self._next_flush is None:
+            self._next_flush = asyncio.get_running_loop().create_future()
+        waiter = self._next_flush
+        
+        if not self._flushing:
+            self._flushing = True
+            asyncio.ensure_future(self._flush_loop())
+        
+        await asyncio.shield(waiter)
+    
+    async def _flush_loop(self):
+        """Save metadata until no caller is waiting for a save"""
+        loop = asyncio.get_running_loop()
+        try:
+            while self._next_flush is not None:
+                waiter, self._next_flush = self._next_flush, None
+                try:
+                    # save_metadata clears metadata_dirty, and sets it again if it fails
+                    if self.file_manager.metadata_dirty:
+                        await loop.run_in_executor(self.executor, self.file_manager.save_metadata)
+                        self.flush_count += 1
+                    waiter.set_result(None)
+                except Exception as e:
+                    waiter.set_exception(e)
+        finally:
+            self._flushing = False
+    
+    # ============================================
+    # File Operations
+    # ============================================
+    
+    async def create(self, file_id: str, owner_id: str, content: str = "",
+                     permissions: str = 'private') -> bool:
+        """Create a file (see FileManager.create_file)"""
+        result = await self._run(self.file_manager.create_file, file_id, owner_id,
+                                 content, permissions)
+        await self._persist_metadata()
+        return result
+    
+    async def read(self, file_id: str, user_id: str) -> Optional[str]:
+        """Read a file (see FileManager.read_file)"""
+        return await self._run(self.file_manager.read_file, file_id, user_id)
+    
+    async def write(self, file_id: str, user_id: str, content: str) -> bool:
+        """Write a file (see FileManager.write_file)"""
+        result = await self._run(self.file_manager.write_file, file_id, user_id, content)
+        await self._persist_metadata()
+        return result
+    
+    async def delete(self, file_id: str, user_id: str) -> bool:
+        """Delete a file (see FileManager.delete_file)"""
+        result = await self._run(self.file_manager.delete_file, file_id, user_id)
+        await self._persist_metadata()
+        return result
+    
+    async def close(self):
+        """Flush pending metadata and stop the worker threads"""
+        if self.file_manager.metadata_dirty:
+            await self._persist_metadata()
+        self.executor.shutdown(wait=True)
+        self.file_manager.autosave_metadata = True
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+# ============================================
+# Demo
+# ============================================
+
+if __name__ == "__main__":
+    """Demo concurrent file operations"""
+    import log_config
+    log_config.configure(use_queue=False)
+    from blockchain import Blockchain
+    from file_manager import UserManager
+    from access_control import AccessControl
+    
+    print("\n" + "="*70)
+    print("DEMO: Async File Operations")
+    print("="*70 + "\n")
+    
+    bc = Blockchain()
+    um = UserManager()
+    fm = FileManager(bc, um)
+    fm.access_control = AccessControl(um, fm, bc)
+    
+    async def demo():
+        async with AsyncFileManager(fm) as afm:
+            await asyncio.gather(*[
+                afm.create(f"async_{i}.txt", "user001", f"content {i}")
+                for i in range(10)
+            ])
+            contents = await asyncio.gather(*[
+                afm.read(f"async_{i}.txt", "user001") for i in range(10)
+            ])
+            print(f"\nRead {len(contents)} files, metadata saved {afm.flush_count} times")
+    
+    asyncio.run(demo())
+    print(f"Blockchain valid: {bc.validate_chain()} ({bc.get_chain_length()} blocks)")
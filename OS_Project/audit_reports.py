@@ -5,79 +5,374 @@ Student 4: Blockchain Queries & Reports
 ============================================
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from array import array
+import hashlib
+from collections import OrderedDict, deque
 from datetime import datetime
-from blockchain import Blockchain, Block
+from blockchain import Blockchain, Block, expand_transactions
 from file_manager import UserManager
+from log_config import get_logger
+import itertools
 import json
+import threading
+
+logger = get_logger(__name__)
+
+
+class UserActivity:
+    """One user's events: where each sits in the chain, plus outcome counters"""
+    
+    __slots__ = ("blocks", "offsets", "success", "denied")
+    
+    def __init__(self):
+        self.blocks = array('Q')   # Block index of each event, in chain order
+        self.offsets = array('L')  # Position of the transaction within its block
+        self.success = 0
+        self.denied = 0
+    
+    def __len__(self) -> int:
+        return len(self.blocks)
+    
+    def add(self, block_index: int, offset: int, status: Optional[str]):
+        self.blocks.append(block_index)
+        self.offsets.append(offset)
+        if status == 'SUCCESS':
+            self.success += 1
+        elif status == 'DENIED':
+            self.denied += 1
+    
+    def positions(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        """(block index, offset) pairs of events start..stop-1"""
+        return list(zip(self.blocks[start:stop], self.offsets[start:stop]))
+
+
+# Fields of a file access record, in the order FileHistory.recent stores them
+ACCESS_FIELDS = ('block_index', 'timestamp', 'user_id', 'action', 'status', 'reason')
+
+
+class FileHistory(UserActivity):
+    """One file's accesses: chain positions, counters and the last few records"""
+    
+    __slots__ = ("recent", "complete")
+    
+    def __init__(self, recent_size: int, complete: bool):
+        super().__init__()
+        self.recent: deque = deque(maxlen=recent_size)  # ACCESS_FIELDS tuples, oldest first
+        self.complete = complete  # False if earlier accesses may have been evicted
+
+
+class EvictedFiles:
+    """
+    Bloom filter of file ids dropped from the access index
+    
+    A false positive only sends that file's queries to a chain scan; a
+    file that was never dropped is almost always reported as such.
+    """
+    
+    __slots__ = ("bits", "size", "hashes")
+    
+    def __init__(self, size: int, hashes: int = 4):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bytearray((size + 7) // 8)
+    
+    def _positions(self, file_id: str):
+        digest = hashlib.blake2b(file_id.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+    
+    def add(self, file_id: str):
+        for position in self._positions(file_id):
+            self.bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, file_id: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(file_id))
 
 
 class AuditReporter:
     """Generates audit reports from blockchain"""
     
-    def __init__(self, blockchain: Blockchain, user_manager: UserManager):
+    def __init__(self, blockchain: Blockchain, user_manager: UserManager,
+                 max_files: int = 10000, recent_size: int = 20):
         """
         Initialize audit reporter
         
         Args:
-            blockchain: Blockchain instance to query
+            blockchain: Blockchain (or PartitionedLedger) instance to query
             user_manager: UserManager instance for user details
+            max_files: Files tracked by the access index (least recently
+                       accessed dropped beyond this)
+            recent_size: Accesses kept per file for recent-access queries
         """
         self.blockchain = blockchain
         self.user_manager = user_manager
+        self.max_files = max_files
+        self.recent_size = recent_size
+        
+        # Per-user and per-file index, built on the first user or file query
+        # and then kept current by a chain subscription. A PartitionedLedger
+        # has no single block numbering, so its queries scan instead.
+        self.indexable = callable(getattr(blockchain, "get_block", None))
+        self.users: Dict[str, UserActivity] = {}
+        self.files: "OrderedDict[str, FileHistory]" = OrderedDict()
+        self.files_evicted = 0
+        self.evicted = self._new_evicted()
+        self._indexed: Optional[int] = None  # Last block in the index (None = not built)
+        self._indexed_hash: Optional[str] = None
+        self._index_stale = False
+        self._subscribed = False
+        self._index_lock = threading.Lock()
+    
+    def _iter_transactions(self):
+        """Yield (block, transaction) pairs for every logged operation"""
+        for block in self.blockchain.iter_blocks():  # Merged by time across partitions
+            for transaction in expand_transactions(block):
+                yield block, transaction
+    
+    def _scan(self, field: str, value: str):
+        """Yield (block, transaction) pairs whose field equals value"""
+        for block, tx in self._iter_transactions():
+            if tx.get(field) == value:
+                yield block, tx
+    
+    def _scan_counts(self, field: str, value: str) -> Dict[str, int]:
+        counts = {'total': 0, 'success': 0, 'denied': 0}
+        for _, tx in self._scan(field, value):
+            counts['total'] += 1
+            if tx.get('status') == 'SUCCESS':
+                counts['success'] += 1
+            elif tx.get('status') == 'DENIED':
+                counts['denied'] += 1
+        return counts
+    
+    # ============================================
+    # Activity Index
+    # ============================================
+    
+    def _new_evicted(self) -> EvictedFiles:
+        # ~16 bits per tracked file: under 1% false positives until about
+        # max_files files have been dropped
+        return EvictedFiles(max(1024, self.max_files * 16))
+    
+    def _index_block(self, block: Block):
+        for offset, tx in enumerate(expand_transactions(block)):
+            status = tx.get('status')
+            user_id = tx.get('user_id')
+            if user_id is not None:
+                activity = self.users.get(user_id)
+                if activity is None:
+                    activity = self.users[user_id] = UserActivity()
+                activity.add(block.index, offset, status)
+            
+            file_id = tx.get('file_id')
+            if file_id is not None:
+                history = self.files.get(file_id)
+                if history is None:
+                    # A file dropped earlier comes back without its history
+                    history = FileHistory(self.recent_size, complete=file_id not in self.evicted)
+                    self.files[file_id] = history
+                    if len(self.files) > self.max_files:
+                        dropped, _ = self.files.popitem(last=False)
+                        self.evicted.add(dropped)
+                        self.files_evicted += 1
+                else:
+                    self.files.move_to_end(file_id)
+                history.add(block.index, offset, status)
+                history.recent.append((block.index, block.timestamp, user_id,
+                                       tx.get('action'), status, tx.get('reason', 'N/A')))
+        self._indexed = block.index
+        self._indexed_hash = block.hash
+    
+    def _on_block(self, block: Block):
+        """Index a new block (subscriber callback, so it only appends)"""
+        if self._indexed is None or self._index_stale:
+            return
+        if block.index != self._indexed + 1:
+            self._index_stale = True  # Chain truncated or replaced; rebuild on next query
+            return
+        self._index_block(block)
+    
+    def _ensure_index(self) -> bool:
+        """
+        Build the activity index if it is missing or out of date
+        
+        Returns:
+            False if the ledger cannot be indexed (callers scan instead)
+        """
+        if not self.indexable:
+            return False
+        with self._index_lock:
+            if self._indexed is not None and not self._index_stale:
+                # Reloading or resyncing the chain replaces the block we stopped at
+                block = self.blockchain.get_block(self._indexed)
+                if block is not None and block.hash == self._indexed_hash:
+                    return True
+            
+            if self._subscribed:
+                self.blockchain.unsubscribe(self._on_block)
+            genesis = self.blockchain.get_block(0)
+            self.users = {}
+            self.files = OrderedDict()
+            self.files_evicted = 0
+            self.evicted = self._new_evicted()
+            self._indexed = 0
+            self._indexed_hash = genesis.hash if genesis else None
+            self._index_stale = False
+            for block in self.blockchain.iter_blocks():
+                self._index_block(block)
+            # Blocks added during the scan are replayed before new ones arrive
+            self.blockchain.subscribe(self._on_block, last_seen=self._indexed)
+            self._subscribed = True
+            logger.debug("Activity index built: %d users, %d files through block %d",
+                         len(self.users), len(self.files), self._indexed,
+                         extra={"event": "activity_index_built", "users": len(self.users),
+                                "files": len(self.files)})
+        return True
+    
+    def _transaction_at(self, block_index: int, offset: int) -> Tuple[Block, Dict[str, Any]]:
+        block = self.blockchain.get_block(block_index)
+        return block, expand_transactions(block)[offset]
     
     # ============================================
     # Query Functions
     # ============================================
     
-    def query_file_access(self, file_id: str) -> List[Dict[str, Any]]:
+    def _file_history(self, file_id: str) -> Tuple[bool, Optional[FileHistory]]:
         """
-        Query all access attempts for a specific file
+        Index entry for a file
+        
+        Returns:
+            (usable, history): usable is False when the file's full history
+            is not in the index (not indexable, or evicted earlier), in
+            which case callers scan; history is None for an unseen file
+        """
+        if not self._ensure_index():
+            return False, None
+        history = self.files.get(file_id)
+        if history is None:
+            return file_id not in self.evicted, None
+        return history.complete, history
+    
+    def query_file_access(self, file_id: str, offset: int = 0,
+                          limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Query access attempts for a specific file, oldest first
         
         Args:
             file_id: File to query
+            offset: Number of accesses to skip
+            limit: Maximum accesses to return (None = all)
         
         Returns:
-            List of transactions involving the file
+            List of transactions involving the file; costs O(accesses
+            returned) while the file is tracked by the access index
         """
-        results = []
+        stop = None if limit is None else offset + limit
+        usable, history = self._file_history(file_id)
+        if usable:
+            if history is None:
+                return []
+            transactions = (self._transaction_at(block_index, position)
+                            for block_index, position in history.positions(offset, stop))
+        else:
+            transactions = itertools.islice(self._scan('file_id', file_id), offset, stop)
+        
+        return [{
+            'block_index': block.index,
+            'timestamp': block.timestamp,
+            'user_id': tx.get('user_id'),
+            'action': tx.get('action'),
+            'status': tx.get('status'),
+            'reason': tx.get('reason', 'N/A')
+        } for block, tx in transactions]
+    
+    def file_access_counts(self, file_id: str) -> Dict[str, int]:
+        """
+        Access, success and denial counts for a file
         
-        for block in self.blockchain.chain[1:]:  # Skip genesis block
-            if isinstance(block.data, dict) and block.data.get('file_id') == file_id:
-                results.append({
-                    'block_index': block.index,
-                    'timestamp': block.timestamp,
-                    'user_id': block.data.get('user_id'),
-                    'action': block.data.get('action'),
-                    'status': block.data.get('status'),
-                    'reason': block.data.get('reason', 'N/A')
-                })
+        Returns:
+            {'total', 'success', 'denied'}; O(1) while the file is tracked
+        """
+        usable, history = self._file_history(file_id)
+        if not usable:
+            return self._scan_counts('file_id', file_id)
+        if history is None:
+            return {'total': 0, 'success': 0, 'denied': 0}
+        return {'total': len(history), 'success': history.success, 'denied': history.denied}
+    
+    def recent_file_access(self, file_id: str, count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Most recent access attempts for a file, oldest first
         
-        return results
+        Args:
+            file_id: File to query
+            count: Accesses to return (default: recent_size)
+        
+        Returns:
+            Up to count transactions; O(count) from the file's ring buffer
+            when it holds enough of them
+        """
+        count = self.recent_size if count is None else count
+        usable, history = self._file_history(file_id)
+        if history is not None and (count <= len(history.recent) or
+                                    usable and len(history) == len(history.recent)):
+            entries = list(history.recent)
+            return [dict(zip(ACCESS_FIELDS, entry))
+                    for entry in entries[max(len(entries) - count, 0):]]
+        if usable and history is None:
+            return []
+        total = self.file_access_counts(file_id)['total']
+        return self.query_file_access(file_id, max(total - count, 0))
     
-    def query_user_activity(self, user_id: str) -> List[Dict[str, Any]]:
+    def query_user_activity(self, user_id: str, offset: int = 0,
+                            limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
-        Query all actions performed by a specific user
+        Query actions performed by a specific user, oldest first
         
         Args:
             user_id: User to query
+            offset: Number of events to skip
+            limit: Maximum events to return (None = all)
         
         Returns:
-            List of all user's transactions
+            List of the user's transactions; costs O(events returned)
+            once the activity index is built
         """
-        results = []
-        
-        for block in self.blockchain.chain[1:]:
-            if isinstance(block.data, dict) and block.data.get('user_id') == user_id:
-                results.append({
-                    'block_index': block.index,
-                    'timestamp': block.timestamp,
-                    'action': block.data.get('action'),
-                    'file_id': block.data.get('file_id'),
-                    'status': block.data.get('status')
-                })
+        stop = None if limit is None else offset + limit
+        if self._ensure_index():
+            activity = self.users.get(user_id)
+            if activity is None:
+                return []
+            transactions = (self._transaction_at(block_index, position)
+                            for block_index, position in activity.positions(offset, stop))
+        else:
+            transactions = itertools.islice(self._scan('user_id', user_id), offset, stop)
+        
+        return [{
+            'block_index': block.index,
+            'timestamp': block.timestamp,
+            'action': tx.get('action'),
+            'file_id': tx.get('file_id'),
+            'status': tx.get('status')
+        } for block, tx in transactions]
+    
+    def user_activity_counts(self, user_id: str) -> Dict[str, int]:
+        """
+        Event, success and denial counts for a user
         
-        return results
+        Returns:
+            {'total', 'success', 'denied'}; O(1) once the index is built
+        """
+        if self._ensure_index():
+            activity = self.users.get(user_id)
+            if activity is None:
+                return {'total': 0, 'success': 0, 'denied': 0}
+            return {'total': len(activity), 'success': activity.success,
+                    'denied': activity.denied}
+        return self._scan_counts('user_id', user_id)
     
     def query_denied_access(self) -> List[Dict[str, Any]]:
         """
@@ -88,15 +383,16 @@ class AuditReporter:
         """
         results = []
         
-        for block in self.blockchain.chain[1:]:
-            if isinstance(block.data, dict) and block.data.get('status') == 'DENIED':
+        for block, tx in self._iter_transactions():
+            if tx.get('status') == 'DENIED':
                 results.append({
                     'block_index': block.index,
                     'timestamp': block.timestamp,
-                    'user_id': block.data.get('user_id'),
-                    'action': block.data.get('action'),
-                    'file_id': block.data.get('file_id'),
-                    'reason': block.data.get('reason', 'Unknown')
+                    'user_id': tx.get('user_id'),
+                    'action': tx.get('action'),
+                    'file_id': tx.get('file_id'),
+                    'reason': tx.get('reason', 'Unknown'),
+                    'count': tx.get('count', 1)
                 })
         
         return results
@@ -114,7 +410,7 @@ class AuditReporter:
         """
         results = []
         
-        for block in self.blockchain.chain[1:]:
+        for block, tx in self._iter_transactions():
             timestamp = block.timestamp
             
             # Check time range
@@ -123,15 +419,14 @@ class AuditReporter:
             if end_time and timestamp > end_time:
                 continue
             
-            if isinstance(block.data, dict):
-                results.append({
-                    'block_index': block.index,
-                    'timestamp': timestamp,
-                    'user_id': block.data.get('user_id'),
-                    'action': block.data.get('action'),
-                    'file_id': block.data.get('file_id'),
-                    'status': block.data.get('status')
-                })
+            results.append({
+                'block_index': block.index,
+                'timestamp': timestamp,
+                'user_id': tx.get('user_id'),
+                'action': tx.get('action'),
+                'file_id': tx.get('file_id'),
+                'status': tx.get('status')
+            })
         
         return results
     
@@ -147,14 +442,14 @@ class AuditReporter:
         """
         results = []
         
-        for block in self.blockchain.chain[1:]:
-            if isinstance(block.data, dict) and block.data.get('action') == action_type:
+        for block, tx in self._iter_transactions():
+            if tx.get('action') == action_type:
                 results.append({
                     'block_index': block.index,
                     'timestamp': block.timestamp,
-                    'user_id': block.data.get('user_id'),
-                    'file_id': block.data.get('file_id'),
-                    'status': block.data.get('status')
+                    'user_id': tx.get('user_id'),
+                    'file_id': tx.get('file_id'),
+                    'status': tx.get('status')
                 })
         
         return results
@@ -163,18 +458,60 @@ class AuditReporter:
     # Report Generation Functions
     # ============================================
     
-    def generate_file_access_report(self, file_id: str):
-        """Generate formatted report for file access history"""
+    def generate_file_access_report(self, file_id: str, page: int = 1,
+                                    page_size: int = 50) -> int:
+        """
+        Generate formatted report for file access history, one page at a time
+        
+        Args:
+            file_id: File to report on
+            page: Page to print, from 1 (clamped to the last page)
+            page_size: Accesses per page
+        
+        Returns:
+            Number of pages
+        """
         print("\n" + "="*70)
         print(f"FILE ACCESS REPORT: {file_id}")
         print("="*70)
         
-        results = self.query_file_access(file_id)
+        counts = self.file_access_counts(file_id)
+        if not counts['total']:
+            print("No access records found for this file.")
+            return 0
+        
+        pages = -(-counts['total'] // page_size)
+        page = min(max(page, 1), pages)
+        results = self.query_file_access(file_id, (page - 1) * page_size, page_size)
+        self._print_file_access_rows(results)
+        
+        print("\n" + "="*70)
+        if pages > 1:
+            first = (page - 1) * page_size + 1
+            print(f"Page {page} of {pages} (accesses {first}-{first + len(results) - 1})")
+        print(f"Total Access Attempts: {counts['total']}")
+        print(f"Successful: {counts['success']}")
+        print(f"Denied: {counts['denied']}")
+        print("="*70 + "\n")
+        return pages
+    
+    def generate_recent_access_report(self, file_id: str, count: Optional[int] = None):
+        """Generate formatted report of a file's most recent accesses"""
+        results = self.recent_file_access(file_id, count)
+        
+        print("\n" + "="*70)
+        print(f"RECENT ACCESSES: {file_id} (last {len(results)})")
+        print("="*70)
         
         if not results:
             print("No access records found for this file.")
             return
         
+        self._print_file_access_rows(results)
+        print("="*70 + "\n")
+    
+    @staticmethod
+    def _print_file_access_rows(results: List[Dict[str, Any]]):
         print(f"\n{'Timestamp':<22} {'User':<15} {'Action':<10} {'Status':<10} {'Reason':<20}")
         print("-" * 90)
         
@@ -189,15 +526,20 @@ class AuditReporter:
             status_display = f"✓ {status}" if status == "SUCCESS" else f"✗ {status}"
             
             print(f"{timestamp:<22} {user_id:<15} {action:<10} {status_display:<10} {reason:<20}")
-        
-        print("\n" + "="*70)
-        print(f"Total Access Attempts: {len(results)}")
-        print(f"Successful: {sum(1 for r in results if r['status'] == 'SUCCESS')}")
-        print(f"Denied: {sum(1 for r in results if r['status'] == 'DENIED')}")
-        print("="*70 + "\n")
     
-    def generate_user_activity_report(self, user_id: str):
-        """Generate formatted report for user activity"""
+    def generate_user_activity_report(self, user_id: str, page: int = 1,
+                                      page_size: int = 50) -> int:
+        """
+        Generate formatted report for user activity, one page at a time
+        
+        Args:
+            user_id: User to report on
+            page: Page to print, from 1 (clamped to the last page)
+            page_size: Events per page
+        
+        Returns:
+            Number of pages
+        """
         user = self.user_manager.get_user(user_id)
         username = user.username if user else user_id
         
@@ -205,11 +547,14 @@ class AuditReporter:
         print(f"USER ACTIVITY REPORT: {username} ({user_id})")
         print("="*70)
         
-        results = self.query_user_activity(user_id)
-        
-        if not results:
+        counts = self.user_activity_counts(user_id)
+        if not counts['total']:
             print("No activity found for this user.")
-            return
+            return 0
+        
+        pages = -(-counts['total'] // page_size)
+        page = min(max(page, 1), pages)
+        results = self.query_user_activity(user_id, (page - 1) * page_size, page_size)
         
         print(f"\n{'Timestamp':<22} {'Action':<10} {'File':<20} {'Status':<10}")
         print("-" * 70)
@@ -225,10 +570,14 @@ class AuditReporter:
             print(f"{timestamp:<22} {action:<10} {file_id:<20} {status_display:<10}")
         
         print("\n" + "="*70)
-        print(f"Total Actions: {len(results)}")
-        print(f"Successful: {sum(1 for r in results if r['status'] == 'SUCCESS')}")
-        print(f"Denied: {sum(1 for r in results if r['status'] == 'DENIED')}")
+        if pages > 1:
+            first = (page - 1) * page_size + 1
+            print(f"Page {page} of {pages} (actions {first}-{first + len(results) - 1})")
+        print(f"Total Actions: {counts['total']}")
+        print(f"Successful: {counts['success']}")
+        print(f"Denied: {counts['denied']}")
         print("="*70 + "\n")
+        return pages
     
     def generate_security_report(self):
         """Generate security audit report (unauthorized access attempts)"""
@@ -255,14 +604,14 @@ class AuditReporter:
             
             print(f"{timestamp:<22} {user_id:<15} {action:<10} {file_id:<20} {reason:<25}")
         
-        # Aggregate statistics
+        # Aggregate statistics (throttle summaries stand for several attempts)
         users_with_violations = {}
         for record in results:
             user_id = record['user_id']
-            users_with_violations[user_id] = users_with_violations.get(user_id, 0) + 1
+            users_with_violations[user_id] = users_with_violations.get(user_id, 0) + record['count']
         
         print("\n" + "="*70)
-        print(f"Total Unauthorized Attempts: {len(results)}")
+        print(f"Total Unauthorized Attempts: {sum(users_with_violations.values())}")
         print("\nTop Violators:")
         sorted_violators = sorted(users_with_violations.items(), key=lambda x: x[1], reverse=True)
         for user_id, count in sorted_violators[:5]:
@@ -273,45 +622,66 @@ class AuditReporter:
         print("\n⚠ RECOMMENDATION: Investigate users with multiple violations")
         print("="*70 + "\n")
     
-    def generate_summary_statistics(self):
-        """Generate overall system statistics"""
-        print("\n" + "="*70)
-        print("SYSTEM STATISTICS SUMMARY")
-        print("="*70)
+    def summary_statistics(self) -> Dict[str, Any]:
+        """
+        Overall system statistics
         
-        total_blocks = self.blockchain.get_chain_length() - 1  # Exclude genesis
+        Returns:
+            Transaction count, chain length and validity, counts by action
+            and by status, and the share of successful operations
+        """
+        total_blocks = 0  # Transactions (batch blocks count once per file)
         
         # Count by action type
         action_counts = {'CREATE': 0, 'READ': 0, 'WRITE': 0, 'DELETE': 0}
         status_counts = {'SUCCESS': 0, 'DENIED': 0, 'FAILED': 0}
         
-        for block in self.blockchain.chain[1:]:
-            if isinstance(block.data, dict):
-                action = block.data.get('action')
-                status = block.data.get('status')
-                
-                if action in action_counts:
-                    action_counts[action] += 1
-                if status in status_counts:
-                    status_counts[status] += 1
+        for _, tx in self._iter_transactions():
+            total_blocks += 1
+            action = tx.get('action')
+            status = tx.get('status')
+            
+            if action in action_counts:
+                action_counts[action] += 1
+            if status in status_counts:
+                status_counts[status] += 1
+        
+        # Security metrics
+        security_rate = (status_counts['SUCCESS'] / total_blocks * 100) if total_blocks > 0 else 100
+        
+        return {
+            "total_transactions": total_blocks,
+            "chain_length": self.blockchain.get_chain_length(),
+            "chain_valid": self.blockchain.validate_chain(),
+            "actions": action_counts,
+            "statuses": status_counts,
+            "success_rate": security_rate
+        }
+    
+    def generate_summary_statistics(self):
+        """Generate overall system statistics"""
+        print("\n" + "="*70)
+        print("SYSTEM STATISTICS SUMMARY")
+        print("="*70)
+        
+        stats = self.summary_statistics()
+        total_blocks = stats["total_transactions"]
         
         print(f"\nTotal Transactions: {total_blocks}")
-        print(f"Blockchain Length: {self.blockchain.get_chain_length()} blocks")
-        print(f"Chain Valid: {'✓ YES' if self.blockchain.validate_chain() else '✗ NO'}")
+        print(f"Blockchain Length: {stats['chain_length']} blocks")
+        print(f"Chain Valid: {'✓ YES' if stats['chain_valid'] else '✗ NO'}")
         
         print("\nOperations by Type:")
-        for action, count in action_counts.items():
+        for action, count in stats["actions"].items():
             print(f"  • {action}: {count}")
         
         print("\nOperations by Status:")
-        for status, count in status_counts.items():
+        for status, count in stats["statuses"].items():
             if count > 0:
                 percentage = (count / total_blocks * 100) if total_blocks > 0 else 0
                 print(f"  • {status}: {count} ({percentage:.1f}%)")
         
-        # Security metrics
-        security_rate = (status_counts['SUCCESS'] / total_blocks * 100) if total_blocks > 0 else 100
-        print(f"\n Security Success Rate: {security_rate:.1f}%")
+        print(f"\n Security Success Rate: {stats['success_rate']:.1f}%")
         
         print("="*70 + "\n")
     
@@ -323,20 +693,25 @@ class AuditReporter:
         """Export report to JSON file"""
         if report_type == 'file_access':
             data = self.query_file_access(kwargs.get('file_id'))
+        elif report_type == 'recent_access':
+            data = self.recent_file_access(kwargs.get('file_id'), kwargs.get('count'))
         elif report_type == 'user_activity':
             data = self.query_user_activity(kwargs.get('user_id'))
         elif report_type == 'security':
             data = self.query_denied_access()
         elif report_type == 'timeline':
             data = self.query_timeline(kwargs.get('start_time'), kwargs.get('end_time'))
+        elif report_type == 'stats':
+            data = self.summary_statistics()
         else:
-            print(f"Unknown report type: {report_type}")
+            logger.error("Unknown report type: %s", report_type)
             return
         
         with open(filename, 'w') as f:
             json.dump(data, f, indent=2)
         
-        print(f"✓ Report exported to {filename}")
+        logger.info("Report exported to %s", filename,
+                    extra={"event": "report_exported", "report_type": report_type})
     
     def export_blockchain_to_csv(self, filename: str = "blockchain_audit.csv"):
         """Export entire blockchain to CSV"""
@@ -346,19 +721,18 @@ class AuditReporter:
             writer = csv.writer(f)
             writer.writerow(['Block', 'Timestamp', 'User', 'Action', 'File', 'Status', 'Hash'])
             
-            for block in self.blockchain.chain[1:]:
-                if isinstance(block.data, dict):
-                    writer.writerow([
-                        block.index,
-                        block.timestamp,
-                        block.data.get('user_id', 'N/A'),
-                        block.data.get('action', 'N/A'),
-                        block.data.get('file_id', 'N/A'),
-                        block.data.get('status', 'N/A'),
-                        block.hash[:16] + '...'
-                    ])
-        
-        print(f"✓ Blockchain exported to {filename}")
+            for block, tx in self._iter_transactions():
+                writer.writerow([
+                    block.index,
+                    block.timestamp,
+                    tx.get('user_id', 'N/A'),
+                    tx.get('action', 'N/A'),
+                    tx.get('file_id', 'N/A'),
+                    tx.get('status', 'N/A'),
+                    block.hash[:16] + '...'
+                ])
+        
+        logger.info("Blockchain exported to %s", filename, extra={"event": "chain_exported"})
 
 
 # ============================================
@@ -367,6 +741,8 @@ class AuditReporter:
 
 if __name__ == "__main__":
     """Demo audit and reporting"""
+    import log_config
+    log_config.configure(use_queue=False)
     from blockchain import Blockchain
     from file_manager import UserManager, FileManager
     from access_control import AccessControl
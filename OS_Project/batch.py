@@ -0,0 +1,309 @@
+"""
+============================================
+OS Project: Batch Operations
+Scripted, non-interactive operations with JSON results
+============================================
+
+A BatchRunner owns one Blockchain, UserManager and FileManager and runs
+any number of operations against them, so a script pays the start-up
+cost once instead of once per command. Operations and results are plain
+dicts (one JSON object per line on the command line):
+    
+    {"op": "create", "user_id": "user001", "file_id": "a.txt", "content": "hi"}
+    {"op": "read", "user_id": "guest001", "file_id": "a.txt"}
+    {"op": "report", "report": "security"}
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+from blockchain import Blockchain
+from file_manager import UserManager, FileManager
+from access_control import AccessControl
+from audit_reports import AuditReporter
+
+REPORTS = ("file_access", "recent_access", "user_activity", "security", "timeline", "stats")
+
+
+class BatchRunner:
+    """Executes operation dicts against a single long-lived system"""
+    
+    def __init__(self, ledger: Optional[str] = None, files_dir: str = "./files",
+                 flush_every: int = 1000, export_dir: str = "./exports"):
+        """
+        Initialize batch runner
+        
+        Args:
+            ledger: Audit ledger. A .jsonl file is a persisted LedgerStore that
+                    is reopened now and appended to as blocks are added; any
+                    other file is blockchain JSON, loaded now (if present) and
+                    saved by close()
+            files_dir: Directory for managed files
+            flush_every: Save file metadata after this many changes (it is
+                         always saved by flush() and close())
+            export_dir: Directory export operations write into; paths that
+                        resolve outside it are refused
+        """
+        self.ledger = ledger
+        self.export_dir = export_dir
+        self.flush_every = flush_every
+        
+        self.ledger_store = None
+        if ledger and ledger.endswith(".jsonl"):
+            from ledger_store import LedgerStore
+            self.ledger_store = LedgerStore(ledger)
+            self.blockchain = self.ledger_store.open()
+        else:
+            self.blockchain = Blockchain()
+            if ledger and os.path.exists(ledger):
+                self.blockchain.load_from_file(ledger)
+        self.user_manager = UserManager()
+        self.file_manager = FileManager(self.blockchain, self.user_manager, files_dir=files_dir)
+        self.access_control = AccessControl(self.user_manager, self.file_manager, self.blockchain)
+        self.file_manager.access_control = self.access_control
+        self.audit_reporter = AuditReporter(self.blockchain, self.user_manager)
+        
+        # Metadata is rewritten in full on every save, so batch the saves
+        self.file_manager.autosave_metadata = False
+        self._changes = 0
+        self._lock = threading.Lock()  # Guards the change counter and flushes
+        
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "create": self._create,
+            "read": self._read,
+            "write": self._write,
+            "delete": self._delete,
+            "list": self._list,
+            "report": self._report,
+            "validate": self._validate,
+            "export": self._export
+        }
+    
+    # ============================================
+    # Execution
+    # ============================================
+    
+    def execute(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run one operation
+        
+        Args:
+            op: {"op": name, ...fields}; an optional "id" is echoed back
+        
+        Returns:
+            {"op", "ok", ...result fields}; invalid operations get "error"
+            instead of raising, so one bad line does not stop a batch
+        """
+        name = op.get("op")
+        result: Dict[str, Any] = {"op": name}
+        if "id" in op:
+            result["id"] = op["id"]
+        
+        start = time.perf_counter()
+        try:
+            if "parse_error" in op:
+                raise ValueError(op["parse_error"])
+            handler = self.handlers.get(name)
+            if handler is None:
+                raise ValueError(f"Unknown operation: {name}")
+            result.update(handler(op))
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            message = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+            result.update(ok=False, error=message)
+        result["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+    
+    def run(self, ops: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Run operations in order, yielding each result as soon as it is ready"""
+        for op in ops:
+            yield self.execute(op)
+    
+    def _changed(self):
+        """Count a metadata change and flush every flush_every changes"""
+        with self._lock:
+            self._changes += 1
+            due = self._changes >= self.flush_every
+        if due:
+            self.flush()
+    
+    def flush(self):
+        """Persist file metadata changed since the last flush"""
+        with self._lock:
+            self._changes = 0
+            if self.file_manager.metadata_dirty:
+                self.file_manager.save_metadata()
+    
+    def close(self):
+        """Flush metadata and save (or checkpoint and close) the ledger"""
+        self.flush()
+        self.file_manager.flush_throttle_summary(force=True)
+        if self.ledger_store:
+            self.ledger_store.close()
+            self.ledger_store = None
+        elif self.ledger:
+            self.blockchain.save_to_file(self.ledger)
+    
+    # ============================================
+    # Operations
+    # ============================================
+    
+    def _create(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        ok = self.file_manager.create_file(op["file_id"], op["user_id"], op.get("content", ""),
+                                           op.get("permissions", "private"))
+        if ok:
+            self._changed()
+        return {"ok": bool(ok)}
+    
+    def _read(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        content = self.file_manager.read_file(op["file_id"], op["user_id"])
+        return {"ok": content is not None, "content": content}
+    
+    def _write(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        ok = self.file_manager.write_file(op["file_id"], op["user_id"], op["content"])
+        if ok:
+            self._changed()
+        return {"ok": bool(ok)}
+    
+    def _delete(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        ok = self.file_manager.delete_file(op["file_id"], op["user_id"])
+        if ok:
+            self._changed()
+        return {"ok": bool(ok)}
+    
+    def _list(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        files = []
+        for file_id in self.file_manager.list_files(op.get("user_id", "")):
+            meta = self.file_manager.get_file_metadata(file_id)
+            if meta:
+                files.append({"file_id": file_id, "owner_id": meta.owner_id,
+                              "permissions": meta.permissions})
+        return {"ok": True, "files": files}
+    
+    def _report_data(self, op: Dict[str, Any]) -> Any:
+        report = op.get("report", "stats")
+        reporter = self.audit_reporter
+        if report == "file_access":
+            return reporter.query_file_access(op["file_id"], op.get("offset", 0), op.get("limit"))
+        if report == "recent_access":
+            return reporter.recent_file_access(op["file_id"], op.get("limit"))
+        if report == "user_activity":
+            return reporter.query_user_activity(op["user_id"], op.get("offset", 0),
+                                                op.get("limit"))
+        if report == "security":
+            return reporter.query_denied_access()
+        if report == "timeline":
+            return reporter.query_timeline(op.get("start_time"), op.get("end_time"))
+        if report == "stats":
+            return reporter.summary_statistics()
+        raise ValueError(f"Unknown report: {report} (expected one of {', '.join(REPORTS)})")
+    
+    def _report(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        return {"ok": True, "report": op.get("report", "stats"), "data": self._report_data(op)}
+    
+    def _validate(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        return {"ok": self.blockchain.validate_chain(),
+                "blocks": self.blockchain.get_chain_length()}
+    
+    def _export_path(self, name: str) -> str:
+        """Resolve an export path inside export_dir (operations may come from clients)"""
+        root = os.path.realpath(self.export_dir)
+        path = os.path.realpath(os.path.join(root, name))
+        if os.path.commonpath([root, path]) != root or path == root:
+            raise ValueError(f"Export path must stay inside {self.export_dir}: {name}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+    
+    def _export(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        fmt = op.get("format", "csv")
+        path = self._export_path(op.get("path") or f"blockchain_audit.{fmt}")
+        if fmt == "csv":
+            self.audit_reporter.export_blockchain_to_csv(path)
+        elif fmt == "json":
+            from file_manager import atomic_write
+            atomic_write(path, json.dumps(self._report_data(op), indent=2), fsync=False)
+        else:
+            raise ValueError(f"Unknown export format: {fmt}")
+        return {"ok": True, "path": path}
+
+
+# ============================================
+# JSON Lines I/O
+# ============================================
+
+def read_operations(stream, default_op: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Parse one JSON operation per line (blank lines and # comments skipped)
+    
+    Args:
+        stream: Text stream to read
+        default_op: Operation for lines without an "op" field
+    
+    Unparseable lines come through as {"op": None, "parse_error": ...} so the
+    runner reports them in place instead of aborting the batch.
+    """
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            op = json.loads(line)
+            if not isinstance(op, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            yield {"op": None, "id": f"line {number}", "parse_error": str(e)}
+            continue
+        if default_op and "op" not in op:
+            op["op"] = default_op
+        yield op
+
+
+def write_results(results: Iterable[Dict[str, Any]], stream) -> Dict[str, int]:
+    """
+    Write one JSON result per line
+    
+    Returns:
+        Counts of operations, successes, refusals and errors
+    """
+    totals = {"operations": 0, "ok": 0, "refused": 0, "errors": 0}
+    for result in results:
+        stream.write(json.dumps(result, default=str) + "\n")
+        totals["operations"] += 1
+        if result.get("ok"):
+            totals["ok"] += 1
+        elif "error" in result:
+            totals["errors"] += 1
+        else:
+            totals["refused"] += 1
+    stream.flush()
+    return totals
+
+
+# ============================================
+# Demo
+# ============================================
+
+if __name__ == "__main__":
+    """Demo a scripted batch"""
+    import io
+    import sys
+    import log_config
+    log_config.configure(level="WARNING", stream=sys.stderr, use_queue=False)
+    
+    script = io.StringIO("\n".join([
+        '{"op": "create", "user_id": "user001", "file_id": "batch_demo.txt", "content": "v1"}',
+        '{"op": "read", "user_id": "guest001", "file_id": "batch_demo.txt"}',
+        '{"op": "write", "user_id": "user001", "file_id": "batch_demo.txt", "content": "v2"}',
+        '{"op": "read", "user_id": "user001", "file_id": "batch_demo.txt"}',
+        '{"op": "report", "report": "security"}',
+        '{"op": "frobnicate"}',
+        '{"op": "delete", "user_id": "user001", "file_id": "batch_demo.txt"}',
+        '{"op": "validate"}'
+    ]))
+    
+    runner = BatchRunner()
+    totals = write_results(runner.run(read_operations(script)), sys.stdout)
+    runner.close()
+    print(f"\n✓ {totals['operations']} operations: {totals['ok']} ok, "
+          f"{totals['refused']} refused, {totals['errors']} errors", file=sys.stderr)
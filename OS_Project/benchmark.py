@@ -0,0 +1,932 @@
+"""
+============================================
+OS Project: Benchmarks
+Performance measurements for the file access control system
+============================================
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+import timeit
+from datetime import datetime
+from typing import Dict, List
+
+from file_manager import shard_path
+
+
+@contextlib.contextmanager
+def scratch_system(**file_manager_options):
+    """
+    Build a fresh system in a temporary working directory
+    
+    users.json and file_metadata.json are written to the current directory,
+    so every benchmark runs in its own scratch directory.
+    
+    Yields:
+        (blockchain, user_manager, file_manager, access_control)
+    """
+    from blockchain import Blockchain
+    from file_manager import UserManager, FileManager
+    from access_control import AccessControl
+    
+    previous_dir = os.getcwd()
+    root = tempfile.mkdtemp(prefix="bench_system_")
+    os.chdir(root)
+    try:
+        bc = Blockchain()
+        um = UserManager()
+        fm = FileManager(bc, um, **file_manager_options)
+        ac = AccessControl(um, fm, bc)
+        fm.access_control = ac
+        yield bc, um, fm, ac
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the pct-th percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (seconds) in microseconds"""
+    return {
+        "count": len(samples),
+        "mean_us": (sum(samples) / len(samples) * 1e6) if samples else 0.0,
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+    }
+
+
+# ============================================
+# Storage Layout Benchmark
+# ============================================
+
+def bench_layout(file_count: int, shard_levels: int, sample_size: int = 10000) -> Dict[str, Dict]:
+    """
+    Measure create and open latency for one files_dir layout
+    
+    Args:
+        file_count: Number of files to create
+        shard_levels: 0 for the flat layout, >0 for hashed fan-out
+        sample_size: Number of random files to re-open
+    
+    Returns:
+        Latency summaries for 'create' and 'open'
+    """
+    root = tempfile.mkdtemp(prefix=f"bench_layout_{shard_levels}_")
+    known_dirs = set()
+    create_times = []
+    
+    try:
+        for i in range(file_count):
+            path = shard_path(root, f"file_{i}.txt", shard_levels)
+            start = time.perf_counter()
+            directory = os.path.dirname(path)
+            if directory not in known_dirs:
+                os.makedirs(directory, exist_ok=True)
+                known_dirs.add(directory)
+            with open(path, 'w') as f:
+                f.write("x")
+            create_times.append(time.perf_counter() - start)
+        
+        open_times = []
+        for i in random.sample(range(file_count), min(sample_size, file_count)):
+            path = shard_path(root, f"file_{i}.txt", shard_levels)
+            start = time.perf_counter()
+            with open(path, 'r') as f:
+                f.read()
+            open_times.append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    
+    return {"create": summarize(create_times), "open": summarize(open_times)}
+
+
+def run_layout_benchmark(file_count: int, shard_levels: int = 2):
+    """Compare the flat layout against the sharded layout"""
+    print(f"\nStorage layout benchmark: {file_count} files")
+    print(f"{'Layout':<12} {'Op':<8} {'Mean (us)':>10} {'p50 (us)':>10} {'p99 (us)':>10}")
+    print("-" * 54)
+    
+    for label, levels in [("flat", 0), (f"sharded/{shard_levels}", shard_levels)]:
+        results = bench_layout(file_count, levels)
+        for op, stats in results.items():
+            print(f"{label:<12} {op:<8} {stats['mean_us']:>10.1f} "
+                  f"{stats['p50_us']:>10.1f} {stats['p99_us']:>10.1f}")
+
+
+# ============================================
+# Async Load Test
+# ============================================
+
+def bench_async(clients: int = 1000, ops_per_client: int = 10, max_workers: int = 8) -> Dict:
+    """
+    Drive AsyncFileManager with many concurrent clients
+    
+    Each client creates its own file, then alternates reads and writes.
+    
+    Returns:
+        Throughput, latency summary and number of metadata saves
+    """
+    from async_file_manager import AsyncFileManager
+    
+    latencies = []
+    
+    async def client(afm, n: int):
+        file_id = f"client_{n}.txt"
+        start = time.perf_counter()
+        await afm.create(file_id, "user001", "initial")
+        latencies.append(time.perf_counter() - start)
+        for i in range(ops_per_client - 1):
+            start = time.perf_counter()
+            if i % 2:
+                await afm.write(file_id, "user001", f"update {i}")
+            else:
+                await afm.read(file_id, "user001")
+            latencies.append(time.perf_counter() - start)
+    
+    async def run(fm):
+        afm = AsyncFileManager(fm, max_workers=max_workers)
+        start = time.perf_counter()
+        await asyncio.gather(*[client(afm, n) for n in range(clients)])
+        elapsed = time.perf_counter() - start
+        await afm.close()
+        return elapsed, afm.flush_count
+    
+    with scratch_system() as (bc, um, fm, ac):
+        elapsed, flushes = asyncio.run(run(fm))
+        chain_valid = bc.validate_chain()
+    
+    total_ops = clients * ops_per_client
+    return {
+        "clients": clients,
+        "operations": total_ops,
+        "seconds": elapsed,
+        "ops_per_second": total_ops / elapsed if elapsed else 0.0,
+        "latency": summarize(latencies),
+        "metadata_saves": flushes,
+        "chain_valid": chain_valid
+    }
+
+
+def run_async_benchmark(clients: int, ops_per_client: int, max_workers: int):
+    """Print async load test results"""
+    result = bench_async(clients, ops_per_client, max_workers)
+    print(f"\nAsync load test: {result['clients']} concurrent clients, "
+          f"{result['operations']} operations")
+    print(f"  Throughput:      {result['ops_per_second']:.0f} ops/s")
+    print(f"  Latency p50/p99: {result['latency']['p50_us'] / 1000:.1f} / "
+          f"{result['latency']['p99_us'] / 1000:.1f} ms")
+    print(f"  Metadata saves:  {result['metadata_saves']} "
+          f"(vs {result['clients'] + result['operations'] // 2} unbatched)")
+    print(f"  Chain valid:     {result['chain_valid']}")
+
+
+# ============================================
+# Concurrency Stress Harness
+# ============================================
+
+def stress_file_manager(files: int = 8, writers: int = 4, readers: int = 8,
+                        seconds: float = 3.0, fsync_writes: bool = False) -> Dict:
+    """
+    Hammer FileManager with concurrent readers and writers
+    
+    Every write stores one token repeated many times; a read that sees
+    mixed tokens or a short/empty body is a torn read.
+    
+    Returns:
+        Operation counts, torn reads and chain validity
+    """
+    import threading
+    
+    repeat = 2000
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0, "torn": 0}
+    counts_lock = threading.Lock()
+    
+    def is_intact(content: str) -> bool:
+        if not content:
+            return False
+        token = content.split("|", 1)[0] + "|"
+        return len(content) == len(token) * repeat and content == token * repeat
+    
+    def writer(n: int, fm):
+        seq = 0
+        while not stop.is_set():
+            file_id = f"stress_{random.randrange(files)}.txt"
+            fm.write_file(file_id, "admin001", f"w{n}-{seq}|" * repeat)
+            seq += 1
+            with counts_lock:
+                counts["writes"] += 1
+    
+    def reader(fm):
+        while not stop.is_set():
+            file_id = f"stress_{random.randrange(files)}.txt"
+            content = fm.read_file(file_id, "admin001")
+            with counts_lock:
+                counts["reads"] += 1
+                if not is_intact(content):
+                    counts["torn"] += 1
+    
+    with scratch_system(fsync_writes=fsync_writes) as (bc, um, fm, ac):
+        for i in range(files):
+            fm.create_file(f"stress_{i}.txt", "admin001", "init|" * repeat)
+        
+        threads = [threading.Thread(target=writer, args=(n, fm)) for n in range(writers)]
+        threads += [threading.Thread(target=reader, args=(fm,)) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        
+        counts["chain_valid"] = bc.validate_chain()
+        counts["blocks"] = bc.get_chain_length()
+    
+    return counts
+
+
+def run_stress(files: int, writers: int, readers: int, seconds: float, fsync_writes: bool) -> bool:
+    """Print stress results; returns True if no torn reads were seen"""
+    result = stress_file_manager(files, writers, readers, seconds, fsync_writes)
+    print(f"\nConcurrency stress: {writers} writers, {readers} readers, "
+          f"{files} files, {seconds:.1f}s")
+    print(f"  Reads:       {result['reads']}")
+    print(f"  Writes:      {result['writes']}")
+    print(f"  Torn reads:  {result['torn']}")
+    print(f"  Chain valid: {result['chain_valid']} ({result['blocks']} blocks)")
+    
+    ok = result['torn'] == 0 and result['chain_valid']
+    print(f"  Result:      {'✓ PASS' if ok else '✗ FAIL'}")
+    return ok
+
+
+# ============================================
+# Policy Evaluation Benchmark
+# ============================================
+
+def bench_policy(role_count: int = 10000, acl_entries: int = 1000000,
+                 samples: int = 100000) -> Dict:
+    """
+    Measure Policy.evaluate latency on a large synthetic policy
+    
+    Roles inherit from the previous role in chains of 10; ACL entries are
+    spread over files with 10 principals each (half users, half groups).
+    
+    Returns:
+        Compile time and evaluation latency summary
+    """
+    from policy import ACTIONS, Policy
+    
+    values = [True, False, 'own', 'public', 'own_or_public']
+    roles = {}
+    for r in range(role_count):
+        spec = {"permissions": {a: random.choice(values) for a in ACTIONS}}
+        if r % 10:
+            spec["inherits"] = [f"role_{r - 1}"]
+        roles[f"role_{r}"] = spec
+    
+    users = [f"user_{u}" for u in range(10000)]
+    groups = {f"group_{g}": {"members": random.sample(users, 10),
+                             "roles": [f"role_{random.randrange(role_count)}"]}
+              for g in range(1000)}
+    
+    file_count = max(1, acl_entries // 10)
+    acl = {}
+    for f in range(file_count):
+        entries = {}
+        for p in range(10):
+            principal = f"group:group_{random.randrange(1000)}" if p % 2 else random.choice(users)
+            entries[principal] = random.sample(ACTIONS, 2)
+        acl[f"file_{f}"] = entries
+    
+    start = time.perf_counter()
+    policy = Policy.from_dict({"roles": roles, "groups": groups, "acl": acl})
+    compile_seconds = time.perf_counter() - start
+    
+    queries = [(random.choice(users), f"role_{random.randrange(role_count)}",
+                f"file_{random.randrange(file_count)}", random.choice(ACTIONS),
+                random.random() < 0.5, random.random() < 0.5)
+               for _ in range(samples)]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        policy.evaluate(*query)
+        latencies.append(time.perf_counter() - start)
+    
+    return {
+        "roles": role_count,
+        "acl_entries": sum(len(e) for e in acl.values()),
+        "compile_seconds": compile_seconds,
+        "evaluate": summarize(latencies)
+    }
+
+
+def run_policy_benchmark(role_count: int, acl_entries: int):
+    """Print policy evaluation benchmark results"""
+    result = bench_policy(role_count, acl_entries)
+    stats = result["evaluate"]
+    print(f"\nPolicy benchmark: {result['roles']} roles, {result['acl_entries']} ACL entries")
+    print(f"  Compile time:         {result['compile_seconds']:.2f} s")
+    print(f"  Evaluate mean/p50/p99: {stats['mean_us']:.2f} / {stats['p50_us']:.2f} / "
+          f"{stats['p99_us']:.2f} us")
+
+
+# ============================================
+# Anomaly Detector Overhead Benchmark
+# ============================================
+
+def bench_detector(blocks: int = 100000, users: int = 1000, files: int = 10000) -> Dict:
+    """
+    Measure add_block latency with and without an attached AnomalyDetector
+    
+    Returns:
+        Latency summaries for both runs, plus alerts raised
+    """
+    from blockchain import Blockchain
+    from anomaly_detector import AnomalyDetector
+    
+    transactions = [{
+        "action": random.choice(["READ", "WRITE"]),
+        "file_id": f"file_{random.randrange(files)}",
+        "user_id": f"user_{random.randrange(users)}",
+        "status": "DENIED" if random.random() < 0.1 else "SUCCESS",
+        "timestamp": "2024-01-01T00:00:00"
+    } for _ in range(blocks)]
+    
+    results = {}
+    for label in ("baseline", "detector"):
+        bc = Blockchain()
+        detector = AnomalyDetector()
+        if label == "detector":
+            detector.attach(bc)
+        latencies = []
+        for tx in transactions:
+            start = time.perf_counter()
+            bc.add_block(tx)
+            latencies.append(time.perf_counter() - start)
+        results[label] = summarize(latencies)
+        results[label + "_alerts"] = len(detector.alerts)
+    return results
+
+
+def run_detector_benchmark(blocks: int):
+    """Print anomaly detector overhead"""
+    result = bench_detector(blocks)
+    print(f"\nAnomaly detector overhead: {blocks} blocks")
+    for label in ("baseline", "detector"):
+        stats = result[label]
+        print(f"  {label:<10} add_block mean/p50/p99: {stats['mean_us']:.1f} / "
+              f"{stats['p50_us']:.1f} / {stats['p99_us']:.1f} us")
+    overhead = result["detector"]["mean_us"] - result["baseline"]["mean_us"]
+    print(f"  Overhead per append: {overhead:.1f} us ({result['detector_alerts']} alerts)")
+
+
+# ============================================
+# Partitioned Ledger Benchmark
+# ============================================
+
+def bench_partitions(threads: int = 8, blocks_per_thread: int = 20000,
+                     partitions: int = 8) -> Dict[str, float]:
+    """
+    Append throughput from concurrent threads: one chain vs partitioned ledger
+    
+    Returns:
+        Blocks per second for each configuration
+    """
+    import threading
+    from blockchain import Blockchain
+    from partitioned_ledger import PartitionedLedger
+    
+    results = {}
+    for label in ("single", "partitioned"):
+        ledger = Blockchain() if label == "single" else PartitionedLedger(partitions)
+        
+        def append(worker: int):
+            for i in range(blocks_per_thread):
+                ledger.add_block({"action": "READ", "file_id": f"file_{worker}_{i % 1000}",
+                                  "user_id": f"user_{worker}", "status": "SUCCESS"})
+        
+        workers = [threading.Thread(target=append, args=(w,)) for w in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        results[label] = threads * blocks_per_thread / (time.perf_counter() - start)
+    return results
+
+
+def run_partition_benchmark(threads: int, blocks_per_thread: int, partitions: int):
+    """Print partitioned ledger append throughput"""
+    result = bench_partitions(threads, blocks_per_thread, partitions)
+    print(f"\nAppend throughput: {threads} threads x {blocks_per_thread} blocks")
+    print(f"  Single chain:             {result['single']:,.0f} blocks/s")
+    print(f"  {partitions} partitions:             {result['partitioned']:,.0f} blocks/s")
+
+
+# ============================================
+# Instrumentation Overhead
+# ============================================
+
+def bench_metrics(operations: int = 2000) -> Dict[str, Dict]:
+    """
+    FileManager read and add_block latency with metrics disabled vs enabled
+    
+    Returns:
+        {'disabled': {...}, 'enabled': {...}} latency summaries per operation
+    """
+    import metrics
+    
+    results = {}
+    for label in ("disabled", "enabled"):
+        if label == "enabled":
+            metrics.enable()
+        try:
+            with scratch_system(fsync_writes=False) as (bc, um, fm, ac):
+                fm.create_file("hot.txt", "user001", "x" * 256)
+                reads, appends = [], []
+                for i in range(operations):
+                    start = time.perf_counter()
+                    fm.read_file("hot.txt", "user001")
+                    reads.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    bc.add_block(synthetic_transaction(i))
+                    appends.append(time.perf_counter() - start)
+            results[label] = {"read_file": summarize(reads), "add_block": summarize(appends)}
+        finally:
+            metrics.disable()
+    return results
+
+
+def run_metrics_benchmark(operations: int):
+    """Print instrumentation overhead"""
+    result = bench_metrics(operations)
+    print(f"\nInstrumentation overhead: {operations} operations")
+    for op in ("read_file", "add_block"):
+        off, on = result["disabled"][op], result["enabled"][op]
+        print(f"  {op:<10} p50 disabled {off['p50_us']:.1f} us, enabled {on['p50_us']:.1f} us "
+              f"({on['p50_us'] - off['p50_us']:+.1f} us)")
+
+
+# ============================================
+# Logging Overhead
+# ============================================
+
+def bench_logging(operations: int = 5000) -> Dict[str, Dict]:
+    """
+    FileManager.read_file latency under different logging setups
+    
+    Log lines go to a real file (flushed per record, like a console), so
+    'sync' pays the I/O on the calling thread and 'queued' hands it to
+    the listener thread.
+    
+    Returns:
+        Latency summary per setup
+    """
+    import log_config
+    
+    setups = {
+        "sync console, INFO": dict(level="INFO", fmt="console", use_queue=False),
+        "queued console, INFO": dict(level="INFO", fmt="console", use_queue=True),
+        "queued JSON, INFO": dict(level="INFO", fmt="json", use_queue=True),
+        "queued JSON, WARNING": dict(level="WARNING", fmt="json", use_queue=True),
+    }
+    results = {}
+    log_file = tempfile.NamedTemporaryFile("w", suffix=".log", delete=False)
+    try:
+        for label, options in setups.items():
+            log_config.configure(stream=log_file, **options)
+            with scratch_system(fsync_writes=False) as (bc, um, fm, ac):
+                fm.create_file("hot.txt", "user001", "x" * 256)
+                samples = []
+                for _ in range(operations):
+                    start = time.perf_counter()
+                    fm.read_file("hot.txt", "user001")
+                    samples.append(time.perf_counter() - start)
+            log_config.flush()
+            results[label] = summarize(samples)
+    finally:
+        log_config.shutdown()
+        log_file.close()
+        os.remove(log_file.name)
+    return results
+
+
+def run_logging_benchmark(operations: int):
+    """Print logging overhead per setup"""
+    print(f"\nread_file latency by logging setup: {operations} operations")
+    for label, stats in bench_logging(operations).items():
+        print(f"  {label:<22} mean {stats['mean_us']:.1f} us, p50 {stats['p50_us']:.1f} us, "
+              f"p99 {stats['p99_us']:.1f} us")
+
+
+# ============================================
+# Cold Start
+# ============================================
+
+def _launch_to_prompt(command: List[str], cwd: str):
+    """Start main.py, wait for its first menu prompt, then exit it"""
+    import subprocess
+    
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output = b""
+    while b"Enter your choice:" not in output:
+        chunk = process.stdout.read1(65536)
+        if not chunk:
+            raise ValueError("main.py exited before showing its menu")
+        output += chunk
+    elapsed = time.perf_counter() - start
+    _, errors = process.communicate(b"0\n")
+    return elapsed, errors.decode()
+
+
+def bench_startup(files: int = 200000, runs: int = 5) -> Dict:
+    """
+    Time from launching main.py to its first menu prompt
+    
+    main.py runs in a scratch directory whose file_metadata.json lists
+    files entries. One extra run with -X importtime attributes the
+    import cost.
+    
+    Returns:
+        Time-to-prompt summary and the slowest top-level imports (us)
+    """
+    import sys
+    
+    main_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    root = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        now = datetime.now().isoformat()
+        with open(os.path.join(root, "file_metadata.json"), "w") as f:
+            json.dump({f"file_{i}.txt": {"file_id": f"file_{i}.txt", "owner_id": "user001",
+                                         "permissions": "private", "content_hash": None,
+                                         "created": now, "last_modified": now}
+                       for i in range(files)}, f)
+        
+        samples = [_launch_to_prompt([sys.executable, main_py], root)[0]
+                   for _ in range(runs)]
+        _, trace = _launch_to_prompt([sys.executable, "-X", "importtime", main_py], root)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    
+    # "import time: self [us] | cumulative | imported package"; top level = no indent
+    imports = {}
+    for line in trace.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit() and not name.startswith("  "):
+                imports[name.strip()] = int(cumulative)
+    slowest = dict(sorted(imports.items(), key=lambda item: -item[1])[:8])
+    return {"files": files, "to_prompt": summarize(samples), "imports_us": slowest}
+
+
+def run_startup_benchmark(files: int, runs: int):
+    """Print time to first prompt and the import breakdown"""
+    result = bench_startup(files, runs)
+    stats = result["to_prompt"]
+    print(f"\nmain.py launch to first prompt, {files:,} files in metadata ({runs} runs)")
+    print(f"  median {stats['p50_us'] / 1000:.1f} ms, mean {stats['mean_us'] / 1000:.1f} ms")
+    print("  Slowest top-level imports (cumulative, -X importtime):")
+    for name, micros in result["imports_us"].items():
+        print(f"    {name:<20} {micros / 1000:6.1f} ms")
+
+
+# ============================================
+# Indexed Reports
+# ============================================
+
+def bench_reports(blocks: int = 200000, users: int = 1000, page_size: int = 50,
+                  queries: int = 200) -> Dict:
+    """
+    User and file report cost: full-chain scan vs the activity index
+    
+    A user query fetches one page of a random user's events plus their
+    success/denied counts, as generate_user_activity_report does; a file
+    query fetches a random file's recent accesses.
+    
+    Returns:
+        Latency summaries per mode and query, and the one-off index build time
+    """
+    from blockchain import Blockchain
+    from file_manager import UserManager
+    from audit_reports import AuditReporter
+    
+    bc = Blockchain()
+    for i in range(blocks):
+        bc.add_block(synthetic_transaction(i, users=users))
+    user_manager = UserManager()
+    targets = [(f"user_{random.randrange(users)}", f"file_{random.randrange(1000)}.txt")
+               for _ in range(queries)]
+    
+    results = {}
+    indexed = AuditReporter(bc, user_manager)
+    start = time.perf_counter()
+    indexed.user_activity_counts("user_0")
+    results["index_build_s"] = time.perf_counter() - start
+    
+    scanning = AuditReporter(bc, user_manager)
+    scanning.indexable = False  # Force the pre-index code path
+    for label, reporter, count in (("scan", scanning, min(queries, 5)),
+                                   ("index", indexed, queries)):
+        user_latencies, file_latencies = [], []
+        for user_id, file_id in targets[:count]:
+            start = time.perf_counter()
+            reporter.user_activity_counts(user_id)
+            reporter.query_user_activity(user_id, 0, page_size)
+            user_latencies.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            reporter.recent_file_access(file_id)
+            file_latencies.append(time.perf_counter() - start)
+        results[label] = summarize(user_latencies)
+        results[label + "_recent"] = summarize(file_latencies)
+    return results
+
+
+def run_reports_benchmark(blocks: int):
+    """Print user and file report latency with and without the index"""
+    result = bench_reports(blocks)
+    print(f"\nReport queries on {blocks:,} blocks")
+    for title, suffix in (("User activity (counts + one 50-event page)", ""),
+                          ("Recent accesses to a file (last 20)", "_recent")):
+        print(f"  {title}")
+        for label in ("scan", "index"):
+            stats = result[label + suffix]
+            print(f"    {label:<6} p50 {stats['p50_us'] / 1000:9.3f} ms, "
+                  f"p99 {stats['p99_us'] / 1000:9.3f} ms")
+    print(f"  Index built once in {result['index_build_s']:.2f} s, then kept current per block")
+
+
+# ============================================
+# Ledger & Query Suite (with regression tracking)
+# ============================================
+
+SUITE_SIZES = [1000, 100000, 1000000]
+
+
+def synthetic_transaction(i: int, users: int = 100, files: int = 1000) -> Dict:
+    """A plausible audit record; about 10% of attempts are denied"""
+    denied = i % 10 == 0
+    return {
+        "action": ("CREATE", "READ", "READ", "READ", "WRITE", "DELETE")[i % 6],
+        "file_id": f"file_{(i * 7919) % files}.txt",
+        "user_id": f"user_{i % users}",
+        "status": "DENIED" if denied else "SUCCESS",
+        "reason": "Insufficient permissions" if denied else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def time_call(func, repeat: int = 3) -> Dict[str, float]:
+    """Best of repeat runs of func (seconds)"""
+    return {"seconds": min(timeit.Timer(func).repeat(repeat=repeat, number=1))}
+
+
+def bench_suite_size(size: int, file_ops: int = 1000) -> Dict[str, Dict]:
+    """
+    Measure ledger, query and FileManager costs with a chain of `size` blocks
+    
+    Returns:
+        {metric: {'mean_us', ...} or {'seconds'}} for one chain size
+    """
+    from blockchain import Blockchain
+    from audit_reports import AuditReporter
+    
+    results = {}
+    with scratch_system() as (bc, um, fm, ac):
+        latencies = []
+        for i in range(size):
+            tx = synthetic_transaction(i)
+            start = time.perf_counter()
+            bc.add_block(tx)
+            latencies.append(time.perf_counter() - start)
+        results["add_block"] = summarize(latencies)
+        results["add_block"]["ops_per_s"] = size / sum(latencies)
+        
+        # Whole-chain operations are slow at 1M blocks; repeat fewer times
+        repeat = 3 if size <= 100000 else 1
+        results["validate_chain"] = time_call(bc.validate_chain, repeat)
+        results["save_to_file"] = time_call(lambda: bc.save_to_file("bench_chain.json"), repeat)
+        results["load_from_file"] = time_call(
+            lambda: Blockchain().load_from_file("bench_chain.json"), repeat)
+        os.remove("bench_chain.json")
+        
+        reporter = AuditReporter(bc, um)
+        queries = {
+            "query_file_access": lambda: reporter.query_file_access("file_42.txt"),
+            "query_user_activity": lambda: reporter.query_user_activity("user_7"),
+            "query_denied_access": reporter.query_denied_access,
+            "query_timeline": lambda: reporter.query_timeline(bc.chain[size // 4].timestamp,
+                                                              bc.chain[size // 2].timestamp),
+            "query_actions_by_type": lambda: reporter.query_actions_by_type("WRITE"),
+        }
+        for name, query in queries.items():
+            results[name] = time_call(query, repeat)
+        
+        for op in ("create", "read", "write", "delete"):
+            samples = []
+            for i in range(file_ops):
+                file_id = f"bench_{i}.txt"
+                start = time.perf_counter()
+                if op == "create":
+                    fm.create_file(file_id, "user001", "x" * 256)
+                elif op == "read":
+                    fm.read_file(file_id, "user001")
+                elif op == "write":
+                    fm.write_file(file_id, "user001", "y" * 256)
+                else:
+                    fm.delete_file(file_id, "user001")
+                samples.append(time.perf_counter() - start)
+            results[f"file_{op}"] = summarize(samples)
+    
+    return results
+
+
+def bench_suite(sizes: List[int] = None) -> Dict:
+    """Run the suite at every chain size; returns a JSON-serializable result"""
+    sizes = sizes or SUITE_SIZES
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes
+        },
+        "results": {str(size): bench_suite_size(size) for size in sizes}
+    }
+
+
+def metric_value(stats: Dict[str, float]) -> float:
+    """Single comparable number for a metric, in seconds (lower is better)"""
+    # Median latency: less sensitive to scheduler noise than the mean
+    return stats["p50_us"] / 1e6 if "p50_us" in stats else stats["seconds"]
+
+
+def run_suite(sizes: List[int], output: str):
+    """Run the suite, print a table and write the results as JSON"""
+    report = bench_suite(sizes)
+    for size, metrics in report["results"].items():
+        print(f"\nChain size {int(size):,}")
+        print(f"  {'Metric':<24} {'Time':>14}")
+        for name, stats in metrics.items():
+            if "mean_us" in stats:
+                print(f"  {name:<24} {stats['mean_us']:>11.1f} us  "
+                      f"(p99 {stats['p99_us']:.1f} us)")
+            else:
+                print(f"  {name:<24} {stats['seconds'] * 1000:>11.1f} ms")
+    
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results written to {output}")
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.10) -> List[Dict]:
+    """
+    Compare two suite results metric by metric
+    
+    Args:
+        baseline: Earlier bench_suite() output
+        current: Newer bench_suite() output
+        threshold: Relative slowdown that counts as a regression (0.10 = 10%)
+    
+    Returns:
+        One row per metric present in both runs, with 'regression' set
+    """
+    rows = []
+    for size, metrics in current["results"].items():
+        old_metrics = baseline["results"].get(size, {})
+        for name, stats in metrics.items():
+            if name not in old_metrics:
+                continue
+            old, new = metric_value(old_metrics[name]), metric_value(stats)
+            change = (new - old) / old if old else 0.0
+            rows.append({"size": size, "metric": name, "baseline": old, "current": new,
+                         "change": change, "regression": change > threshold})
+    return rows
+
+
+def run_compare(baseline_file: str, current_file: str, threshold: float) -> bool:
+    """Print a comparison table; returns False if anything regressed"""
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    with open(current_file) as f:
+        current = json.load(f)
+    
+    rows = compare_results(baseline, current, threshold)
+    print(f"\n{'Size':>9} {'Metric':<24} {'Baseline':>12} {'Current':>12} {'Change':>9}")
+    print("-" * 70)
+    for row in rows:
+        flag = "  ✗ REGRESSION" if row["regression"] else ""
+        print(f"{int(row['size']):>9,} {row['metric']:<24} {row['baseline'] * 1e3:>10.3f}ms "
+              f"{row['current'] * 1e3:>10.3f}ms {row['change']:>+8.1%}{flag}")
+    
+    regressions = sum(row["regression"] for row in rows)
+    if regressions:
+        print(f"\n✗ {regressions} regression(s) above {threshold:.0%}")
+    else:
+        print(f"\n✓ No regressions above {threshold:.0%}")
+    return regressions == 0
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="File access control system benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    layout = sub.add_parser("layout", help="flat vs sharded files_dir create/open latency")
+    layout.add_argument("--files", type=int, default=100000, help="files to create (e.g. 1000000)")
+    layout.add_argument("--levels", type=int, default=2, help="shard directory levels")
+    
+    load = sub.add_parser("async", help="AsyncFileManager throughput under concurrent clients")
+    load.add_argument("--clients", type=int, default=1000, help="concurrent clients")
+    load.add_argument("--ops", type=int, default=10, help="operations per client")
+    load.add_argument("--workers", type=int, default=8, help="executor threads")
+    
+    stress = sub.add_parser("stress", help="concurrent readers/writers; fails on torn reads")
+    stress.add_argument("--files", type=int, default=8, help="files shared by all threads")
+    stress.add_argument("--writers", type=int, default=4, help="writer threads")
+    stress.add_argument("--readers", type=int, default=8, help="reader threads")
+    stress.add_argument("--seconds", type=float, default=3.0, help="run time")
+    stress.add_argument("--fsync", action="store_true", help="fsync every write")
+    
+    pol = sub.add_parser("policy", help="policy evaluation latency with many roles and ACLs")
+    pol.add_argument("--roles", type=int, default=10000, help="number of roles")
+    pol.add_argument("--acl", type=int, default=1000000, help="number of ACL entries")
+    
+    det = sub.add_parser("detector", help="add_block latency with the anomaly detector attached")
+    det.add_argument("--blocks", type=int, default=100000, help="blocks to append")
+    
+    part = sub.add_parser("partitions", help="concurrent append throughput, single vs partitioned")
+    part.add_argument("--threads", type=int, default=8, help="appending threads")
+    part.add_argument("--blocks", type=int, default=20000, help="blocks per thread")
+    part.add_argument("--partitions", type=int, default=8, help="ledger partitions")
+    
+    suite = sub.add_parser("suite", help="ledger, query and FileManager costs by chain size")
+    suite.add_argument("--sizes", type=int, nargs="+", default=SUITE_SIZES,
+                       help="chain sizes (default: 1000 100000 1000000)")
+    suite.add_argument("--output", default="bench_results.json", help="JSON results file")
+    
+    comp = sub.add_parser("compare", help="flag regressions between two suite results")
+    comp.add_argument("baseline", help="earlier results JSON")
+    comp.add_argument("current", help="newer results JSON")
+    comp.add_argument("--threshold", type=float, default=0.10,
+                      help="relative slowdown counted as a regression")
+    
+    met = sub.add_parser("metrics", help="latency with instrumentation disabled vs enabled")
+    met.add_argument("--ops", type=int, default=2000, help="operations per run")
+    
+    logs = sub.add_parser("logging", help="operation latency: sync vs queued vs filtered logging")
+    logs.add_argument("--ops", type=int, default=5000, help="operations per setup")
+    
+    start = sub.add_parser("startup", help="main.py time to first prompt with a large data dir")
+    start.add_argument("--files", type=int, default=200000, help="entries in file_metadata.json")
+    start.add_argument("--runs", type=int, default=5)
+    
+    rep = sub.add_parser("reports", help="user and file reports: chain scan vs activity index")
+    rep.add_argument("--blocks", type=int, default=200000, help="chain length")
+    
+    args = parser.parse_args()
+    
+    if args.command == "layout":
+        run_layout_benchmark(args.files, args.levels)
+    elif args.command == "async":
+        run_async_benchmark(args.clients, args.ops, args.workers)
+    elif args.command == "policy":
+        run_policy_benchmark(args.roles, args.acl)
+    elif args.command == "detector":
+        run_detector_benchmark(args.blocks)
+    elif args.command == "partitions":
+        run_partition_benchmark(args.threads, args.blocks, args.partitions)
+    elif args.command == "suite":
+        run_suite(args.sizes, args.output)
+    elif args.command == "compare":
+        if not run_compare(args.baseline, args.current, args.threshold):
+            raise SystemExit(1)
+    elif args.command == "metrics":
+        run_metrics_benchmark(args.ops)
+    elif args.command == "logging":
+        run_logging_benchmark(args.ops)
+    elif args.command == "startup":
+        run_startup_benchmark(args.files, args.runs)
+    elif args.command == "reports":
+        run_reports_benchmark(args.blocks)
+    elif args.command == "stress":
+        if not run_stress(args.files, args.writers, args.readers, args.seconds, args.fsync):
+            raise SystemExit(1)
@@ -6,9 +6,16 @@ Student 1: Blockchain Implementation
 """
 
 import hashlib
+import itertools
 import json
+import threading
+import time
+from collections import deque
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
+from log_config import get_logger
+
+logger = get_logger(__name__)
 
 class Block:
     """Represents a single block in the blockchain"""
@@ -59,17 +66,226 @@ class Block:
             "hash": self.hash
         }
     
+    @classmethod
+    def from_dict(cls, block_data: Dict[str, Any]) -> "Block":
+        """Rebuild a block from to_dict() output (stored hash kept as-is)"""
+        return cls(
+            index=block_data['index'],
+            timestamp=block_data['timestamp'],
+            data=block_data['data'],
+            previous_hash=block_data['previous_hash'],
+            hash=block_data['hash']
+        )
+    
     def __repr__(self) -> str:
         """String representation of block"""
         return f"Block(index={self.index}, hash={self.hash[:16]}...)"
 
 
+def expand_transactions(block: Block) -> List[Dict[str, Any]]:
+    """
+    Transactions recorded in a block
+    
+    Batch blocks carry one transaction per file and throttle summaries
+    one entry per (user, action); both are expanded so consumers see the
+    same records as for single operations.
+    """
+    data = block.data
+    if not isinstance(data, dict):
+        return []
+    
+    action = data.get('action')
+    if action == 'BATCH':
+        return data.get('transactions', [])
+    if action == 'THROTTLE_SUMMARY':
+        return [{
+            'user_id': entry['user_id'],
+            'action': entry['action'],
+            'status': 'DENIED',
+            'reason': f"Rate limited ({entry['count']} attempts)",
+            'count': entry['count']
+        } for entry in data.get('throttled', [])]
+    return [data]
+
+
+class Subscription:
+    """
+    Ordered feed of new blocks for one consumer
+    
+    New blocks are queued up to maxsize. A consumer that falls further
+    behind does not hold up add_block: its queue is dropped and it catches
+    up by reading the chain from its cursor (the last index it has seen),
+    so no block is ever skipped or delivered twice.
+    """
+    
+    def __init__(self, blockchain: "Blockchain", last_seen: int, maxsize: int):
+        self.blockchain = blockchain
+        self.cursor = last_seen
+        self.maxsize = maxsize
+        self.overflows = 0
+        self.closed = False
+        self._pending: deque = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._behind = last_seen < len(blockchain.chain) - 1
+    
+    def _deliver(self, block: "Block"):
+        """Queue a new block (called by add_block; never blocks on the consumer)"""
+        with self._cond:
+            if not self._behind:
+                if len(self._pending) >= self.maxsize:
+                    self._pending.clear()
+                    self._behind = True
+                    self.overflows += 1
+                else:
+                    self._pending.append(block)
+            self._cond.notify()
+    
+    def _truncated(self, length: int):
+        """The chain was cut to length blocks (called by truncate)"""
+        with self._cond:
+            self._pending = deque(block for block in self._pending if block.index < length)
+            self.cursor = min(self.cursor, length - 1)
+    
+    def get(self, timeout: Optional[float] = None) -> Optional["Block"]:
+        """
+        Next block after the cursor
+        
+        Args:
+            timeout: Seconds to wait for a new block (None waits forever)
+        
+        Returns:
+            The block, or None on timeout or once closed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self.closed:
+                if self._behind:
+                    chain = self.blockchain.chain
+                    if self.cursor + 1 < len(chain):
+                        self.cursor += 1
+                        return chain[self.cursor]
+                    self._behind = False
+                
+                while self._pending:
+                    block = self._pending.popleft()
+                    if block.index > self.cursor:  # Already read from the chain otherwise
+                        self.cursor = block.index
+                        return block
+                
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return None
+    
+    async def get_async(self, timeout: Optional[float] = None) -> Optional["Block"]:
+        """get() for asyncio consumers (waits in the default executor)"""
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, timeout)
+    
+    def lag(self) -> int:
+        """Blocks appended but not yet consumed"""
+        return len(self.blockchain.chain) - 1 - self.cursor
+    
+    def close(self):
+        """Stop the feed; a waiting get() returns None"""
+        self.blockchain.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+    
+    def __iter__(self):
+        """Yield blocks until the subscription is closed"""
+        while True:
+            block = self.get()
+            if block is None:
+                return
+            yield block
+
+
+class CallbackQueue:
+    """
+    Runs callbacks outside the producer's lock, in the order they were queued
+    
+    The producer queues (item, callbacks) while holding its own lock, so
+    items keep that lock's order, then calls drain() once it has released
+    it, so a callback may call back into the producer. One thread delivers
+    at a time. A thread that finds another one delivering (or that is
+    inside a callback itself) leaves its items to that thread.
+    """
+    
+    def __init__(self, active: List[Callable], on_error: Callable[[Any, Exception], None]):
+        """
+        Initialize callback queue
+        
+        Args:
+            active: Live list of registered callbacks; a queued callback that
+                is no longer in it is skipped (it was removed meanwhile)
+            on_error: Called with (item, exception) from inside the except
+                block when a callback raises
+        """
+        self.active = active
+        self.on_error = on_error
+        self.items: deque = deque()
+        self._lock = threading.Lock()  # Held by the thread running callbacks
+        self._thread: Optional[int] = None  # Its thread id
+    
+    def __len__(self) -> int:
+        return len(self.items)
+    
+    def put(self, item: Any, callbacks: tuple):
+        self.items.append((item, callbacks))
+    
+    def retain(self, keep: Callable[[Any], bool]):
+        """Drop queued items for which keep(item) is False"""
+        kept = [entry for entry in self.items if keep(entry[0])]
+        self.items.clear()
+        self.items.extend(kept)
+    
+    def drain(self, wait: bool = False):
+        """
+        Run queued callbacks
+        
+        Args:
+            wait: Block until every queued callback has run, unless called
+                from inside a callback (which would wait for itself)
+        """
+        if wait and self._thread == threading.get_ident():
+            return
+        while wait or self.items:
+            if not self._lock.acquire(blocking=wait):
+                return
+            self._thread = threading.get_ident()
+            wait = False  # Whoever held the lock ran what was queued before
+            try:
+                while self.items:
+                    item, callbacks = self.items.popleft()
+                    for callback in callbacks:
+                        if callback not in self.active:
+                            continue
+                        try:
+                            callback(item)
+                        except Exception as e:
+                            self.on_error(item, e)
+            finally:
+                self._thread = None
+                self._lock.release()
+
+
 class Blockchain:
     """Manages the blockchain"""
     
     def __init__(self):
         """Initialize blockchain with genesis block"""
         self.chain: List[Block] = []
+        self._lock = threading.Lock()  # Serializes appends across threads
+        self.callbacks: List[Callable[[Block], None]] = []  # Run for each new block, in order
+        self.subscriptions: List[Subscription] = []
+        # Blocks in chain order, delivered after the lock is released so a
+        # callback may itself add blocks or read the chain. add_block may
+        # return before its callbacks ran (another thread is delivering).
+        self._deliveries = CallbackQueue(self.callbacks, self._subscriber_failed)
+        self.halted: Optional[str] = None  # Why appends are refused (see halt)
         self.create_genesis_block()
     
     def create_genesis_block(self):
@@ -81,7 +297,8 @@ class Blockchain:
             previous_hash="0"
         )
         self.chain.append(genesis_block)
-        print(f"✓ Genesis block created: {genesis_block.hash[:16]}...")
+        logger.debug("Genesis block created: %s...", genesis_block.hash[:16],
+                     extra={"event": "genesis", "hash": genesis_block.hash})
     
     def get_latest_block(self) -> Block:
         """Get the most recent block in the chain"""
@@ -97,16 +314,153 @@ class Blockchain:
         Returns:
             The newly created block
         """
-        previous_block = self.get_latest_block()
-        new_block = Block(
-            index=len(self.chain),
-            timestamp=datetime.now().isoformat(),
-            data=data,
-            previous_hash=previous_block.hash
-        )
-        self.chain.append(new_block)
+        with self._lock:
+            self._check_halted()
+            previous_block = self.get_latest_block()
+            new_block = Block(
+                index=len(self.chain),
+                timestamp=datetime.now().isoformat(),
+                data=data,
+                previous_hash=previous_block.hash
+            )
+            self.chain.append(new_block)
+            
+            # Queued inside the lock so subscribers see blocks in chain order
+            self._publish(new_block)
+        self._deliveries.drain()
         return new_block
     
+    def append_block(self, block: Block) -> Block:
+        """
+        Append a block created elsewhere (e.g. received from a replication leader)
+        
+        Args:
+            block: Block whose index, link and hash must continue this chain
+            
+        Returns:
+            The appended block
+            
+        Raises:
+            ValueError: If the block does not verify against the chain
+        """
+        with self._lock:
+            self._check_halted()
+            expected_index = len(self.chain)
+            expected_previous = self.chain[-1].hash if self.chain else "0"
+            if block.index != expected_index:
+                raise ValueError(f"Expected block {expected_index}, got {block.index}")
+            if block.previous_hash != expected_previous:
+                raise ValueError(f"Broken chain link at block {block.index}")
+            if block.hash != block.calculate_hash():
+                raise ValueError(f"Invalid hash at block {block.index}")
+            
+            self.chain.append(block)
+            self._publish(block)
+        self._deliveries.drain()
+        return block
+    
+    def halt(self, reason: str):
+        """
+        Refuse every later append (e.g. the persisted copy can no longer keep up)
+        
+        Blocks already added stay in memory; add_block and append_block
+        raise ValueError from now on.
+        """
+        with self._lock:
+            if self.halted is None:
+                self.halted = reason
+        logger.error("Blockchain halted: %s", reason,
+                     extra={"event": "chain_halted", "reason": reason})
+    
+    def _check_halted(self):
+        if self.halted:
+            raise ValueError(f"Blockchain halted: {self.halted}")
+    
+    def truncate(self, length: int):
+        """
+        Drop every block from index length on (used to resync a replica)
+        
+        Queued deliveries of dropped blocks are cancelled and subscription
+        cursors move back to the new end of the chain. Callback subscribers
+        see the next block's index jump backwards.
+        """
+        with self._lock:
+            del self.chain[length:]
+            self._deliveries.retain(lambda block: block.index < length)
+            for subscription in self.subscriptions:
+                subscription._truncated(length)
+    
+    def _publish(self, block: Block):
+        """Hand a new block to subscribers (caller holds the lock)"""
+        if self.callbacks:
+            self._deliveries.put(block, tuple(self.callbacks))
+        for subscription in self.subscriptions:
+            subscription._deliver(block)  # Only queues; never runs consumer code
+    
+    def _subscriber_failed(self, block: Block, error: Exception):
+        logger.exception("Block subscriber failed on block %d: %s", block.index, error,
+                         extra={"event": "subscriber_failed", "index": block.index})
+    
+    def subscribe(self, callback: Callable[[Block], None],
+                  last_seen: Optional[int] = None) -> Callable[[Block], None]:
+        """
+        Call callback with every new block, in order
+        
+        Callbacks run after add_block releases the chain lock, one block
+        at a time in chain order, so they may add blocks or read the chain.
+        They still hold up the appending thread, so slow consumers should
+        use subscribe_queue instead.
+        
+        Args:
+            callback: Function taking a Block
+            last_seen: Replay blocks after this index first (None = only new blocks)
+            
+        Returns:
+            The callback (pass it to unsubscribe)
+        """
+        with self._lock:
+            if last_seen is not None:
+                # Queued behind blocks already waiting, which do not include
+                # this callback, so nothing is delivered twice
+                for block in self.chain[last_seen + 1:]:
+                    self._deliveries.put(block, (callback,))
+            self.callbacks.append(callback)
+        self._deliveries.drain()
+        return callback
+    
+    def subscribe_queue(self, last_seen: Optional[int] = None,
+                        maxsize: int = 1024) -> Subscription:
+        """
+        Open a bounded, resumable feed of new blocks
+        
+        Args:
+            last_seen: Resume after this index (None = only new blocks)
+            maxsize: Blocks buffered before the consumer falls back to the chain
+            
+        Returns:
+            Subscription to read blocks from
+        """
+        with self._lock:
+            if last_seen is None:
+                last_seen = len(self.chain) - 1
+            subscription = Subscription(self, last_seen, maxsize)
+            self.subscriptions.append(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscriber):
+        """
+        Remove a callback (after running its queued deliveries) or Subscription
+        
+        Waits for a delivery running in another thread to finish first. A
+        callback that unsubscribes itself misses the blocks still queued.
+        """
+        self._deliveries.drain(wait=True)
+        with self._lock:
+            if subscriber in self.callbacks:
+                self.callbacks.remove(subscriber)
+            elif subscriber in self.subscriptions:
+                self.subscriptions.remove(subscriber)
+    
     def validate_chain(self) -> bool:
         """
         Validate the integrity of the blockchain
@@ -121,20 +475,27 @@ class Blockchain:
             
             # Check 1: Is the current block's hash correct?
             if current_block.hash != current_block.calculate_hash():
-                print(f"✗ Invalid hash at block {i}")
-                print(f"  Stored hash:     {current_block.hash}")
-                print(f"  Calculated hash: {current_block.calculate_hash()}")
+                logger.warning("Invalid hash at block %d", i,
+                               extra={"event": "invalid_hash", "index": i,
+                                      "stored_hash": current_block.hash,
+                                      "calculated_hash": current_block.calculate_hash()})
                 return False
             
             # Check 2: Does the current block properly link to previous block?
             if current_block.previous_hash != previous_block.hash:
-                print(f"✗ Broken chain link at block {i}")
-                print(f"  Current block's previous_hash: {current_block.previous_hash}")
-                print(f"  Previous block's hash:         {previous_block.hash}")
+                logger.warning("Broken chain link at block %d", i,
+                               extra={"event": "broken_link", "index": i,
+                                      "previous_hash": current_block.previous_hash,
+                                      "expected_hash": previous_block.hash})
                 return False
         
         return True
     
+    def iter_blocks(self):
+        """Yield logged blocks in chain (and time) order, genesis excluded"""
+        # islice rather than a slice copy: a persisted chain streams from disk
+        yield from itertools.islice(self.chain, 1, None)
+    
     def get_chain_length(self) -> int:
         """Get the number of blocks in the chain"""
         return len(self.chain)
@@ -171,7 +532,9 @@ class Blockchain:
         chain_data = [block.to_dict() for block in self.chain]
         with open(filename, 'w') as f:
             json.dump(chain_data, f, indent=2)
-        print(f"✓ Blockchain saved to {filename}")
+        logger.info("Blockchain saved to %s", filename,
+                    extra={"event": "chain_saved", "path": filename,
+                           "blocks": len(chain_data)})
     
     def load_from_file(self, filename: str = "blockchain.json"):
         """Load blockchain from JSON file"""
@@ -179,30 +542,23 @@ class Blockchain:
             with open(filename, 'r') as f:
                 chain_data = json.load(f)
             
-            self.chain = []
-            for block_data in chain_data:
-                block = Block(
-                    index=block_data['index'],
-                    timestamp=block_data['timestamp'],
-                    data=block_data['data'],
-                    previous_hash=block_data['previous_hash'],
-                    hash=block_data['hash']
-                )
-                self.chain.append(block)
+            self.chain = [Block.from_dict(block_data) for block_data in chain_data]
             
-            print(f"✓ Blockchain loaded from {filename}")
-            print(f"  Loaded {len(self.chain)} blocks")
+            logger.info("Blockchain loaded from %s: %d blocks", filename, len(self.chain),
+                        extra={"event": "chain_loaded", "path": filename,
+                               "blocks": len(self.chain)})
             
             # Validate loaded chain
             if self.validate_chain():
-                print("  ✓ Blockchain integrity verified")
+                logger.info("Blockchain integrity verified", extra={"event": "chain_verified"})
             else:
-                print("  ✗ Warning: Blockchain integrity check failed!")
+                logger.error("Blockchain integrity check failed!",
+                             extra={"event": "chain_invalid", "path": filename})
         
         except FileNotFoundError:
-            print(f"✗ File {filename} not found")
+            logger.error("File %s not found", filename, extra={"event": "chain_missing"})
         except json.JSONDecodeError:
-            print(f"✗ Invalid JSON in {filename}")
+            logger.error("Invalid JSON in %s", filename, extra={"event": "chain_corrupt"})
 
 
 # ============================================
@@ -258,6 +614,8 @@ def demo_tampering_detection():
 
 if __name__ == "__main__":
     """Run demos when executed directly"""
+    import log_config
+    log_config.configure(use_queue=False)
     
     # Demo 1: Basic operations
     blockchain = demo_basic_blockchain()
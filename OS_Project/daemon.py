@@ -0,0 +1,410 @@
+"""
+============================================
+OS Project: Access Daemon
+A resident system serving file operations over a local socket
+============================================
+
+The daemon builds the system once and keeps it in memory, so clients
+skip start-up entirely and caches stay warm between requests. It listens
+on a Unix domain socket (or on localhost TCP where those do not exist)
+and speaks the batch protocol, one JSON object per line:
+    
+    client -> daemon   {"op": "read", "user_id": "user001", "file_id": "a.txt"}
+    daemon -> client   {"op": "read", "ok": true, "content": "...", "ms": 0.05}
+
+A connection may send any number of requests; answers come back in the
+same order. Operations run on a fixed worker pool, and connections beyond
+max_connections are told the daemon is busy and closed.
+
+Requests name the user they act as, so only trusted clients may connect.
+The Unix socket is created owner-only. Over TCP every connection must
+first send {"op": "auth", "token": "..."} with the daemon's shared token.
+"""
+
+import hmac
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Union
+from batch import BatchRunner
+from replication import send_message, read_message
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    """Serves one client connection"""
+    
+    def handle(self):
+        daemon: "AccessDaemon" = self.server.daemon
+        if not daemon._slots.acquire(blocking=False):
+            daemon._count("rejected")
+            send_message(self.wfile, {"ok": False, "error": "daemon busy: connection limit reached"})
+            return
+        
+        daemon._count("connections")
+        daemon._count("active")
+        try:
+            if daemon.token and not self._authenticate(daemon):
+                daemon._count("rejected")
+                send_message(self.wfile, {"ok": False, "error": "authentication failed"})
+                return
+            while not daemon.stopped:
+                try:
+                    op = read_message(self.rfile)
+                    if op is not None and not isinstance(op, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    op = {"op": None, "parse_error": str(e)}
+                if op is None:
+                    return
+                if op.get("op") == "status":
+                    result = {"op": "status", "ok": True, **daemon.status()}
+                else:
+                    result = daemon.pool.submit(daemon.runner.execute, op).result()
+                daemon._count("requests")
+                send_message(self.wfile, result)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            daemon._count("active", -1)
+            daemon._slots.release()
+    
+    def _authenticate(self, daemon: "AccessDaemon") -> bool:
+        """Read the connection's auth message and check its token"""
+        try:
+            op = read_message(self.rfile)
+        except ValueError:
+            return False
+        if not isinstance(op, dict) or op.get("op") != "auth" or not isinstance(op.get("token"), str):
+            return False
+        if not hmac.compare_digest(op["token"].encode(), daemon.token.encode()):
+            return False
+        send_message(self.wfile, {"op": "auth", "ok": True})
+        return True
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128  # Listen backlog; the default of 5 refuses bursts of clients
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        request_queue_size = 128
+else:
+    _UnixServer = None
+
+
+class AccessDaemon:
+    """Keeps one BatchRunner resident and serves it over a socket"""
+    
+    def __init__(self, runner: Optional[BatchRunner] = None, socket_path: Optional[str] = None,
+                 host: str = "127.0.0.1", port: int = 0, workers: int = 8,
+                 max_connections: int = 64, flush_interval: float = 1.0,
+                 token: Optional[str] = None):
+        """
+        Initialize access daemon
+        
+        Args:
+            runner: System to serve (default: a new BatchRunner)
+            socket_path: Unix socket to listen on; None listens on host:port
+            host: TCP interface when no socket_path is given
+            port: TCP port (0 picks a free port)
+            workers: Operations executed at the same time
+            max_connections: Clients connected at the same time
+            flush_interval: Seconds between saves of changed file metadata
+                and checks for a due throttle summary
+            token: Shared secret clients must send first (required over TCP)
+        """
+        if not socket_path and not token:
+            raise ValueError("A TCP daemon needs an auth token; use a Unix socket or set token")
+        self.runner = runner or BatchRunner()
+        self.socket_path = socket_path
+        self.workers = workers
+        self.max_connections = max_connections
+        self.flush_interval = flush_interval
+        self.token = token
+        self.stopped = False
+        self.started = time.time()
+        self.counts = {"active": 0, "connections": 0, "rejected": 0, "requests": 0}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="daemon-worker")
+        
+        if socket_path:
+            if _UnixServer is None:
+                raise ValueError("Unix domain sockets are not available; use host/port")
+            if os.path.exists(socket_path):
+                os.remove(socket_path)  # Left behind by a daemon that did not shut down
+            # Requests name their user; keep other accounts out from the moment
+            # bind() creates the socket file
+            umask = os.umask(0o177)
+            try:
+                self.server = _UnixServer(socket_path, _DaemonHandler)
+            finally:
+                os.umask(umask)
+            os.chmod(socket_path, 0o600)
+        else:
+            self.server = _TCPServer((host, port), _DaemonHandler)
+        self.server.daemon = self
+        self._thread: Optional[threading.Thread] = None
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+    
+    @property
+    def address(self) -> Union[str, tuple]:
+        return self.server.server_address
+    
+    def start(self):
+        """Serve clients and flush metadata in background threads"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        logger.info("Daemon listening on %s (%d workers, %d connections max)",
+                    self.address, self.workers, self.max_connections,
+                    extra={"event": "daemon_started"})
+    
+    def _flush_loop(self):
+        file_manager = self.runner.file_manager
+        while not self._stop.wait(self.flush_interval):
+            if file_manager.metadata_dirty:
+                self.runner.flush()
+            # Throttled counts are otherwise only logged on the next denial
+            file_manager.flush_throttle_summary()
+    
+    def stop(self):
+        """Stop accepting clients, finish running operations and save state"""
+        self.stopped = True
+        self._stop.set()
+        if self._thread:
+            self.server.shutdown()  # Waits for serve_forever, so only once started
+        self.server.server_close()
+        self.pool.shutdown(wait=True)
+        if self._flusher:
+            self._flusher.join()
+        self.runner.close()
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        logger.info("Daemon stopped after %d requests", self.counts["requests"],
+                    extra={"event": "daemon_stopped", **self.counts})
+    
+    def serve_forever(self):
+        """Run in the foreground until Ctrl-C or SIGTERM, then stop cleanly"""
+        terminated = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: terminated.set())
+        self.start()
+        try:
+            while not terminated.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        self.stop()
+    
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.counts[key] += amount
+    
+    def status(self) -> Dict[str, Any]:
+        """Uptime, request counts and connections in use"""
+        with self._lock:
+            counts = dict(self.counts)
+        return {"uptime": round(time.time() - self.started, 3),
+                "chain_length": self.runner.blockchain.get_chain_length(), **counts}
+
+
+class DaemonClient:
+    """Sends requests to an AccessDaemon over one persistent connection"""
+    
+    def __init__(self, address: Union[str, tuple], timeout: Optional[float] = 30.0,
+                 token: Optional[str] = None):
+        """
+        Connect to a daemon
+        
+        Args:
+            address: Unix socket path, or (host, port)
+            timeout: Socket timeout in seconds
+            token: Auth token to send first (TCP daemons)
+        
+        Raises:
+            ConnectionError: If the daemon refuses the token
+        """
+        if isinstance(address, str):
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.connect(address)
+        self.socket.settimeout(timeout)
+        self.stream = self.socket.makefile("rwb")
+        if token is not None:
+            result = self.request({"op": "auth", "token": token})
+            if not result.get("ok"):
+                self.close()
+                raise ConnectionError(result.get("error", "authentication failed"))
+    
+    def request(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one operation and wait for its result"""
+        try:
+            send_message(self.stream, op)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # A busy daemon answers and hangs up before reading; get its answer
+        result = read_message(self.stream)
+        if result is None:
+            raise ConnectionError("Daemon closed the connection")
+        return result
+    
+    def close(self):
+        try:
+            self.stream.close()
+        except OSError:
+            pass  # Unsent bytes to a daemon that already hung up
+        self.socket.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================================
+# Command Line / Demo
+# ============================================
+
+def run_demo(clients: int, requests: int):
+    """Serve from this process and measure request latency from client threads"""
+    import secrets
+    import shutil
+    import tempfile
+    
+    print("\n" + "="*70)
+    print("DEMO: Access Daemon")
+    print("="*70 + "\n")
+    
+    workdir = tempfile.mkdtemp(prefix="daemon_demo_")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)  # users.json and file_metadata.json go to the cwd
+    try:
+        path = os.path.join(workdir, "daemon.sock") if _UnixServer else None
+        token = None if path else secrets.token_hex(16)
+        daemon = AccessDaemon(BatchRunner(files_dir=os.path.join(workdir, "files")),
+                              socket_path=path, workers=4, max_connections=clients, token=token)
+        daemon.start()
+        
+        def connect() -> DaemonClient:
+            return DaemonClient(daemon.address, token=token)
+        
+        with connect() as client:
+            for i in range(50):
+                client.request({"op": "create", "user_id": "user001", "file_id": f"d{i}.txt",
+                                "content": f"file {i}", "permissions": "public"})
+        
+        latencies = []
+        lock = threading.Lock()
+        
+        def worker(n: int):
+            samples = []
+            with connect() as client:
+                for i in range(requests):
+                    start = time.perf_counter()
+                    client.request({"op": "read", "user_id": "guest001",
+                                    "file_id": f"d{(n + i) % 50}.txt"})
+                    samples.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(samples)
+        
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1e6
+        p99 = latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1e6
+        print(f"{len(latencies):,} reads from {clients} clients in {elapsed:.2f} s "
+              f"({len(latencies) / elapsed:,.0f} req/s)")
+        print(f"Latency p50 {p50:.0f} us, p99 {p99:.0f} us")
+        
+        # One connection over the limit is turned away
+        extra = [connect() for _ in range(clients)]
+        for client in extra:
+            client.request({"op": "status"})
+        try:
+            with connect() as client:
+                print(f"Over the limit: {client.request({'op': 'status'})}")
+        except ConnectionError as e:  # Refused before the auth exchange
+            print(f"Over the limit: {e}")
+        for client in extra:
+            client.close()
+        time.sleep(0.1)
+        
+        with connect() as client:
+            print(f"Status: {client.request({'op': 'status'})}")
+        daemon.stop()
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import log_config
+    
+    parser = argparse.ArgumentParser(description="Resident file access daemon")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    serve = sub.add_parser("serve", help="run the daemon in the foreground")
+    serve.add_argument("--socket", default="os_project.sock",
+                       help="Unix socket path ('' to use TCP)")
+    serve.add_argument("--port", type=int, default=9600, help="TCP port when --socket ''")
+    serve.add_argument("--workers", type=int, default=8)
+    serve.add_argument("--max-connections", type=int, default=64)
+    serve.add_argument("--ledger", default="audit_ledger.jsonl",
+                       help="audit ledger (.jsonl is persisted as blocks are added; "
+                            "other files are blockchain JSON saved on exit)")
+    serve.add_argument("--export-dir", default="./exports",
+                       help="directory export operations may write into")
+    
+    call = sub.add_parser("call", help="send requests (JSON lines on stdin) to a daemon")
+    call.add_argument("--socket", default="os_project.sock")
+    call.add_argument("--port", type=int, default=9600)
+    
+    for command in (serve, call):
+        command.add_argument("--token", default=os.environ.get("OS_PROJECT_DAEMON_TOKEN"),
+                             help="shared auth token, required with --socket '' "
+                                  "(default: $OS_PROJECT_DAEMON_TOKEN)")
+    
+    demo = sub.add_parser("demo", help="serve in-process and measure latency")
+    demo.add_argument("--clients", type=int, default=8)
+    demo.add_argument("--requests", type=int, default=2000, help="requests per client")
+    
+    args = parser.parse_args()
+    if args.command == "serve" and not args.socket and not args.token:
+        parser.error("serving over TCP needs --token (or $OS_PROJECT_DAEMON_TOKEN)")
+    log_config.configure(level="WARNING" if args.command == "demo" else None, stream=sys.stderr)
+    
+    if args.command == "serve":
+        AccessDaemon(BatchRunner(ledger=args.ledger, export_dir=args.export_dir),
+                     socket_path=args.socket or None, port=args.port, workers=args.workers,
+                     max_connections=args.max_connections, token=args.token).serve_forever()
+    elif args.command == "call":
+        from batch import read_operations
+        address = args.socket or ("127.0.0.1", args.port)
+        with DaemonClient(address, token=args.token if not args.socket else None) as client:
+            for op in read_operations(sys.stdin):
+                print(json.dumps(client.request(op)))
+    elif args.command == "demo":
+        run_demo(args.clients, args.requests)
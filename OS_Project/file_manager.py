@@ -7,9 +7,21 @@ Student 2: File Operations & Blockchain Integration
 
 import os
 import json
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from blockchain import Blockchain
+from locks import FileLockTable
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+# Read once at import: os.umask can only be read by setting it, which
+# would race with other threads creating files
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
 # ============================================
 # User Management
@@ -49,6 +61,8 @@ class UserManager:
     def __init__(self):
         """Initialize user manager"""
         self.users: Dict[str, User] = {}
+        self.valid_roles = {'Admin', 'User', 'Guest'}  # Replaced by the loaded policy
+        self.listeners: List[Callable[[str], None]] = []  # Called with user_id on changes
         self.load_users()
     
     def register_user(self, user_id: str, username: str, role: str) -> User:
@@ -56,16 +70,40 @@ class UserManager:
         if user_id in self.users:
             raise ValueError(f"User {user_id} already exists")
         
-        if role not in ['Admin', 'User', 'Guest']:
+        if role not in self.valid_roles:
             raise ValueError(f"Invalid role: {role}")
         
         user = User(user_id, username, role)
         self.users[user_id] = user
         self.save_users()
+        self._notify(user_id)
+        
+        logger.info("User registered: %s (%s)", username, role,
+                    extra={"event": "user_registered", "user_id": user_id, "role": role})
+        return user
+    
+    def set_role(self, user_id: str, role: str) -> User:
+        """Change a user's role"""
+        user = self.users.get(user_id)
+        if not user:
+            raise ValueError(f"User {user_id} not found")
+        
+        if role not in self.valid_roles:
+            raise ValueError(f"Invalid role: {role}")
+        
+        user.role = role
+        self.save_users()
+        self._notify(user_id)
         
-        print(f"✓ User registered: {username} ({role})")
+        logger.info("Role changed: %s is now %s", user.username, role,
+                    extra={"event": "role_changed", "user_id": user_id, "role": role})
         return user
     
+    def _notify(self, user_id: str):
+        """Tell listeners (e.g. permission caches) that a user changed"""
+        for listener in self.listeners:
+            listener(user_id)
+    
     def get_user(self, user_id: str) -> Optional[User]:
         """Get user by ID"""
         return self.users.get(user_id)
@@ -98,10 +136,12 @@ class UserManager:
 class FileMetadata:
     """Stores metadata about files"""
     
-    def __init__(self, file_id: str, owner_id: str, permissions: str = 'private'):
+    def __init__(self, file_id: str, owner_id: str, permissions: str = 'private',
+                 content_hash: Optional[str] = None):
         self.file_id = file_id
         self.owner_id = owner_id
         self.permissions = permissions  # 'private' or 'public'
+        self.content_hash = content_hash  # SHA-256 of content (CAS storage only)
         self.created = datetime.now().isoformat()
         self.last_modified = self.created
     
@@ -110,16 +150,293 @@ class FileMetadata:
             "file_id": self.file_id,
             "owner_id": self.owner_id,
             "permissions": self.permissions,
+            "content_hash": self.content_hash,
             "created": self.created,
             "last_modified": self.last_modified
         }
 
 
+def atomic_write(path: str, content: str, fsync: bool = True):
+    """
+    Replace a file's content so readers see either the old or the new version
+    
+    Content goes to a temporary file in the same directory, which is then
+    flushed to disk and renamed over the target (os.replace is atomic).
+    The result keeps the target's permission bits, or gets the umask
+    default for a new file (mkstemp alone would leave it 0600).
+    """
+    directory = os.path.dirname(path) or '.'
+    import tempfile  # Deferred: pulls in shutil and random, unused until the first write
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def shard_path(root: str, name: str, levels: int) -> str:
+    """
+    Path of a file under a hashed fan-out layout
+    
+    Args:
+        root: Base directory
+        name: File name (file_id)
+        levels: Number of 2-hex-digit directory levels (0 = flat)
+    
+    Returns:
+        root/ab/cd/name for levels=2, root/name for levels=0
+    """
+    if levels == 0:
+        return os.path.join(root, name)
+    
+    digest = hashlib.sha256(name.encode()).hexdigest()
+    prefixes = [digest[i * 2:i * 2 + 2] for i in range(levels)]
+    return os.path.join(root, *prefixes, name)
+
+
+def _remove_if_present(path: str):
+    try:
+        os.remove(path)
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        pass  # A flat file occupies a parent directory, or a shard directory took the name
+
+
+_MIGRATE_ASIDE = '.migrate-'  # Prefix of a flat file moved out of a shard directory's way
+
+
+def migrate_to_sharded(files_dir: str, shard_levels: int = 2) -> int:
+    """
+    Move files from a flat files_dir into the sharded layout
+    
+    Safe to run while a FileManager with the same shard_levels is serving:
+    each file is hard-linked into place (never overwriting a newer sharded
+    copy) before the flat name is removed, and reads fall back to the flat
+    path (or the name a two-character file is set aside under) until the
+    move is done.
+    
+    Args:
+        files_dir: Directory holding the flat files
+        shard_levels: Target number of directory levels
+    
+    Returns:
+        Number of files migrated
+    """
+    if shard_levels < 1:
+        raise ValueError("shard_levels must be at least 1")
+    
+    # Files set aside by an interrupted run go first
+    names = sorted(os.listdir(files_dir), key=lambda n: not n.startswith(_MIGRATE_ASIDE))
+    moved = 0
+    
+    for entry in names:
+        if entry.startswith('.tmp-') or not os.path.isfile(os.path.join(files_dir, entry)):
+            continue  # Shard directories, blob store, in-progress writes
+        moved += _migrate_file(files_dir, entry, shard_levels)
+    
+    return moved
+
+
+def _migrate_file(files_dir: str, entry: str, shard_levels: int) -> int:
+    """Link one flat file (or one set aside) into place; returns 1 if moved"""
+    name = entry[len(_MIGRATE_ASIDE):] if entry.startswith(_MIGRATE_ASIDE) else entry
+    src = os.path.join(files_dir, entry)
+    dst = shard_path(files_dir, name, shard_levels)
+    moved = 0
+    
+    # A flat two-character file can sit where the top shard directory goes,
+    # even this file's own (e.g. "ab" hashing to "ab..."). It is renamed
+    # aside and migrated first; it cannot be read between the two steps.
+    top = os.path.join(files_dir, os.path.relpath(dst, files_dir).split(os.sep)[0])
+    if os.path.isfile(top):
+        blocker = os.path.basename(top)
+        aside = os.path.join(files_dir, _MIGRATE_ASIDE + blocker)
+        try:
+            os.replace(top, aside)
+        except FileNotFoundError:
+            pass  # Deleted or migrated meanwhile
+        else:
+            if blocker == name:
+                src = aside
+            else:
+                moved += _migrate_file(files_dir, _MIGRATE_ASIDE + blocker, shard_levels)
+                if not os.path.isfile(src):
+                    return moved  # This file was in the blocker's way and went first
+    
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(src, dst)
+        moved += 1
+    except FileExistsError:
+        pass  # Already rewritten in the sharded layout; flat copy is stale
+    except FileNotFoundError:
+        return moved  # Deleted while migrating
+    
+    _remove_if_present(src)  # delete_file may have removed it after the link
+    return moved
+
+
+class BlobStore:
+    """Content-addressed storage: identical content is stored only once"""
+    
+    def __init__(self, root: str):
+        """
+        Initialize blob store
+        
+        Args:
+            root: Directory holding the blobs (sharded by hash prefix)
+        """
+        self.root = root
+        self.refcounts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+    
+    @staticmethod
+    def hash_content(content: str) -> str:
+        """Calculate SHA256 of content (the blob key)"""
+        return hashlib.sha256(content.encode()).hexdigest()
+    
+    def blob_path(self, content_hash: str) -> str:
+        """Path of a blob: root/ab/cd/abcd..."""
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash)
+    
+    def put(self, content: str) -> str:
+        """
+        Store content and take a reference to it
+        
+        Returns:
+            Hash of the content
+        """
+        content_hash = self.hash_content(content)
+        
+        with self._lock:
+            # Duplicate content only bumps the refcount
+            if self.refcounts.get(content_hash, 0) == 0:
+                path = self.blob_path(content_hash)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                atomic_write(path, content)
+            
+            self.refcounts[content_hash] = self.refcounts.get(content_hash, 0) + 1
+        return content_hash
+    
+    def get(self, content_hash: str) -> str:
+        """Read blob content"""
+        with open(self.blob_path(content_hash), 'r') as f:
+            return f.read()
+    
+    def release(self, content_hash: str):
+        """Drop one reference; the blob is removed when none are left"""
+        with self._lock:
+            count = self.refcounts.get(content_hash, 0) - 1
+            if count > 0:
+                self.refcounts[content_hash] = count
+                return
+            
+            self.refcounts.pop(content_hash, None)
+            try:
+                os.remove(self.blob_path(content_hash))
+            except FileNotFoundError:
+                pass
+    
+    def rebuild_refcounts(self, metadata: Dict[str, FileMetadata]):
+        """Recount references from file metadata (the source of truth)"""
+        refcounts: Dict[str, int] = {}
+        for meta in metadata.values():
+            if meta.content_hash:
+                refcounts[meta.content_hash] = refcounts.get(meta.content_hash, 0) + 1
+        with self._lock:
+            self.refcounts = refcounts
+
+
+class ContentCache:
+    """In-memory LRU cache of file contents, bounded by total size in bytes"""
+    
+    def __init__(self, max_bytes: int):
+        """
+        Initialize content cache
+        
+        Args:
+            max_bytes: Total size of cached content before evicting
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()  # file_id -> (content, size)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+    
+    def get(self, file_id: str) -> Optional[str]:
+        """Return cached content (marking it recently used) or None"""
+        with self._lock:
+            entry = self.entries.get(file_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            self.entries.move_to_end(file_id)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, file_id: str, content: str):
+        """Cache content, evicting least recently used entries if needed"""
+        size = len(content.encode())
+        if size > self.max_bytes:
+            return  # Would evict everything else
+        
+        with self._lock:
+            self._discard(file_id)
+            self.entries[file_id] = (content, size)
+            self.current_bytes += size
+            
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+    
+    def invalidate(self, file_id: str):
+        """Drop a file from the cache"""
+        with self._lock:
+            self._discard(file_id)
+    
+    def _discard(self, file_id: str):
+        """Remove an entry (caller holds the lock)"""
+        entry = self.entries.pop(file_id, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current usage"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+
 class FileManager:
     """Manages file operations with blockchain logging"""
     
     def __init__(self, blockchain: Blockchain, user_manager: UserManager, 
-                 access_control=None, files_dir: str = "./files"):
+                 access_control=None, files_dir: str = "./files",
+                 storage: str = 'flat', shard_levels: int = 0,
+                 cache_bytes: int = 0, fsync_writes: bool = True):
         """
         Initialize file manager
         
@@ -128,16 +445,242 @@ class FileManager:
             user_manager: UserManager instance
             access_control: AccessControl instance (set later to avoid circular import)
             files_dir: Directory to store files
+            storage: 'flat' (one file per file_id) or 'cas' (deduplicated blobs)
+            shard_levels: Hashed directory levels for per-file storage (0 = flat)
+            cache_bytes: Size of the in-memory read cache (0 = disabled)
+            fsync_writes: Flush file content to disk before it replaces the old version
         """
+        if storage not in ['flat', 'cas']:
+            raise ValueError(f"Invalid storage layout: {storage}")
+        if shard_levels < 0:
+            raise ValueError(f"Invalid shard_levels: {shard_levels}")
+        
         self.blockchain = blockchain
         self.user_manager = user_manager
         self.access_control = access_control
         self.files_dir = files_dir
-        self.metadata: Dict[str, FileMetadata] = {}
+        self.storage = storage
+        self.shard_levels = shard_levels
+        self._known_dirs = set()
+        self.cache = ContentCache(cache_bytes) if cache_bytes > 0 else None
+        self.fsync_writes = fsync_writes
+        self.locks = FileLockTable()
+        self._metadata_lock = threading.Lock()
+        
+        # Called with file_id when a file appears, disappears or changes
+        # owner/permissions (not on content writes)
+        self.metadata_listeners: List[Callable[[str], None]] = []
+        # Called when load_metadata replaces every file's metadata at once
+        self.reload_listeners: List[Callable[[], None]] = []
+        
+        # When False, changes only mark metadata dirty and the owner
+        # (e.g. AsyncFileManager) decides when to call save_metadata()
+        self.autosave_metadata = True
+        self.metadata_dirty = False
+        
+        # Loaded on first access (see the metadata property): a large
+        # metadata file would otherwise delay start-up
+        self._metadata: Optional[Dict[str, FileMetadata]] = None
+        self._load_lock = threading.Lock()
         
         # Create files directory
         os.makedirs(self.files_dir, exist_ok=True)
-        self.load_metadata()
+        self.blob_store = BlobStore(os.path.join(self.files_dir, 'blobs')) if storage == 'cas' else None
+    
+    @property
+    def metadata(self) -> Dict[str, FileMetadata]:
+        """File metadata by file_id, loaded from disk on first access"""
+        metadata = self._metadata
+        if metadata is None:
+            with self._load_lock:
+                if self._metadata is None:
+                    self.load_metadata()
+                metadata = self._metadata
+        return metadata
+    
+    def preload_metadata(self) -> threading.Thread:
+        """Load metadata in a background thread (e.g. while a prompt waits for input)"""
+        thread = threading.Thread(target=lambda: self.metadata, daemon=True)
+        thread.start()
+        return thread
+    
+    # ============================================
+    # Content Storage
+    # ============================================
+    
+    def _file_path(self, file_id: str) -> str:
+        """Path of a file in per-file storage (flat or sharded)"""
+        return shard_path(self.files_dir, file_id, self.shard_levels)
+    
+    def _legacy_paths(self, file_id: str) -> List[str]:
+        """
+        Paths a file not yet migrated to shards may have, in the order
+        migrate_to_sharded moves it through them (flat, then set aside)
+        """
+        if not self.shard_levels:
+            return []
+        flat = os.path.join(self.files_dir, file_id)
+        if len(file_id) != 2:
+            return [flat]
+        return [flat, os.path.join(self.files_dir, _MIGRATE_ASIDE + file_id)]
+    
+    def _store_content(self, file_id: str, content: str) -> Optional[str]:
+        """
+        Write file content using the configured layout
+        
+        Returns:
+            Content hash for CAS storage, None for flat storage
+        """
+        if self.cache:
+            self.cache.invalidate(file_id)
+        
+        if not self.blob_store:
+            file_path = self._file_path(file_id)
+            directory = os.path.dirname(file_path)
+            if directory not in self._known_dirs:
+                os.makedirs(directory, exist_ok=True)
+                self._known_dirs.add(directory)
+            
+            atomic_write(file_path, content, self.fsync_writes)
+            return None
+        
+        # Metadata first: loading it recounts blob references, which would
+        # wipe out a reference taken by put() before the load
+        meta = self.metadata.get(file_id)
+        # Take the new reference before dropping the old one, so
+        # rewriting identical content never deletes the blob
+        content_hash = self.blob_store.put(content)
+        if meta and meta.content_hash:
+            self.blob_store.release(meta.content_hash)
+        return content_hash
+    
+    def _load_content(self, file_id: str) -> str:
+        """Read file content using the configured layout"""
+        if not self.blob_store:
+            file_path = self._file_path(file_id)
+            # NotADirectoryError: a flat two-character file still occupies a
+            # shard directory; IsADirectoryError: a shard directory took the
+            # flat name. Trying the paths in migration order, then the
+            # sharded one again, finds a file that moves meanwhile.
+            for path in [file_path] + self._legacy_paths(file_id) + [file_path]:
+                try:
+                    with open(path, 'r') as f:
+                        return f.read()
+                except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+                    continue
+            raise FileNotFoundError(file_id)
+        
+        meta = self.metadata.get(file_id)
+        if not meta or not meta.content_hash:
+            raise FileNotFoundError(file_id)
+        return self.blob_store.get(meta.content_hash)
+    
+    def _remove_content(self, file_id: str):
+        """Remove file content using the configured layout"""
+        if self.cache:
+            self.cache.invalidate(file_id)
+        
+        if not self.blob_store:
+            file_path = self._file_path(file_id)
+            legacy_paths = self._legacy_paths(file_id)
+            try:
+                os.remove(file_path)
+            except (FileNotFoundError, NotADirectoryError):
+                if not legacy_paths:
+                    raise
+                for legacy_path in legacy_paths:  # In migration order
+                    try:
+                        os.remove(legacy_path)
+                    except (FileNotFoundError, IsADirectoryError):
+                        continue
+                    # migrate_to_sharded may have linked it into place meanwhile
+                    _remove_if_present(file_path)
+                    return
+                try:
+                    os.remove(file_path)  # Migrated while we looked
+                except NotADirectoryError:
+                    raise FileNotFoundError(file_id)
+                return
+            
+            # Drop stale copies left by an unfinished migration
+            for legacy_path in legacy_paths:
+                _remove_if_present(legacy_path)
+            return
+        
+        meta = self.metadata.get(file_id)
+        if not meta or not meta.content_hash:
+            raise FileNotFoundError(file_id)
+        self.blob_store.release(meta.content_hash)
+    
+    # ============================================
+    # Denied Attempt Logging
+    # ============================================
+    
+    def _log_denied(self, user_id: str, action: str, file_id: str):
+        """
+        Log a denied attempt
+        
+        With a rate limiter on the access control, each (user, action) gets
+        a budget of individually logged denials; attempts beyond it are
+        only counted and later logged together in a summary block.
+        """
+        limiter = self.access_control.rate_limiter if self.access_control else None
+        if limiter and not limiter.consume((user_id, action)):
+            limiter.record_throttled((user_id, action))
+            logger.debug("Throttled: %s %s %s", user_id, action, file_id,
+                         extra={"event": "throttled", "user_id": user_id,
+                                "action": action, "file_id": file_id})
+        else:
+            transaction = {
+                "timestamp": datetime.now().isoformat(),
+                "user_id": user_id,
+                "action": action,
+                "file_id": file_id,
+                "status": "DENIED",
+                "reason": "Insufficient permissions"
+            }
+            self.blockchain.add_block(transaction)
+            verb = "write to" if action == "WRITE" else action.lower()
+            logger.warning("Access denied: %s cannot %s %s", user_id, verb, file_id,
+                           extra={"event": "access_denied", "user_id": user_id,
+                                  "action": action, "file_id": file_id})
+        
+        if limiter:
+            self.flush_throttle_summary()
+    
+    def flush_throttle_summary(self, force: bool = False):
+        """
+        Log throttled attempts counted since the last summary as one block
+        
+        Called automatically once the limiter's summary interval has passed;
+        use force=True to log pending counts right away (e.g. on shutdown).
+        """
+        limiter = self.access_control.rate_limiter if self.access_control else None
+        summary = limiter.drain_summary(force) if limiter else None
+        if not summary:
+            return
+        
+        throttled = [
+            {"user_id": user_id, "action": action, "count": count}
+            for (user_id, action), count in summary["counts"].items()
+        ]
+        transaction = {
+            "timestamp": datetime.now().isoformat(),
+            "action": "THROTTLE_SUMMARY",
+            "status": "DENIED",
+            "reason": "Rate limited",
+            "window_start": summary["window_start"],
+            "window_end": summary["window_end"],
+            "total": sum(entry["count"] for entry in throttled),
+            "throttled": throttled
+        }
+        self.blockchain.add_block(transaction)
+        logger.info("Throttle summary logged: %d attempts", transaction['total'],
+                    extra={"event": "throttle_summary", "total": transaction['total']})
+    
+    # ============================================
+    # File Operations
+    # ============================================
     
     def create_file(self, file_id: str, owner_id: str, content: str = "", 
                    permissions: str = 'private') -> bool:
@@ -153,16 +696,15 @@ class FileManager:
         Returns:
             True if successful, False otherwise
         """
-        file_path = os.path.join(self.files_dir, file_id)
-        
         try:
-            # Create the physical file
-            with open(file_path, 'w') as f:
-                f.write(content)
-            
-            # Store metadata
-            self.metadata[file_id] = FileMetadata(file_id, owner_id, permissions)
-            self.save_metadata()
+            with self.locks.write(file_id):
+                # Create the physical file
+                content_hash = self._store_content(file_id, content)
+                
+                # Store metadata
+                self.metadata[file_id] = FileMetadata(file_id, owner_id, permissions, content_hash)
+            self._metadata_changed()
+            self._notify_metadata(file_id)
             
             # Log to blockchain
             transaction = {
@@ -172,13 +714,17 @@ class FileManager:
                 "file_id": file_id,
                 "status": "SUCCESS"
             }
+            if content_hash:
+                transaction["content_hash"] = content_hash
             self.blockchain.add_block(transaction)
             
-            print(f"✓ File created: {file_id} by {owner_id}")
+            logger.info("File created: %s by %s", file_id, owner_id,
+                        extra={"event": "file_created", "file_id": file_id, "user_id": owner_id})
             return True
         
         except Exception as e:
-            print(f"✗ File creation failed: {e}")
+            logger.error("File creation failed: %s", e,
+                         extra={"event": "create_failed", "file_id": file_id, "user_id": owner_id})
             
             # Log failure to blockchain
             transaction = {
@@ -196,25 +742,17 @@ class FileManager:
         """Read file contents (with permission check)"""
         # Check permission
         if self.access_control and not self.access_control.check_permission(user_id, file_id, 'READ'):
-            # Log denied attempt
-            transaction = {
-                "timestamp": datetime.now().isoformat(),
-                "user_id": user_id,
-                "action": "READ",
-                "file_id": file_id,
-                "status": "DENIED",
-                "reason": "Insufficient permissions"
-            }
-            self.blockchain.add_block(transaction)
-            print(f"✗ Access denied: {user_id} cannot read {file_id}")
+            self._log_denied(user_id, "READ", file_id)
             return None
         
         # Read file
-        file_path = os.path.join(self.files_dir, file_id)
-        
         try:
-            with open(file_path, 'r') as f:
-                content = f.read()
+            with self.locks.read(file_id):
+                content = self.cache.get(file_id) if self.cache else None
+                if content is None:
+                    content = self._load_content(file_id)
+                    if self.cache:
+                        self.cache.put(file_id, content)
             
             # Log success
             transaction = {
@@ -226,41 +764,37 @@ class FileManager:
             }
             self.blockchain.add_block(transaction)
             
-            print(f"✓ File read: {file_id} by {user_id}")
+            logger.info("File read: %s by %s", file_id, user_id,
+                        extra={"event": "file_read", "file_id": file_id, "user_id": user_id})
             return content
         
         except FileNotFoundError:
-            print(f"✗ File not found: {file_id}")
+            logger.error("File not found: %s", file_id,
+                         extra={"event": "file_not_found", "file_id": file_id})
             return None
     
     def write_file(self, file_id: str, user_id: str, content: str) -> bool:
         """Write/append to file (with permission check)"""
         # Check permission
         if self.access_control and not self.access_control.check_permission(user_id, file_id, 'WRITE'):
-            # Log denied attempt
-            transaction = {
-                "timestamp": datetime.now().isoformat(),
-                "user_id": user_id,
-                "action": "WRITE",
-                "file_id": file_id,
-                "status": "DENIED",
-                "reason": "Insufficient permissions"
-            }
-            self.blockchain.add_block(transaction)
-            print(f"✗ Access denied: {user_id} cannot write to {file_id}")
+            self._log_denied(user_id, "WRITE", file_id)
             return False
         
         # Write to file
-        file_path = os.path.join(self.files_dir, file_id)
-        
         try:
-            with open(file_path, 'w') as f:
-                f.write(content)
-            
-            # Update metadata
-            if file_id in self.metadata:
-                self.metadata[file_id].last_modified = datetime.now().isoformat()
-                self.save_metadata()
+            with self.locks.write(file_id):
+                if self.blob_store and file_id not in self.metadata:
+                    raise FileNotFoundError(f"No such file: {file_id}")
+                
+                content_hash = self._store_content(file_id, content)
+                
+                # Update metadata
+                meta = self.metadata.get(file_id)
+                if meta:
+                    meta.content_hash = content_hash
+                    meta.last_modified = datetime.now().isoformat()
+            if meta:
+                self._metadata_changed()
             
             # Log success
             transaction = {
@@ -271,42 +805,36 @@ class FileManager:
                 "status": "SUCCESS",
                 "content_length": len(content)
             }
+            if content_hash:
+                transaction["content_hash"] = content_hash
             self.blockchain.add_block(transaction)
             
-            print(f"✓ File written: {file_id} by {user_id}")
+            logger.info("File written: %s by %s", file_id, user_id,
+                        extra={"event": "file_written", "file_id": file_id, "user_id": user_id})
             return True
         
         except Exception as e:
-            print(f"✗ Write failed: {e}")
+            logger.error("Write failed: %s", e,
+                         extra={"event": "write_failed", "file_id": file_id, "user_id": user_id})
             return False
     
     def delete_file(self, file_id: str, user_id: str) -> bool:
         """Delete file (with permission check)"""
         # Check permission
         if self.access_control and not self.access_control.check_permission(user_id, file_id, 'DELETE'):
-            # Log denied attempt
-            transaction = {
-                "timestamp": datetime.now().isoformat(),
-                "user_id": user_id,
-                "action": "DELETE",
-                "file_id": file_id,
-                "status": "DENIED",
-                "reason": "Insufficient permissions"
-            }
-            self.blockchain.add_block(transaction)
-            print(f"✗ Access denied: {user_id} cannot delete {file_id}")
+            self._log_denied(user_id, "DELETE", file_id)
             return False
         
         # Delete file
-        file_path = os.path.join(self.files_dir, file_id)
-        
         try:
-            os.remove(file_path)
-            
-            # Remove metadata
-            if file_id in self.metadata:
-                del self.metadata[file_id]
-                self.save_metadata()
+            with self.locks.write(file_id):
+                self._remove_content(file_id)
+                
+                # Remove metadata
+                removed = self.metadata.pop(file_id, None)
+            if removed:
+                self._metadata_changed()
+                self._notify_metadata(file_id)
             
             # Log success
             transaction = {
@@ -318,13 +846,242 @@ class FileManager:
             }
             self.blockchain.add_block(transaction)
             
-            print(f"✓ File deleted: {file_id} by {user_id}")
+            logger.info("File deleted: %s by %s", file_id, user_id,
+                        extra={"event": "file_deleted", "file_id": file_id, "user_id": user_id})
             return True
         
         except FileNotFoundError:
-            print(f"✗ File not found: {file_id}")
+            logger.error("File not found: %s", file_id,
+                         extra={"event": "file_not_found", "file_id": file_id})
             return False
     
+    # ============================================
+    # Batch Operations
+    # ============================================
+    
+    def _log_batch(self, user_id: str, action: str, transactions: List[Dict]):
+        """Log a whole batch as a single block"""
+        succeeded = sum(1 for t in transactions if t["status"] == "SUCCESS")
+        batch = {
+            "timestamp": datetime.now().isoformat(),
+            "user_id": user_id,
+            "action": "BATCH",
+            "batch_action": action,
+            "status": "SUCCESS" if succeeded == len(transactions) else "PARTIAL",
+            "count": len(transactions),
+            "transactions": transactions
+        }
+        self.blockchain.add_block(batch)
+        logger.info("Batch %s: %d/%d files by %s", action, succeeded, len(transactions), user_id,
+                    extra={"event": "batch", "batch_action": action, "user_id": user_id,
+                           "succeeded": succeeded, "count": len(transactions)})
+    
+    def _batch_transaction(self, user_id: str, action: str, file_id: str,
+                           status: str, **details) -> Dict:
+        """Per-file entry of a batch block (same fields as a single-file block)"""
+        transaction = {
+            "user_id": user_id,
+            "action": action,
+            "file_id": file_id,
+            "status": status
+        }
+        transaction.update(details)
+        return transaction
+    
+    def _denial_reason(self, user_id: str, action: str) -> str:
+        """Reason to log for a batch's refusals (taken before its permission check)"""
+        limiter = self.access_control.rate_limiter if self.access_control else None
+        if limiter and limiter.is_limited((user_id, action)):
+            return "Rate limited"  # Refused without evaluation, even for allowed files
+        return "Insufficient permissions"
+    
+    def _check_bulk(self, user_id: str, file_ids: List[str], action: str) -> Dict[str, bool]:
+        """Permission decisions for a whole batch (all allowed without access control)"""
+        if not self.access_control:
+            return {file_id: True for file_id in file_ids}
+        return self.access_control.check_permissions_bulk(user_id, file_ids, action)
+    
+    def create_files(self, files: Dict[str, str], owner_id: str,
+                     permissions: str = 'private') -> Dict[str, bool]:
+        """
+        Create many files with one metadata save and one block
+        
+        Args:
+            files: Mapping of file_id -> initial content
+            owner_id: User ID of the creator
+            permissions: 'private' or 'public' for every file
+        
+        Returns:
+            Mapping of file_id -> True if created
+        """
+        if not files:
+            return {}
+        
+        results = {}
+        transactions = []
+        
+        # CREATE does not depend on the file, so one check covers the batch
+        first_id = next(iter(files))
+        reason = self._denial_reason(owner_id, 'CREATE')
+        if self.access_control and not self.access_control.check_permission(owner_id, first_id, 'CREATE'):
+            for file_id in files:
+                results[file_id] = False
+                transactions.append(self._batch_transaction(
+                    owner_id, "CREATE", file_id, "DENIED", reason=reason))
+            self._log_batch(owner_id, "CREATE", transactions)
+            return results
+        
+        for file_id, content in files.items():
+            try:
+                with self.locks.write(file_id):
+                    content_hash = self._store_content(file_id, content)
+                    self.metadata[file_id] = FileMetadata(file_id, owner_id, permissions, content_hash)
+                self._notify_metadata(file_id)
+                
+                details = {"content_hash": content_hash} if content_hash else {}
+                transactions.append(self._batch_transaction(
+                    owner_id, "CREATE", file_id, "SUCCESS", **details))
+                results[file_id] = True
+            except Exception as e:
+                transactions.append(self._batch_transaction(
+                    owner_id, "CREATE", file_id, "FAILED", error=str(e)))
+                results[file_id] = False
+        
+        if any(results.values()):
+            self._metadata_changed()
+        self._log_batch(owner_id, "CREATE", transactions)
+        return results
+    
+    def write_files(self, files: Dict[str, str], user_id: str) -> Dict[str, bool]:
+        """
+        Write many files with one metadata save and one block
+        
+        Args:
+            files: Mapping of file_id -> new content
+            user_id: User performing the writes
+        
+        Returns:
+            Mapping of file_id -> True if written
+        """
+        if not files:
+            return {}
+        
+        results = {}
+        transactions = []
+        reason = self._denial_reason(user_id, 'WRITE')
+        allowed = self._check_bulk(user_id, list(files), 'WRITE')
+        
+        for file_id, content in files.items():
+            if not allowed[file_id]:
+                transactions.append(self._batch_transaction(
+                    user_id, "WRITE", file_id, "DENIED", reason=reason))
+                results[file_id] = False
+                continue
+            
+            try:
+                with self.locks.write(file_id):
+                    if self.blob_store and file_id not in self.metadata:
+                        raise FileNotFoundError(f"No such file: {file_id}")
+                    
+                    content_hash = self._store_content(file_id, content)
+                    if file_id in self.metadata:
+                        self.metadata[file_id].content_hash = content_hash
+                        self.metadata[file_id].last_modified = datetime.now().isoformat()
+                
+                details = {"content_length": len(content)}
+                if content_hash:
+                    details["content_hash"] = content_hash
+                transactions.append(self._batch_transaction(
+                    user_id, "WRITE", file_id, "SUCCESS", **details))
+                results[file_id] = True
+            except Exception as e:
+                transactions.append(self._batch_transaction(
+                    user_id, "WRITE", file_id, "FAILED", error=str(e)))
+                results[file_id] = False
+        
+        if any(results.values()):
+            self._metadata_changed()
+        self._log_batch(user_id, "WRITE", transactions)
+        return results
+    
+    def delete_files(self, file_ids: List[str], user_id: str) -> Dict[str, bool]:
+        """
+        Delete many files with one metadata save and one block
+        
+        Args:
+            file_ids: Files to delete
+            user_id: User performing the deletes
+        
+        Returns:
+            Mapping of file_id -> True if deleted
+        """
+        if not file_ids:
+            return {}
+        
+        results = {}
+        transactions = []
+        reason = self._denial_reason(user_id, 'DELETE')
+        allowed = self._check_bulk(user_id, file_ids, 'DELETE')
+        
+        for file_id in file_ids:
+            if not allowed[file_id]:
+                transactions.append(self._batch_transaction(
+                    user_id, "DELETE", file_id, "DENIED", reason=reason))
+                results[file_id] = False
+                continue
+            
+            try:
+                with self.locks.write(file_id):
+                    self._remove_content(file_id)
+                    self.metadata.pop(file_id, None)
+                self._notify_metadata(file_id)
+                transactions.append(self._batch_transaction(
+                    user_id, "DELETE", file_id, "SUCCESS"))
+                results[file_id] = True
+            except FileNotFoundError:
+                transactions.append(self._batch_transaction(
+                    user_id, "DELETE", file_id, "FAILED", error="File not found"))
+                results[file_id] = False
+        
+        if any(results.values()):
+            self._metadata_changed()
+        self._log_batch(user_id, "DELETE", transactions)
+        return results
+    
+    def update_file_metadata(self, file_id: str, owner_id: Optional[str] = None,
+                             permissions: Optional[str] = None) -> bool:
+        """
+        Change a file's owner and/or permissions
+        
+        Always go through this method rather than editing FileMetadata
+        directly, so cached permission decisions are invalidated.
+        
+        Returns:
+            True if the file exists
+        """
+        with self.locks.write(file_id):
+            meta = self.metadata.get(file_id)
+            if not meta:
+                return False
+            if owner_id is not None:
+                meta.owner_id = owner_id
+            if permissions is not None:
+                meta.permissions = permissions
+            meta.last_modified = datetime.now().isoformat()
+        
+        self._metadata_changed()
+        self._notify_metadata(file_id)
+        return True
+    
+    def _notify_metadata(self, file_id: str):
+        """Tell listeners (e.g. permission caches) that a file's metadata changed"""
+        for listener in self.metadata_listeners:
+            listener(file_id)
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Read cache counters (empty if caching is disabled)"""
+        return self.cache.stats() if self.cache else {}
+    
     def get_file_metadata(self, file_id: str) -> Optional[FileMetadata]:
         """Get metadata for a file"""
         return self.metadata.get(file_id)
@@ -333,26 +1090,49 @@ class FileManager:
         """List all files (shows only accessible files)"""
         return list(self.metadata.keys())
     
+    def _metadata_changed(self):
+        """Persist metadata now, or mark it dirty if saving is deferred"""
+        if self.autosave_metadata:
+            self.save_metadata()
+        else:
+            self.metadata_dirty = True
+    
     def save_metadata(self):
         """Save metadata to file"""
-        metadata_dict = {fid: meta.to_dict() for fid, meta in self.metadata.items()}
-        with open('file_metadata.json', 'w') as f:
-            json.dump(metadata_dict, f, indent=2)
+        with self._metadata_lock:
+            # Cleared before the snapshot: a change made meanwhile marks it again
+            self.metadata_dirty = False
+            # Snapshot first: other threads may add or remove files meanwhile
+            items = list(self.metadata.items())
+            metadata_dict = {fid: meta.to_dict() for fid, meta in items}
+            try:
+                atomic_write('file_metadata.json', json.dumps(metadata_dict, indent=2),
+                             self.fsync_writes)
+            except BaseException:
+                self.metadata_dirty = True
+                raise
     
     def load_metadata(self):
-        """Load metadata from file"""
+        """Load metadata from file (replaces what is in memory)"""
+        metadata: Dict[str, FileMetadata] = {}
         try:
             with open('file_metadata.json', 'r') as f:
                 metadata_dict = json.load(f)
             
             for file_id, meta_dict in metadata_dict.items():
                 meta = FileMetadata(meta_dict['file_id'], meta_dict['owner_id'], 
-                                   meta_dict['permissions'])
+                                   meta_dict['permissions'], meta_dict.get('content_hash'))
                 meta.created = meta_dict['created']
                 meta.last_modified = meta_dict['last_modified']
-                self.metadata[file_id] = meta
+                metadata[file_id] = meta
         except FileNotFoundError:
             pass  # No existing metadata
+        
+        if self.blob_store:
+            self.blob_store.rebuild_refcounts(metadata)
+        self._metadata = metadata
+        for listener in self.reload_listeners:
+            listener()
 
 
 # ============================================
@@ -361,6 +1141,8 @@ class FileManager:
 
 if __name__ == "__main__":
     """Demo file operations"""
+    import log_config
+    log_config.configure(use_queue=False)
     from blockchain import Blockchain
     
     print("\n" + "="*70)
@@ -0,0 +1,448 @@
+"""
+============================================
+OS Project: Persistent Ledger
+Append-only on-disk chain with checkpoints and crash recovery
+============================================
+
+Each block is appended to a JSON-lines file as it is added, along with its
+byte offset in an index file (8 bytes per block). Every checkpoint_every
+blocks, a checkpoint records the index, hash and file position of the
+latest block once the ledger is on disk.
+
+On reopen only the blocks after the checkpoint are read and verified; the
+checkpointed prefix was verified when it was written and is read from
+disk on demand. A final record that is incomplete or fails verification
+(a write torn by a crash) is cut off. Damage anywhere before the final
+record is not a torn write, so reopening refuses to continue.
+"""
+
+import json
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from blockchain import Blockchain, Block
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class LazyChain:
+    """
+    Block list whose checkpointed prefix stays on disk
+    
+    Stands in for Blockchain.chain. Blocks before prefix_length are parsed
+    from the ledger file when accessed (recently used ones are cached);
+    later blocks live in memory, as in a plain chain.
+    """
+    
+    def __init__(self, path: str, offsets: array, prefix_length: int, tail: List[Block],
+                 cache_size: int = 1024):
+        """
+        Initialize lazy chain
+        
+        Args:
+            path: Ledger file
+            offsets: Byte offset of every block's record (at least prefix_length)
+            prefix_length: Blocks read from disk on demand
+            tail: Blocks after the prefix, in order
+            cache_size: Prefix blocks kept after being read
+        """
+        self.offsets = offsets
+        self.prefix_length = prefix_length
+        self.tail = tail
+        self.cache_size = cache_size
+        self.on_truncate: Optional[Callable[[int], None]] = None
+        self._cache: "OrderedDict[int, Block]" = OrderedDict()
+        self._file = open(path, 'rb')
+        self._lock = threading.Lock()  # Guards the shared file position and the cache
+    
+    def __len__(self) -> int:
+        return self.prefix_length + len(self.tail)
+    
+    def _read(self, index: int) -> Block:
+        """Parse one prefix block (cached)"""
+        with self._lock:
+            block = self._cache.get(index)
+            if block is not None:
+                self._cache.move_to_end(index)
+                return block
+            self._file.seek(self.offsets[index])
+            block = Block.from_dict(json.loads(self._file.readline()))
+            self._cache[index] = block
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return block
+    
+    def _read_range(self, start: int, stop: int):
+        """Yield prefix blocks start..stop-1, reading the file sequentially"""
+        position = start
+        while position < stop:
+            with self._lock:
+                self._file.seek(self.offsets[position])
+                lines = [self._file.readline() for _ in range(min(256, stop - position))]
+            for line in lines:
+                yield Block.from_dict(json.loads(line))
+            position += len(lines)
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            stop = max(stop, start)
+            blocks = list(self._read_range(start, min(stop, self.prefix_length)))
+            return blocks + self.tail[max(start - self.prefix_length, 0):
+                                      max(stop - self.prefix_length, 0)]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("chain index out of range")
+        if key < self.prefix_length:
+            return self._read(key)
+        return self.tail[key - self.prefix_length]
+    
+    def __iter__(self):
+        yield from self._read_range(0, self.prefix_length)
+        yield from self.tail  # List iteration also sees blocks appended meanwhile
+    
+    def append(self, block: Block):
+        self.tail.append(block)
+    
+    def __delitem__(self, key):
+        """Only truncation (del chain[n:]) is supported"""
+        if not isinstance(key, slice) or key.stop is not None or key.step is not None:
+            raise ValueError("LazyChain only supports truncation: del chain[n:]")
+        length = key.indices(len(self))[0]
+        if length >= self.prefix_length:
+            del self.tail[length - self.prefix_length:]
+        else:
+            self.prefix_length = length
+            self.tail.clear()
+            with self._lock:
+                for index in [i for i in self._cache if i >= length]:
+                    del self._cache[index]
+        if self.on_truncate:
+            self.on_truncate(length)
+    
+    def close(self):
+        self._file.close()
+
+
+class LedgerStore:
+    """Keeps a Blockchain in an append-only file and recovers it on restart"""
+    
+    def __init__(self, path: str = "audit_ledger.jsonl", checkpoint_every: int = 1000,
+                 fsync: bool = False):
+        """
+        Initialize ledger store
+        
+        Args:
+            path: Ledger file (the index and checkpoint files sit next to it)
+            checkpoint_every: Blocks between checkpoints; at most this many
+                              blocks are verified on the next reopen
+            fsync: fsync every record (otherwise only checkpoints are fsynced;
+                   records are still flushed to the OS as they are written)
+        """
+        if checkpoint_every < 1:
+            raise ValueError(f"Invalid checkpoint_every: {checkpoint_every}")
+        self.path = path
+        self.index_path = path + ".idx"
+        self.checkpoint_path = path + ".checkpoint"
+        self.checkpoint_every = checkpoint_every
+        self.fsync = fsync
+        self.blockchain: Optional[Blockchain] = None
+        self.recovery: Dict[str, float] = {}
+        self._ledger = None
+        self._index = None
+        self._offsets = array('Q')
+        self._position = 0
+        self._since_checkpoint = 0
+        self._last: Optional[Block] = None
+        self.failed: Optional[Exception] = None  # First write error; nothing is written after it
+        self._lock = threading.Lock()  # Serializes writes, checkpoints and truncation
+    
+    # ============================================
+    # Opening & Recovery
+    # ============================================
+    
+    def open(self, blockchain: Optional[Blockchain] = None) -> Blockchain:
+        """
+        Reopen the ledger (or start it) and persist every new block
+        
+        Args:
+            blockchain: Chain to attach; its blocks are replaced by the
+                        ledger's when the ledger file already has records
+        
+        Returns:
+            The attached blockchain
+        
+        Raises:
+            ValueError: The ledger is damaged before its final record
+        """
+        blockchain = blockchain or Blockchain()
+        start = time.perf_counter()
+        with blockchain._lock:
+            fresh = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            if fresh:
+                self._start_new(blockchain.chain)
+            else:
+                blockchain.chain = self._recover()
+        blockchain.subscribe(self._append)
+        self.blockchain = blockchain
+        
+        self.recovery["seconds"] = time.perf_counter() - start
+        self.recovery["blocks"] = len(blockchain.chain)
+        logger.info("Ledger %s %s: %d blocks (%d verified since checkpoint, %.1f ms)",
+                    self.path, "created" if fresh else "reopened", len(blockchain.chain),
+                    self.recovery.get("verified", 0), self.recovery["seconds"] * 1000,
+                    extra={"event": "ledger_opened", "path": self.path, **self.recovery})
+        return blockchain
+    
+    def _start_new(self, blocks: List[Block]):
+        """Write a fresh ledger holding the chain's current blocks (normally genesis)"""
+        self._ledger = open(self.path, 'wb')
+        self._index = open(self.index_path, 'wb')
+        self._position = 0
+        self._offsets = array('Q')
+        for block in blocks:
+            self._write(block)
+        self.recovery = {"verified": 0, "truncated_bytes": 0}
+        self._checkpoint()
+    
+    def _read_checkpoint(self) -> Optional[Dict]:
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+            return checkpoint if {"index", "hash", "offset"} <= set(checkpoint) else None
+        except (OSError, ValueError):
+            return None
+    
+    def _recover(self) -> LazyChain:
+        """Load offsets up to the checkpoint, verify the tail, cut a torn final record"""
+        offsets = array('Q')
+        previous: Optional[Block] = None
+        position = 0
+        
+        checkpoint = self._read_checkpoint()
+        if checkpoint:
+            try:
+                with open(self.index_path, 'rb') as f:
+                    offsets.fromfile(f, checkpoint["index"] + 1)
+                with open(self.path, 'rb') as f:
+                    f.seek(offsets[-1])
+                    previous = Block.from_dict(json.loads(f.readline()))
+                    position = f.tell()
+                if (previous.index != checkpoint["index"] or previous.hash != checkpoint["hash"]
+                        or position != checkpoint["offset"]):
+                    raise ValueError("checkpoint does not match the ledger")
+            except (OSError, EOFError, ValueError, KeyError) as e:
+                logger.warning("Ignoring checkpoint of %s (%s); verifying the whole ledger",
+                               self.path, e, extra={"event": "checkpoint_ignored"})
+                offsets, previous, position = array('Q'), None, 0
+        prefix_length = len(offsets)
+        
+        tail: List[Block] = []
+        truncated = 0
+        with open(self.path, 'r+b') as f:
+            f.seek(position)
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                problem, torn = self._verify_record(line, previous)
+                if problem:
+                    # Only a partial write with nothing after it is a crash
+                    # artefact; a complete record that fails verification has
+                    # been altered and must not be silently erased
+                    if not torn or f.read(1):
+                        raise ValueError(f"Ledger {self.path} is damaged at byte {position} "
+                                         f"(block {len(offsets)}): {problem}")
+                    truncated = len(line)
+                    f.truncate(position)
+                    logger.warning("Cut torn final record of %s at byte %d (%s)",
+                                   self.path, position, problem,
+                                   extra={"event": "ledger_truncated", "offset": position})
+                    break
+                previous = Block.from_dict(json.loads(line))
+                offsets.append(position)
+                tail.append(previous)
+                position += len(line)
+        
+        if previous is None:
+            raise ValueError(f"Ledger {self.path} has no intact genesis block")
+        
+        # The index may hold entries for records past the checkpoint that were
+        # lost or cut; rewrite it from the verified offsets
+        with open(self.index_path, 'r+b' if os.path.exists(self.index_path) else 'wb') as f:
+            f.truncate(prefix_length * offsets.itemsize)
+            f.seek(0, os.SEEK_END)
+            offsets[prefix_length:].tofile(f)
+        
+        self._offsets = offsets
+        self._position = position
+        self._last = previous
+        self._ledger = open(self.path, 'ab')
+        self._index = open(self.index_path, 'ab')
+        self.recovery = {"verified": len(tail), "truncated_bytes": truncated}
+        if tail:
+            self._checkpoint()  # So the next reopen starts after these blocks
+        
+        chain = LazyChain(self.path, offsets, prefix_length, tail)
+        chain.on_truncate = self._truncate
+        return chain
+    
+    @staticmethod
+    def _verify_record(line: bytes, previous: Optional[Block]) -> Tuple[Optional[str], bool]:
+        """
+        Check that a record can follow previous
+        
+        Returns:
+            (problem, torn): problem is None if the record is valid; torn is
+            True when the record is incomplete or unparseable (a write cut
+            short) rather than a whole record with the wrong contents
+        """
+        if not line.endswith(b"\n"):
+            return "incomplete record", True
+        try:
+            block = Block.from_dict(json.loads(line))
+        except (ValueError, KeyError, TypeError):
+            return "unreadable record", True
+        expected_index = previous.index + 1 if previous else 0
+        expected_link = previous.hash if previous else "0"
+        if block.index != expected_index:
+            return f"expected block {expected_index}, found {block.index}", False
+        if block.previous_hash != expected_link:
+            return "broken chain link", False
+        if block.hash != block.calculate_hash():
+            return "invalid hash", False
+        return None, False
+    
+    # ============================================
+    # Appends & Checkpoints
+    # ============================================
+    
+    def _write(self, block: Block):
+        """Append one record and its offset (caller holds the lock or is opening)"""
+        record = (json.dumps(block.to_dict()) + "\n").encode()
+        self._ledger.write(record)
+        self._ledger.flush()
+        if self.fsync:
+            os.fsync(self._ledger.fileno())
+        self._index.write(self._position.to_bytes(8, 'little'))
+        self._offsets.append(self._position)
+        self._position += len(record)
+        self._last = block
+        self._since_checkpoint += 1
+    
+    def _append(self, block: Block):
+        """
+        Subscriber callback: persist a new block, in chain order
+        
+        A failed write (e.g. disk full) halts the chain: writing later
+        blocks would leave a gap that stops the next reopen, so the file
+        keeps the blocks before the failure (plus at most one torn record,
+        cut off on reopen) and further appends raise.
+        """
+        with self._lock:
+            if self.failed:
+                return  # Queued before the chain was halted
+            try:
+                self._write(block)
+                if self._since_checkpoint >= self.checkpoint_every:
+                    self._checkpoint()
+            except Exception as e:
+                self.failed = e
+                self.blockchain.halt(f"ledger {self.path} write failed at block {block.index}: {e}")
+                raise
+    
+    def _checkpoint(self):
+        """Make everything written so far durable, then record it as verified"""
+        from file_manager import atomic_write
+        
+        self._ledger.flush()
+        self._index.flush()
+        os.fsync(self._ledger.fileno())
+        os.fsync(self._index.fileno())
+        atomic_write(self.checkpoint_path,
+                     json.dumps({"index": self._last.index, "hash": self._last.hash,
+                                 "offset": self._position}))
+        self._since_checkpoint = 0
+    
+    def checkpoint(self):
+        """Write a checkpoint now (e.g. before a planned shutdown)"""
+        with self._lock:
+            if self._ledger:
+                self._checkpoint()
+    
+    def _truncate(self, length: int):
+        """Drop records from block length on (the chain was truncated)"""
+        with self._lock:
+            position = self._offsets[length] if length < len(self._offsets) else self._position
+            self._ledger.flush()
+            self._ledger.truncate(position)
+            self._index.flush()
+            self._index.truncate(length * self._offsets.itemsize)
+            del self._offsets[length:]
+            self._position = position
+            self._last = self.blockchain.chain[length - 1]
+            self._checkpoint()
+    
+    def close(self):
+        """Checkpoint and stop persisting new blocks"""
+        if self.blockchain is None:
+            return
+        self.blockchain.unsubscribe(self._append)
+        with self._lock:
+            if not self.failed:
+                self._checkpoint()
+            self._ledger.close()
+            self._index.close()
+            self._ledger = None
+        if isinstance(self.blockchain.chain, LazyChain):
+            self.blockchain.chain.close()
+        self.blockchain = None
+
+
+# ============================================
+# Demo
+# ============================================
+
+if __name__ == "__main__":
+    """Demo reopening a ledger after a crash mid-write"""
+    import tempfile
+    import log_config
+    log_config.configure(use_queue=False)
+    
+    print("\n" + "="*70)
+    print("DEMO: Persistent Ledger Recovery")
+    print("="*70 + "\n")
+    
+    path = os.path.join(tempfile.mkdtemp(prefix="ledger_demo_"), "audit_ledger.jsonl")
+    
+    store = LedgerStore(path, checkpoint_every=1000)
+    bc = store.open()
+    for i in range(25000):
+        bc.add_block({"action": "READ", "file_id": f"file_{i % 100}.txt",
+                      "user_id": "user001", "status": "SUCCESS"})
+    tip = bc.get_latest_block().hash
+    store.close()
+    print(f"Wrote {len(bc.chain):,} blocks\n")
+    
+    # Simulate a crash halfway through writing one more record
+    with open(path, 'ab') as f:
+        f.write(b'{"index": 25001, "timestamp": "2026-')
+    
+    store = LedgerStore(path, checkpoint_every=1000)
+    bc = store.open()
+    print(f"\nReopened in {store.recovery['seconds'] * 1000:.1f} ms: {len(bc.chain):,} blocks, "
+          f"{store.recovery['verified']} verified, {store.recovery['truncated_bytes']} bytes cut")
+    print(f"Tip unchanged: {'✓ YES' if bc.get_latest_block().hash == tip else '✗ NO'}")
+    
+    bc.add_block({"action": "WRITE", "file_id": "file_1.txt",
+                  "user_id": "user001", "status": "SUCCESS"})
+    print(f"Appended block {bc.get_latest_block().index}; "
+          f"chain valid: {'✓ YES' if bc.validate_chain() else '✗ NO'}")
+    store.close()
@@ -0,0 +1,112 @@
+"""
+============================================
+OS Project: Concurrency Primitives
+Reader/writer locks for per-file synchronization
+============================================
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """Many concurrent readers or one writer (writers are preferred)"""
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+    
+    def acquire_read(self):
+        """Wait until no writer holds or is waiting for the lock"""
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+    
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+    
+    def acquire_write(self):
+        """Wait until there are no readers and no writer"""
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+    
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class FileLockTable:
+    """
+    Per-key reader/writer locks, created on demand
+    
+    The table itself is split into stripes, each guarded by its own mutex,
+    so looking up locks for different keys rarely contends. Each key gets
+    its own ReadWriteLock, so a reader never waits on an unrelated key;
+    unused locks are dropped to keep memory proportional to active keys.
+    """
+    
+    def __init__(self, stripes: int = 64):
+        """
+        Initialize lock table
+        
+        Args:
+            stripes: Number of independently guarded table shards
+        """
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._tables = [{} for _ in range(stripes)]  # key -> [lock, users]
+    
+    def _checkout(self, key: str) -> ReadWriteLock:
+        """Get (or create) the lock for key and register a user"""
+        stripe = hash(key) % len(self._stripes)
+        with self._stripes[stripe]:
+            entry = self._tables[stripe].get(key)
+            if entry is None:
+                entry = self._tables[stripe][key] = [ReadWriteLock(), 0]
+            entry[1] += 1
+            return entry[0]
+    
+    def _checkin(self, key: str):
+        """Unregister a user; drop the lock when nobody holds or waits"""
+        stripe = hash(key) % len(self._stripes)
+        with self._stripes[stripe]:
+            entry = self._tables[stripe][key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._tables[stripe][key]
+    
+    @contextmanager
+    def read(self, key: str):
+        """Hold the shared (read) lock for key"""
+        lock = self._checkout(key)
+        lock.acquire_read()
+        try:
+            yield
+        finally:
+            lock.release_read()
+            self._checkin(key)
+    
+    @contextmanager
+    def write(self, key: str):
+        """Hold the exclusive (write) lock for key"""
+        lock = self._checkout(key)
+        lock.acquire_write()
+        try:
+            yield
+        finally:
+            lock.release_write()
+            self._checkin(key)
+    
+    def active_keys(self) -> int:
+        """Number of keys with a lock currently held or awaited"""
+        return sum(len(table) for table in self._tables)
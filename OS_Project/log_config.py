@@ -0,0 +1,135 @@
+"""
+============================================
+OS Project: Logging Configuration
+Structured, level-controlled logging with an asynchronous queue handler
+============================================
+
+Modules log through get_logger(__name__) and never print operational
+messages. Until configure() is called nothing is emitted, so library use
+(benchmarks, servers) pays only for a level check per message.
+"""
+
+import atexit
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Optional
+
+ROOT_LOGGER = "os_project"
+
+# LogRecord attributes that are not user-supplied fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message"}
+
+logging.getLogger(ROOT_LOGGER).addHandler(logging.NullHandler())
+
+_listener = None  # logging.handlers.QueueListener while queued logging is on
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module, under the os_project hierarchy"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and extra fields"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Human-readable lines in the style of the interactive menu (✓ / ⚠ / ✗)"""
+    
+    MARKS = {logging.DEBUG: "·", logging.INFO: "✓", logging.WARNING: "⚠",
+             logging.ERROR: "✗", logging.CRITICAL: "✗"}
+    
+    def format(self, record: logging.LogRecord) -> str:
+        return f"{self.MARKS.get(record.levelno, '•')} {record.getMessage()}"
+
+
+def configure(level: Optional[str] = None, fmt: Optional[str] = None,
+              filename: Optional[str] = None, stream=None, use_queue: bool = True):
+    """
+    Configure logging for the whole project (replaces earlier configuration)
+    
+    Args:
+        level: DEBUG, INFO, WARNING, ... (default $OS_PROJECT_LOG_LEVEL or INFO)
+        fmt: 'console' or 'json' (default $OS_PROJECT_LOG_FORMAT or console)
+        filename: Append log lines to this file instead of a stream
+        stream: Stream for log lines (default stdout)
+        use_queue: Hand records to a background thread so callers never
+                   wait on terminal or disk I/O
+    """
+    global _listener
+    shutdown()
+    
+    level = (level or os.environ.get("OS_PROJECT_LOG_LEVEL", "INFO")).upper()
+    fmt = fmt or os.environ.get("OS_PROJECT_LOG_FORMAT", "console")
+    if fmt not in ("console", "json"):
+        raise ValueError(f"Unknown log format: {fmt}")
+    
+    if filename:
+        target = logging.FileHandler(filename)
+    else:
+        target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(JsonFormatter() if fmt == "json" else ConsoleFormatter())
+    
+    root = logging.getLogger(ROOT_LOGGER)
+    for handler in list(root.handlers):
+        if not isinstance(handler, logging.NullHandler):
+            root.removeHandler(handler)
+    root.setLevel(level)
+    root.propagate = False
+    
+    if use_queue:
+        # Imported here: logging.handlers pulls in socket and pickle, which
+        # interactive runs (use_queue=False) never need
+        from logging.handlers import QueueHandler, QueueListener
+        import queue
+        
+        class InProcessQueueHandler(QueueHandler):
+            """QueueHandler that leaves formatting to the listener thread"""
+            
+            def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+                # The stock prepare() formats on the caller's thread so records can
+                # be pickled; the queue never leaves this process, so skip that.
+                return record
+        
+        records = queue.SimpleQueue()
+        root.addHandler(InProcessQueueHandler(records))
+        _listener = QueueListener(records, target)
+        _listener.start()
+    else:
+        root.addHandler(target)
+
+
+def flush():
+    """Wait until queued records have been written"""
+    global _listener
+    if _listener:
+        _listener.stop()  # Drains the queue
+        _listener.start()
+
+
+def shutdown():
+    """Stop the background writer after draining queued records"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown)
@@ -9,27 +9,40 @@ Integrates all modules: Blockchain, File Manager, Access Control, Audit
 from blockchain import Blockchain
 from file_manager import UserManager, FileManager
 from access_control import AccessControl
-from audit_reports import AuditReporter
+import log_config
 import os
 import sys
+from typing import Optional
 
 class FileAccessControlSystem:
     """Complete file access control system with blockchain"""
     
-    def __init__(self):
-        """Initialize all system components"""
+    def __init__(self, ledger_path: Optional[str] = "audit_ledger.jsonl"):
+        """
+        Initialize all system components
+        
+        Args:
+            ledger_path: Persisted audit ledger to reopen (None keeps the
+                         blockchain in memory only)
+        """
         print("\n" + "="*70)
         print("BLOCKCHAIN-BASED FILE ACCESS CONTROL SYSTEM")
         print("="*70)
         print("\nInitializing system components...")
         
         # Initialize core modules
-        self.blockchain = Blockchain()
+        self.ledger_store = None
+        if ledger_path:
+            from ledger_store import LedgerStore
+            self.ledger_store = LedgerStore(ledger_path)
+            self.blockchain = self.ledger_store.open()
+        else:
+            self.blockchain = Blockchain()
         self.user_manager = UserManager()
         self.file_manager = FileManager(self.blockchain, self.user_manager)
         self.access_control = AccessControl(self.user_manager, self.file_manager, 
                                            self.blockchain)
-        self.audit_reporter = AuditReporter(self.blockchain, self.user_manager)
+        self._audit_reporter = None  # Built on the first report
         
         # Link access control to file manager
         self.file_manager.access_control = self.access_control
@@ -39,6 +52,21 @@ class FileAccessControlSystem:
         # Current logged-in user
         self.current_user = None
     
+    @property
+    def audit_reporter(self):
+        """AuditReporter, created (and its module imported) on first use"""
+        if self._audit_reporter is None:
+            from audit_reports import AuditReporter
+            self._audit_reporter = AuditReporter(self.blockchain, self.user_manager)
+        return self._audit_reporter
+    
+    def close(self):
+        """Log pending throttle counts, then checkpoint and close the persisted ledger"""
+        self.file_manager.flush_throttle_summary(force=True)
+        if self.ledger_store:
+            self.ledger_store.close()
+            self.ledger_store = None
+    
     def login(self, user_id: str):
         """Login a user"""
         user = self.user_manager.get_user(user_id)
@@ -251,16 +279,25 @@ class FileAccessControlSystem:
         print("3. Security Report (Unauthorized Attempts)")
         print("4. System Statistics")
         print("5. Export Blockchain to CSV")
+        print("6. Recent Accesses to a File")
         print("0. Back to Main Menu")
         
         choice = input("\nEnter your choice: ").strip()
         
         if choice == '1':
             file_id = input("\nEnter file name: ").strip()
-            self.audit_reporter.generate_file_access_report(file_id)
+            page = 1
+            while self.audit_reporter.generate_file_access_report(file_id, page) > page:
+                if input("Enter for the next page, q to stop: ").strip().lower() == 'q':
+                    break
+                page += 1
         elif choice == '2':
             user_id = input("\nEnter user ID: ").strip()
-            self.audit_reporter.generate_user_activity_report(user_id)
+            page = 1
+            while self.audit_reporter.generate_user_activity_report(user_id, page) > page:
+                if input("Enter for the next page, q to stop: ").strip().lower() == 'q':
+                    break
+                page += 1
         elif choice == '3':
             self.audit_reporter.generate_security_report()
         elif choice == '4':
@@ -269,6 +306,9 @@ class FileAccessControlSystem:
             filename = input("\nEnter filename [blockchain_audit.csv]: ").strip()
             filename = filename or "blockchain_audit.csv"
             self.audit_reporter.export_blockchain_to_csv(filename)
+        elif choice == '6':
+            file_id = input("\nEnter file name: ").strip()
+            self.audit_reporter.generate_recent_access_report(file_id)
         elif choice == '0':
             return
         else:
@@ -301,7 +341,7 @@ def run_demo():
     print("RUNNING AUTOMATED DEMO")
     print("="*70)
     
-    system = FileAccessControlSystem()
+    system = FileAccessControlSystem(ledger_path=None)  # Keep demo events out of the audit ledger
     
     # Display permission matrix
     system.access_control.display_permission_matrix()
@@ -357,12 +397,176 @@ def run_demo():
 # Main Entry Point
 # ============================================
 
+def run_report(kind: str, target: str = None, ledger: str = None, page: int = 1):
+    """Generate a single audit report, optionally over a saved blockchain"""
+    # A JSON export is loaded into memory; otherwise report on the persisted ledger
+    system = FileAccessControlSystem(ledger_path=None if ledger else "audit_ledger.jsonl")
+    if ledger:
+        system.blockchain.load_from_file(ledger)
+    
+    try:
+        reporter = system.audit_reporter
+        if kind in ('file', 'recent', 'user') and not target:
+            raise ValueError(f"The {kind} report needs --target")
+        if kind == 'file':
+            reporter.generate_file_access_report(target, page)
+        elif kind == 'recent':
+            reporter.generate_recent_access_report(target)
+        elif kind == 'user':
+            reporter.generate_user_activity_report(target, page)
+        elif kind == 'security':
+            reporter.generate_security_report()
+        elif kind == 'stats':
+            reporter.generate_summary_statistics()
+    finally:
+        system.close()
+
+
+# Operation fields that can be given on the command line
+BATCH_FIELDS = ("user_id", "file_id", "content", "permissions", "report",
+                "start_time", "end_time", "offset", "limit", "format", "path")
+
+
+def run_command(args) -> int:
+    """
+    Run a batch subcommand, printing one JSON result per line
+    
+    Operations come from --batch (a file, or '-' for stdin), one JSON object
+    per line; fields given on the command line fill in what a line leaves
+    out, and the subcommand name is the default "op". Without --batch the
+    command line describes a single operation.
+    
+    Returns:
+        Exit status: 0, or 1 if any operation was invalid
+    """
+    from batch import BatchRunner, read_operations, write_results
+    
+    defaults = {field: getattr(args, field) for field in BATCH_FIELDS
+                if getattr(args, field, None) is not None}
+    if args.command != "batch":
+        defaults["op"] = args.command
+    
+    if args.batch:
+        stream = sys.stdin if args.batch == "-" else open(args.batch, 'r')
+        ops = ({**defaults, **op} for op in read_operations(stream))
+    else:
+        stream = None
+        ops = [defaults]
+    
+    runner = BatchRunner(ledger=args.ledger or "audit_ledger.jsonl")
+    try:
+        totals = write_results(runner.run(ops), sys.stdout)
+    finally:
+        runner.close()
+        if stream not in (None, sys.stdin):
+            stream.close()
+    return 1 if totals["errors"] else 0
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == '--demo':
-        # Run automated demo
-        run_demo()
+    import argparse
+    from contextlib import nullcontext
+    
+    parser = argparse.ArgumentParser(description="Blockchain-based file access control system")
+    parser.add_argument("--demo", action="store_true", help="run the automated demo")
+    parser.add_argument("--report", choices=["file", "recent", "user", "security", "stats"],
+                        help="generate one audit report and exit")
+    parser.add_argument("--target", help="file or user ID for --report file/recent/user")
+    parser.add_argument("--page", type=int, default=1, help="page of a long --report file/user")
+    parser.add_argument("--ledger", help="blockchain JSON file to report on instead of the "
+                                         "persisted ledger (a .jsonl ledger for commands)")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile", "sample"],
+                        help="profile the run (default profiler: cprofile)")
+    parser.add_argument("--profile-out", default="profile",
+                        help="output prefix for .pstats and .collapsed files")
+    parser.add_argument("--sample-interval", type=float, default=5.0,
+                        help="milliseconds between samples with --profile sample")
+    
+    # Non-interactive commands: one operation from the flags, or many via --batch
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--batch", metavar="FILE",
+                        help="JSON lines of operations ('-' reads stdin)")
+    common.add_argument("--ledger", default=argparse.SUPPRESS,
+                        help="audit ledger: .jsonl is appended to as operations run, "
+                             "other files are loaded and saved as JSON "
+                             "(default: audit_ledger.jsonl)")
+    target = argparse.ArgumentParser(add_help=False)
+    target.add_argument("--user", dest="user_id")
+    target.add_argument("--file", dest="file_id")
+    
+    sub = parser.add_subparsers(dest="command", metavar="command",
+                                help="create, read, write, delete, list, report, "
+                                     "validate, export or batch (JSON output)")
+    create = sub.add_parser("create", parents=[common, target], help="create a file")
+    create.add_argument("--content")
+    create.add_argument("--permissions", choices=["private", "public"])
+    sub.add_parser("read", parents=[common, target], help="read a file")
+    write = sub.add_parser("write", parents=[common, target], help="overwrite a file")
+    write.add_argument("--content")
+    sub.add_parser("delete", parents=[common, target], help="delete a file")
+    sub.add_parser("list", parents=[common, target], help="list files")
+    report = sub.add_parser("report", parents=[common, target], help="query the audit trail")
+    report.add_argument("report", nargs="?",
+                        choices=["file_access", "recent_access", "user_activity", "security",
+                                 "timeline", "stats"])
+    report.add_argument("--start", dest="start_time")
+    report.add_argument("--end", dest="end_time")
+    report.add_argument("--offset", type=int, help="file_access/user_activity: events to skip")
+    report.add_argument("--limit", type=int,
+                        help="file_access/user_activity: maximum events returned; "
+                             "recent_access: how many recent accesses")
+    sub.add_parser("validate", parents=[common], help="validate the blockchain")
+    export = sub.add_parser("export", parents=[common, target],
+                            help="export the chain (csv) or a report (json)")
+    export.add_argument("--format", choices=["csv", "json"])
+    export.add_argument("--report", dest="report",
+                        choices=["file_access", "recent_access", "user_activity", "security",
+                                 "timeline", "stats"])
+    export.add_argument("--out", dest="path")
+    sub.add_parser("batch", parents=[common, target],
+                   help="run mixed operations; each line names its own op")
+    
+    args = parser.parse_args()
+    if args.command == "batch" and not args.batch:
+        parser.error("batch needs --batch FILE (or '-' for stdin)")
+    if args.report in ('file', 'recent', 'user') and not args.target:
+        parser.error(f"--report {args.report} needs --target")
+    
+    if args.command:
+        # stdout carries only JSON results; logs go to stderr
+        log_config.configure(level=os.environ.get("OS_PROJECT_LOG_LEVEL", "WARNING"),
+                             stream=sys.stderr)
+    else:
+        # Synchronous so log lines stay in order with the menu's own output
+        log_config.configure(use_queue=False)
+    
+    if args.profile:
+        from profiler import profile_session
+        session = profile_session(args.profile, args.profile_out,
+                                  interval=args.sample_interval / 1000,
+                                  stream=sys.stderr if args.command else None)
     else:
-        # Run interactive system
-        system = FileAccessControlSystem()
-        system.run()
+        session = nullcontext()
+    
+    status = 0
+    with session:
+        if args.command:
+            status = run_command(args)
+        elif args.demo:
+            # Run automated demo
+            run_demo()
+        elif args.report:
+            run_report(args.report, args.target, args.ledger, args.page)
+        else:
+            # Run interactive system
+            system = FileAccessControlSystem()
+            # Read file metadata while the menu waits for the first choice
+            system.file_manager.preload_metadata()
+            try:
+                system.run()
+            except (KeyboardInterrupt, EOFError):
+                print("\n✓ Exiting system. Goodbye!")
+            finally:
+                system.close()
+    sys.exit(status)
 
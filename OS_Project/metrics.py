@@ -0,0 +1,313 @@
+"""
+============================================
+OS Project: Metrics & Instrumentation
+Counters, histograms and timers with Prometheus text output
+============================================
+
+Instrumentation is off by default and then costs nothing: no wrapper is
+installed and the hot paths run unchanged. enable() wraps the hot-path
+methods in place (on the classes, so existing objects are covered too);
+disable() puts the original methods back.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# Latency buckets (seconds): 1us .. ~10s, roughly x2.5 apart
+DEFAULT_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by label values"""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, *labelvalues: str):
+        with self._lock:
+            self.values[labelvalues] = self.values.get(labelvalues, 0) + amount
+    
+    def samples(self) -> Dict[Tuple[str, ...], Any]:
+        with self._lock:
+            return dict(self.values)
+    
+    def render(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}"
+                for key, value in self.samples().items()]
+
+
+class Histogram:
+    """Distribution of observed values in fixed buckets"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.series: Dict[Tuple[str, ...], list] = {}  # labels -> [counts, sum, count]
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(labelvalues)
+            if series is None:
+                series = self.series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    @contextmanager
+    def time(self, *labelvalues: str):
+        """Observe the duration of a with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+    
+    def samples(self) -> Dict[Tuple[str, ...], Any]:
+        with self._lock:
+            return {key: {"count": count, "sum": total,
+                          "buckets": dict(zip(self.buckets + (float("inf"),), counts))}
+                    for key, (counts, total, count) in self.series.items()}
+    
+    def render(self) -> List[str]:
+        lines = []
+        for key, sample in self.samples().items():
+            cumulative = 0
+            for bound, count in sample["buckets"].items():
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket"
+                             f"{_labels(self.labelnames + ('le',), key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {sample['sum']}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {sample['count']}")
+        return lines
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    """Prometheus label set, e.g. {op="read"}"""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class MetricsRegistry:
+    """Named metrics with snapshot and Prometheus text export"""
+    
+    def __init__(self):
+        self.metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+    
+    def _get_or_create(self, cls, name: str, description: str,
+                       labelnames: Tuple[str, ...], **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, description, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+            return metric
+    
+    def counter(self, name: str, description: str = "",
+                labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, description, labelnames)
+    
+    def histogram(self, name: str, description: str = "", labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labelnames, buckets=buckets)
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current values: {name: {'type', 'help', 'samples': {labels: value}}}"""
+        with self._lock:
+            metrics = list(self.metrics.values())
+        return {m.name: {"type": m.kind, "help": m.description,
+                         "samples": {",".join(key) or "": value
+                                     for key, value in m.samples().items()}}
+                for m in metrics}
+    
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+    
+    def write_prometheus(self, filename: str = "metrics.prom"):
+        """Write the Prometheus dump atomically (e.g. for node_exporter's textfile collector)"""
+        from file_manager import atomic_write
+        atomic_write(filename, self.render_prometheus(), fsync=False)
+    
+    def serve(self, port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve /metrics over HTTP from a background thread"""
+        registry = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the console
+        
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        from log_config import get_logger
+        get_logger(__name__).info("Metrics served on http://%s:%d/metrics",
+                                  host, self._server.server_address[1])
+        return self._server
+    
+    def stop_serving(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ============================================
+# Hot-Path Instrumentation
+# ============================================
+
+_originals: Dict[Tuple[type, str], Any] = {}
+
+
+def _timed(histogram: Histogram, func, *labelvalues: str):
+    """Wrap func so each call's duration goes into histogram"""
+    perf_counter = time.perf_counter
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(perf_counter() - start, *labelvalues)
+    return wrapper
+
+
+def _wrap(cls: type, method: str, wrapper):
+    if (cls, method) not in _originals:
+        _originals[(cls, method)] = cls.__dict__[method]
+        setattr(cls, method, wrapper)
+
+
+def enable(registry: MetricsRegistry = REGISTRY):
+    """Install timing wrappers on the hot paths"""
+    from blockchain import Block, Blockchain
+    from file_manager import FileManager
+    from access_control import AccessControl
+    
+    if _originals:
+        return
+    
+    hashing = registry.histogram("os_block_hash_seconds", "Block.calculate_hash duration")
+    _wrap(Block, "calculate_hash", _timed(hashing, Block.calculate_hash))
+    
+    ledger = registry.histogram("os_blockchain_seconds", "Blockchain operation duration",
+                                ("op",))
+    for method in ("add_block", "validate_chain", "save_to_file", "load_from_file"):
+        _wrap(Blockchain, method, _timed(ledger, getattr(Blockchain, method), method))
+    
+    metadata = registry.histogram("os_metadata_seconds", "File metadata persistence duration",
+                                  ("op",))
+    for method, op in (("save_metadata", "save"), ("load_metadata", "load")):
+        _wrap(FileManager, method, _timed(metadata, getattr(FileManager, method), op))
+    
+    file_ops = registry.histogram("os_file_operation_seconds", "FileManager operation duration",
+                                  ("op",))
+    for method in ("create_file", "read_file", "write_file", "delete_file",
+                   "create_files", "write_files", "delete_files"):
+        _wrap(FileManager, method, _timed(file_ops, getattr(FileManager, method), method))
+    
+    checks = registry.histogram("os_permission_check_seconds", "check_permission duration")
+    decisions = registry.counter("os_permission_decisions_total", "Access decisions",
+                                 ("action", "result"))
+    original_check = AccessControl.check_permission
+    
+    @functools.wraps(original_check)
+    def check_permission(self, user_id: str, file_id: str, action: str) -> bool:
+        start = time.perf_counter()
+        allowed = original_check(self, user_id, file_id, action)
+        checks.observe(time.perf_counter() - start)
+        decisions.inc(1, action, "allowed" if allowed else "denied")
+        return allowed
+    
+    _wrap(AccessControl, "check_permission", check_permission)
+
+
+def disable():
+    """Remove all wrappers (metric values are kept)"""
+    while _originals:
+        (cls, method), original = _originals.popitem()
+        setattr(cls, method, original)
+
+
+def enabled() -> bool:
+    return bool(_originals)
+
+
+# ============================================
+# Demo
+# ============================================
+
+if __name__ == "__main__":
+    """Demo instrumentation and Prometheus output"""
+    import log_config
+    log_config.configure(level="ERROR", use_queue=False)  # Keep per-operation messages out of the dump
+    from blockchain import Blockchain
+    from file_manager import UserManager, FileManager
+    from access_control import AccessControl
+    
+    print("\n" + "="*70)
+    print("DEMO: Metrics")
+    print("="*70 + "\n")
+    
+    enable()
+    bc = Blockchain()
+    um = UserManager()
+    fm = FileManager(bc, um)
+    fm.access_control = AccessControl(um, fm, bc)
+    for i in range(20):
+        fm.create_file(f"metrics_{i}.txt", "user001", "data", "private")
+        fm.read_file(f"metrics_{i}.txt", "user001")
+        fm.read_file(f"metrics_{i}.txt", "guest001")
+    bc.validate_chain()
+    
+    text = REGISTRY.render_prometheus()
+    print("\n".join(line for line in text.splitlines()
+                    if not line.startswith("os_") or "_bucket" not in line))
+    REGISTRY.write_prometheus("metrics.prom")
+    print("✓ Prometheus dump written to metrics.prom")
+    disable()
@@ -0,0 +1,240 @@
+"""
+============================================
+OS Project: Partitioned Ledgers
+Independent per-tenant / per-file-range chains tied together by root blocks
+============================================
+"""
+
+import hashlib
+import heapq
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from blockchain import Blockchain, Block
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class PartitionedLedger:
+    """
+    Several blockchains behind the Blockchain interface used by FileManager
+    
+    Each block goes to one partition: the tenant returned by tenant_of, or
+    otherwise a stable hash of the file (or user) it concerns. Partitions
+    have their own locks, so appends to different partitions do not wait
+    on each other. A root chain periodically records the latest index and
+    hash of every partition; since each partition block is linked to the
+    one before it, a root block commits to the entire history of all
+    partitions up to that point.
+    """
+    
+    def __init__(self, partitions: int = 8,
+                 tenant_of: Optional[Callable[[Dict[str, Any]], str]] = None):
+        """
+        Initialize partitioned ledger
+        
+        Args:
+            partitions: Number of hash partitions (ignored when tenant_of is given)
+            tenant_of: Maps block data to a tenant name; one chain per tenant
+        """
+        self.tenant_of = tenant_of
+        self.partition_count = partitions
+        self.partitions: Dict[str, Blockchain] = {}
+        if tenant_of is None:
+            for p in range(partitions):
+                self.partitions[f"p{p}"] = Blockchain()
+        self.root = Blockchain()
+        self.callbacks: List[Callable[[Block], None]] = []
+        self._lock = threading.Lock()  # Guards the partition table and root commits
+        self._committer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+    
+    # ============================================
+    # Routing & Appends
+    # ============================================
+    
+    @staticmethod
+    def _routing_key(data: Dict[str, Any]) -> str:
+        """File the block concerns, else its user (batches use their first entry)"""
+        if data.get('action') == 'BATCH' and data.get('transactions'):
+            data = data['transactions'][0]
+        elif data.get('action') == 'THROTTLE_SUMMARY' and data.get('throttled'):
+            data = data['throttled'][0]
+        return str(data.get('file_id') or data.get('user_id') or '')
+    
+    def partition_for(self, data: Dict[str, Any]) -> str:
+        """Name of the partition a block with this data belongs to"""
+        if self.tenant_of is not None:
+            return self.tenant_of(data)
+        # Stable across processes (unlike hash()) so routing survives restarts
+        digest = hashlib.blake2b(self._routing_key(data).encode(), digest_size=8).digest()
+        return f"p{int.from_bytes(digest, 'little') % self.partition_count}"
+    
+    def _partition(self, name: str) -> Blockchain:
+        """Get a partition, creating tenant chains on first use"""
+        chain = self.partitions.get(name)
+        if chain is None:
+            with self._lock:
+                chain = self.partitions.get(name)
+                if chain is None:
+                    chain = Blockchain()
+                    for callback in self.callbacks:
+                        chain.subscribe(callback)
+                    self.partitions[name] = chain
+        return chain
+    
+    def _snapshot(self) -> Dict[str, Blockchain]:
+        """Copy of the partition table (_partition may add to it from another thread)"""
+        with self._lock:
+            return dict(self.partitions)
+    
+    def add_block(self, data: Dict[str, Any]) -> Block:
+        """Append data to its partition (only that partition is locked)"""
+        return self._partition(self.partition_for(data)).add_block(data)
+    
+    def subscribe(self, callback: Callable[[Block], None]) -> Callable[[Block], None]:
+        """Call callback with every new block (in order within each partition)"""
+        with self._lock:
+            self.callbacks.append(callback)
+            for chain in self.partitions.values():
+                chain.subscribe(callback)
+        return callback
+    
+    def unsubscribe(self, callback: Callable[[Block], None]):
+        with self._lock:
+            if callback in self.callbacks:
+                self.callbacks.remove(callback)
+            for chain in self.partitions.values():
+                chain.unsubscribe(callback)
+    
+    # ============================================
+    # Root Commitments
+    # ============================================
+    
+    def tips(self) -> Dict[str, Dict[str, Any]]:
+        """Latest index and hash of every partition"""
+        tips = {}
+        for name, chain in self._snapshot().items():
+            latest = chain.get_latest_block()
+            tips[name] = {"index": latest.index, "hash": latest.hash}
+        return tips
+    
+    def commit_root(self) -> Optional[Block]:
+        """
+        Append a root block committing the current partition tips
+        
+        Returns:
+            The root block, or None if no partition changed since the last one
+        """
+        tips = self.tips()
+        with self._lock:
+            last = self.root.get_latest_block().data
+            if last.get('tips') == tips:
+                return None
+            return self.root.add_block({"action": "ROOT_COMMIT", "tips": tips})
+    
+    def start_root_commits(self, interval: float = 1.0):
+        """Commit a root block every interval seconds in a background thread"""
+        def run():
+            while not self._stop.wait(interval):
+                self.commit_root()
+        
+        self._stop.clear()
+        self._committer = threading.Thread(target=run, daemon=True)
+        self._committer.start()
+    
+    def stop_root_commits(self):
+        """Stop the background committer and commit the final tips"""
+        self._stop.set()
+        if self._committer:
+            self._committer.join()
+            self._committer = None
+        self.commit_root()
+    
+    # ============================================
+    # Blockchain Interface
+    # ============================================
+    
+    def validate_chain(self) -> bool:
+        """
+        Validate every partition, the root chain, and each root commitment
+        
+        Returns:
+            True if all chains are intact and every committed tip still matches
+        """
+        partitions = self._snapshot()
+        for name, chain in partitions.items():
+            if not chain.validate_chain():
+                logger.warning("Partition %s failed validation", name,
+                               extra={"event": "partition_invalid", "partition": name})
+                return False
+        if not self.root.validate_chain():
+            logger.warning("Root chain failed validation", extra={"event": "root_invalid"})
+            return False
+        
+        for root_block in self.root.iter_blocks():
+            for name, tip in root_block.data['tips'].items():
+                # A root commit may name a partition created after the snapshot
+                chain = partitions.get(name) or self.partitions.get(name)
+                block = chain.get_block(tip['index']) if chain else None
+                if block is None or block.hash != tip['hash']:
+                    logger.warning("Root block %d does not match partition %s at block %d",
+                                   root_block.index, name, tip['index'],
+                                   extra={"event": "root_mismatch", "partition": name})
+                    return False
+        return True
+    
+    def iter_blocks(self):
+        """Yield logged blocks of all partitions merged in time order"""
+        return heapq.merge(*(chain.iter_blocks() for chain in self._snapshot().values()),
+                           key=lambda block: block.timestamp)
+    
+    def get_chain_length(self) -> int:
+        """Total blocks across partitions (genesis blocks included)"""
+        return sum(chain.get_chain_length() for chain in self._snapshot().values())
+    
+    def partition_sizes(self) -> Dict[str, int]:
+        """Blocks per partition, to check that routing spreads the load"""
+        return {name: chain.get_chain_length() for name, chain in self._snapshot().items()}
+
+
+# ============================================
+# Demo
+# ============================================
+
+if __name__ == "__main__":
+    """Demo partitioned audit logging"""
+    import log_config
+    log_config.configure(use_queue=False)
+    from file_manager import UserManager, FileManager
+    from access_control import AccessControl
+    from audit_reports import AuditReporter
+    
+    print("\n" + "="*70)
+    print("DEMO: Partitioned Ledgers")
+    print("="*70 + "\n")
+    
+    ledger = PartitionedLedger(partitions=4)
+    um = UserManager()
+    fm = FileManager(ledger, um)
+    fm.access_control = AccessControl(um, fm, ledger)
+    
+    for i in range(8):
+        fm.create_file(f"doc_{i}.txt", "user001", f"document {i}", "private")
+    ledger.commit_root()
+    fm.read_file("doc_3.txt", "guest001")
+    fm.write_file("doc_5.txt", "user001", "updated")
+    ledger.commit_root()
+    
+    print(f"\nPartition sizes: {ledger.partition_sizes()}")
+    print(f"Root blocks: {ledger.root.get_chain_length() - 1}")
+    print(f"All chains valid: {'✓ YES' if ledger.validate_chain() else '✗ NO'}")
+    
+    reporter = AuditReporter(ledger, um)
+    reporter.generate_security_report()
+    
+    print("Tampering with a committed block...")
+    victim = next(chain for chain in ledger.partitions.values() if chain.get_chain_length() > 1)
+    victim.chain[1].data['user_id'] = 'hacker999'
+    victim.chain[1].hash = victim.chain[1].calculate_hash()
+    print(f"All chains valid: {'✓ YES' if ledger.validate_chain() else '✗ NO'}")
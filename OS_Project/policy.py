@@ -0,0 +1,213 @@
+"""
+============================================
+OS Project: Access Control Policy Engine
+Data-driven RBAC: roles, inheritance, groups and per-file ACLs
+============================================
+"""
+
+import json
+from typing import Dict, FrozenSet, Optional, Tuple
+
+ACTIONS = ['CREATE', 'READ', 'WRITE', 'DELETE']
+
+# Permission value <-> set of grants it stands for
+_GRANTS = {
+    True: frozenset(['all']),
+    False: frozenset(),
+    'own': frozenset(['own']),
+    'public': frozenset(['public']),
+    'own_or_public': frozenset(['own', 'public']),
+}
+
+
+def _permission_allows(perm, is_owner: bool, is_public: bool) -> bool:
+    """Evaluate one permission value for a given ownership/visibility"""
+    if perm is True:
+        return True
+    if perm == 'own':
+        return is_owner
+    if perm == 'public':
+        return is_public
+    if perm == 'own_or_public':
+        return is_owner or is_public
+    return False
+
+
+def _merge_permissions(a, b):
+    """Combine two permission values (a role gets everything it inherits)"""
+    grants = _GRANTS[a] | _GRANTS[b]
+    if 'all' in grants:
+        return True
+    if grants == {'own', 'public'}:
+        return 'own_or_public'
+    if grants:
+        return next(iter(grants))
+    return False
+
+
+def compile_permissions(permissions: Dict) -> Dict[Tuple[str, str, bool, bool], bool]:
+    """
+    Flatten a permission matrix into a decision table
+    
+    Args:
+        permissions: Matrix in the PERMISSIONS format
+    
+    Returns:
+        {(role, action, is_owner, is_public): allowed} for every combination
+    """
+    table = {}
+    for role, perms in permissions.items():
+        for action in ACTIONS:
+            perm = perms.get(action, False)
+            for is_owner in (False, True):
+                for is_public in (False, True):
+                    table[(role, action, is_owner, is_public)] = \
+                        _permission_allows(perm, is_owner, is_public)
+    return table
+
+
+class Policy:
+    """
+    Compiled, immutable access policy
+    
+    A Policy is built once and never modified, so AccessControl can swap
+    the whole object in a single assignment while other threads evaluate.
+    """
+    
+    def __init__(self, permissions: Dict[str, Dict],
+                 user_roles: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 user_groups: Optional[Dict[str, FrozenSet[str]]] = None,
+                 acl: Optional[Dict[str, Dict[str, FrozenSet[str]]]] = None):
+        """
+        Initialize policy (use from_permissions / from_dict / load)
+        
+        Args:
+            permissions: Role -> action -> permission value, inheritance resolved
+            user_roles: Extra roles each user gets through group membership
+            user_groups: Groups each user belongs to
+            acl: file_id -> principal ('user_id' or 'group:name') -> actions
+        """
+        self.permissions = permissions
+        self.roles = frozenset(permissions)
+        self.decision_table = compile_permissions(permissions)
+        self.user_roles = user_roles or {}
+        self.user_groups = user_groups or {}
+        self.acl = acl or {}
+    
+    @classmethod
+    def from_permissions(cls, permissions: Dict[str, Dict]) -> "Policy":
+        """Policy equivalent to a plain PERMISSIONS matrix"""
+        return cls({role: dict(perms) for role, perms in permissions.items()})
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Policy":
+        """
+        Compile a policy document
+        
+        Format:
+            {
+              "roles":  {"Auditor": {"inherits": ["Guest"],
+                                     "permissions": {"READ": true}}},
+              "groups": {"finance": {"members": ["user001"], "roles": ["Auditor"]}},
+              "acl":    {"report.txt": {"user001": ["WRITE"], "group:finance": ["READ"]}}
+            }
+        
+        Raises:
+            ValueError: Unknown roles or actions, bad values, inheritance cycles
+        """
+        role_specs = data.get('roles', {})
+        if not role_specs:
+            raise ValueError("Policy defines no roles")
+        
+        resolved: Dict[str, Dict] = {}
+        
+        def resolve(role: str, path: Tuple[str, ...]) -> Dict:
+            if role in resolved:
+                return resolved[role]
+            if role in path:
+                raise ValueError(f"Role inheritance cycle: {' -> '.join(path + (role,))}")
+            if role not in role_specs:
+                raise ValueError(f"Unknown role: {role}")
+            
+            spec = role_specs[role]
+            perms = {action: False for action in ACTIONS}
+            for parent in spec.get('inherits', []):
+                for action, value in resolve(parent, path + (role,)).items():
+                    perms[action] = _merge_permissions(perms[action], value)
+            
+            for action, value in spec.get('permissions', {}).items():
+                if action not in ACTIONS:
+                    raise ValueError(f"Unknown action '{action}' in role {role}")
+                if not isinstance(value, (bool, str)) or value not in _GRANTS:
+                    raise ValueError(f"Invalid permission '{value}' for {role}.{action}")
+                perms[action] = _merge_permissions(perms[action], value)
+            
+            resolved[role] = perms
+            return perms
+        
+        for role in role_specs:
+            resolve(role, ())
+        
+        user_roles: Dict[str, Tuple[str, ...]] = {}
+        user_groups: Dict[str, FrozenSet[str]] = {}
+        for group, spec in data.get('groups', {}).items():
+            for role in spec.get('roles', []):
+                if role not in resolved:
+                    raise ValueError(f"Unknown role '{role}' in group {group}")
+            for member in spec.get('members', []):
+                user_roles[member] = user_roles.get(member, ()) + tuple(spec.get('roles', []))
+                user_groups[member] = user_groups.get(member, frozenset()) | {group}
+        
+        acl: Dict[str, Dict[str, FrozenSet[str]]] = {}
+        for file_id, entries in data.get('acl', {}).items():
+            acl[file_id] = {}
+            for principal, actions in entries.items():
+                for action in actions:
+                    if action not in ACTIONS:
+                        raise ValueError(f"Unknown action '{action}' in ACL for {file_id}")
+                acl[file_id][principal] = frozenset(actions)
+        
+        return cls(resolved, user_roles, user_groups, acl)
+    
+    @classmethod
+    def load(cls, filename: str) -> "Policy":
+        """Compile a policy from a JSON file"""
+        with open(filename, 'r') as f:
+            return cls.from_dict(json.load(f))
+    
+    def roles_for(self, user_id: str, role: str) -> Tuple[str, ...]:
+        """User's own role followed by roles granted through groups"""
+        return (role,) + self.user_roles.get(user_id, ())
+    
+    def evaluate(self, user_id: str, role: str, file_id: str, action: str,
+                 is_owner: bool, is_public: bool) -> bool:
+        """
+        Decide one access
+        
+        Allowed if any of the user's roles allows it, or an ACL entry on the
+        file grants the action to the user or one of their groups.
+        """
+        table = self.decision_table
+        if table.get((role, action, is_owner, is_public), False):
+            return True
+        
+        for extra_role in self.user_roles.get(user_id, ()):
+            if table.get((extra_role, action, is_owner, is_public), False):
+                return True
+        
+        return bool(self.acl) and self.acl_allows(user_id, file_id, action)
+    
+    def acl_allows(self, user_id: str, file_id: str, action: str) -> bool:
+        """Check the file's ACL for the user and their groups"""
+        entries = self.acl.get(file_id)
+        if not entries:
+            return False
+        
+        actions = entries.get(user_id)
+        if actions and action in actions:
+            return True
+        for group in self.user_groups.get(user_id, ()):
+            actions = entries.get('group:' + group)
+            if actions and action in actions:
+                return True
+        return False
@@ -0,0 +1,252 @@
+"""
+============================================
+OS Project: Profiling Hooks
+cProfile and sampling profiler sessions with pstats and flame-graph output
+============================================
+
+Both profilers write the same two files: a pstats file (open it with
+python -m pstats or snakeviz) and a collapsed-stack file, one
+"frame;frame;frame count" line per stack, for flamegraph.pl or speedscope.
+cProfile sees every call but slows the program down several times over;
+the sampler looks at the main thread's stack every few milliseconds, so
+it costs little but only sees where time is actually spent. (In sample
+mode the pstats call counts are sample counts.)
+"""
+
+import cProfile
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Modules whose functions are listed in the hot-function summary
+HOT_MODULES = ("blockchain.py", "file_manager.py", "audit_reports.py")
+
+FuncKey = Tuple[str, int, str]  # (filename, first line, function name), as in pstats
+
+
+def _frame_key(frame) -> FuncKey:
+    code = frame.f_code
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def _label(func: FuncKey) -> str:
+    """Flame-graph frame label, e.g. blockchain.py:add_block"""
+    filename, _, name = func
+    if filename == "~":  # Built-in functions
+        return name.strip("<>")
+    return f"{os.path.basename(filename)}:{name}"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples one thread's stack at a fixed interval
+    
+    Each sample charges the interval to every function on the stack
+    (cumulative time) and to the innermost one (own time).
+    """
+    
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        """
+        Initialize sampling profiler
+        
+        Args:
+            interval: Seconds between samples
+            thread_id: Thread to sample (default: the thread calling start())
+        """
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()  # Tuple of FuncKeys, outermost first -> samples
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+            self.samples += 1
+    
+    def collapsed(self) -> Dict[str, int]:
+        """Samples per stack, keyed by 'outer;...;inner' labels"""
+        folded: Counter = Counter()
+        for stack, count in self.stacks.items():
+            folded[";".join(_label(func) for func in stack)] += count
+        return dict(folded)
+    
+    def stats_dict(self) -> Dict:
+        """Samples converted to the dict layout pstats loads from disk"""
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        edges: Counter = Counter()  # (caller, callee) -> samples
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            # A recursive function is counted once per sample, not once per frame
+            for func in set(stack):
+                cumulative[func] += count
+            for caller, callee in set(zip(stack, stack[1:])):
+                edges[(caller, callee)] += count
+        
+        stats = {}
+        for func in cumulative:
+            stats[func] = [cumulative[func], cumulative[func], own[func] * self.interval,
+                           cumulative[func] * self.interval, {}]
+        for (caller, callee), count in edges.items():
+            stats[callee][4][caller] = (count, count, 0.0, count * self.interval)
+        return {func: tuple(entry) for func, entry in stats.items()}
+
+
+def collapsed_from_pstats(stats: pstats.Stats, max_depth: int = 64) -> Dict[str, int]:
+    """
+    Approximate collapsed stacks (in microseconds) from a cProfile call graph
+    
+    cProfile only records caller -> callee totals, not whole stacks, so a
+    function's time is split between the paths reaching it in proportion
+    to how much of it each caller accounts for.
+    """
+    entries = stats.stats
+    callees: Dict[FuncKey, Dict[FuncKey, float]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]  # Cumulative time via that caller
+    
+    folded: Counter = Counter()
+    
+    def walk(func: FuncKey, weight: float, path: Tuple[str, ...], on_path: frozenset):
+        _, _, own, cumulative, _ = entries[func]
+        if cumulative <= 0 or weight <= 0:
+            return
+        share = min(weight / cumulative, 1.0)
+        path = path + (_label(func),)
+        self_us = int(own * share * 1e6)
+        if self_us:
+            folded[";".join(path)] += self_us
+        if len(path) >= max_depth:
+            return
+        for callee, via in callees.get(func, {}).items():
+            if callee not in on_path and callee in entries:
+                walk(callee, via * share, path, on_path | {callee})
+    
+    roots = [func for func, entry in entries.items() if not entry[4]]
+    for root in roots:
+        walk(root, entries[root][3], (), frozenset((root,)))
+    return dict(folded)
+
+
+def write_collapsed(folded: Dict[str, int], filename: str):
+    with open(filename, 'w') as f:
+        for stack, count in sorted(folded.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def print_hot_functions(stats: pstats.Stats, limit: int = 15, stream=None):
+    """Print the most expensive functions of the core modules, by cumulative time"""
+    pattern = "|".join(name.replace(".", r"\.") for name in HOT_MODULES)
+    stats.stream = stream or sys.stdout
+    print(f"\nHot functions in {', '.join(HOT_MODULES)}:", file=stats.stream)
+    stats.sort_stats("cumulative").print_stats(pattern, limit)
+
+
+@contextmanager
+def profile_session(mode: str = "cprofile", output: str = "profile",
+                    interval: float = 0.005, top: int = 15, stream=None):
+    """
+    Profile the with-block and report on exit
+    
+    Args:
+        mode: 'cprofile' (deterministic) or 'sample' (low overhead)
+        output: Path prefix; writes <output>.pstats and <output>.collapsed
+        interval: Seconds between samples (sample mode only)
+        top: Number of hot functions to print
+        stream: Where to print the summary (default stdout)
+    """
+    if mode not in ("cprofile", "sample"):
+        raise ValueError(f"Unknown profiler: {mode}")
+    
+    profiler = cProfile.Profile() if mode == "cprofile" else SamplingProfiler(interval)
+    if mode == "cprofile":
+        profiler.enable()
+    else:
+        profiler.start()
+    start = time.perf_counter()
+    try:
+        yield profiler
+    finally:
+        elapsed = time.perf_counter() - start
+        if mode == "cprofile":
+            profiler.disable()
+            profiler.dump_stats(f"{output}.pstats")
+            stats = pstats.Stats(f"{output}.pstats")
+            folded = collapsed_from_pstats(stats)
+        else:
+            profiler.stop()
+            with open(f"{output}.pstats", 'wb') as f:
+                marshal.dump(profiler.stats_dict(), f)
+            folded = profiler.collapsed()
+        write_collapsed(folded, f"{output}.collapsed")
+        
+        summary = f"{elapsed:.2f} s profiled with {mode}"
+        if mode == "sample":
+            summary += f" ({profiler.samples:,} samples)"
+        stream = stream or sys.stdout
+        print("\n" + "="*70, file=stream)
+        print(f"PROFILE: {summary}", file=stream)
+        print("="*70, file=stream)
+        if os.path.getsize(f"{output}.pstats") and (mode == "cprofile" or profiler.samples):
+            print_hot_functions(pstats.Stats(f"{output}.pstats"), top, stream)
+        else:
+            print("\nNo samples collected (run longer or lower the interval)", file=stream)
+        print(f"✓ Profile written to {output}.pstats and {output}.collapsed", file=stream)
+
+
+# ============================================
+# Demo
+# ============================================
+
+if __name__ == "__main__":
+    """Demo both profilers on an audit-heavy workload"""
+    import contextlib
+    import io
+    from benchmark import scratch_system
+    from audit_reports import AuditReporter
+    
+    def workload():
+        with scratch_system() as (bc, um, fm, ac):
+            for i in range(300):
+                fm.create_file(f"prof_{i}.txt", "user001", "data", "private")
+                fm.read_file(f"prof_{i}.txt", "guest001")
+            reporter = AuditReporter(bc, um)
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(20):
+                    reporter.generate_security_report()
+                    reporter.generate_summary_statistics()
+            bc.validate_chain()
+    
+    for mode in ("cprofile", "sample"):
+        with profile_session(mode, output=f"profile_demo_{mode}", interval=0.001, top=8):
+            workload()
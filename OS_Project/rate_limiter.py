@@ -0,0 +1,140 @@
+"""
+============================================
+OS Project: Rate Limiting
+Token buckets for repeated denied access attempts
+============================================
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """Tokens refill at a fixed rate up to a burst size"""
+    
+    __slots__ = ('tokens', 'updated')
+    
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """
+    Per-key token buckets with bounded memory
+    
+    Every denied attempt for a key (e.g. (user_id, action)) costs one token.
+    Once a key runs out of tokens it is throttled until tokens refill.
+    Each tracked key costs one bucket; idle keys and, beyond max_keys, the
+    least recently seen keys are evicted (an evicted key starts over with a
+    full bucket).
+    """
+    
+    def __init__(self, rate: float = 1.0, burst: int = 20, max_keys: int = 100000,
+                 idle_seconds: float = 300.0, summary_interval: float = 60.0,
+                 clock=time.monotonic):
+        """
+        Initialize rate limiter
+        
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity (denials allowed back-to-back)
+            max_keys: Most keys tracked at once
+            idle_seconds: Keys not seen for this long are dropped
+            summary_interval: Seconds between throttle summaries
+            clock: Monotonic time source (overridable for tests/demos)
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        self.summary_interval = summary_interval
+        self.clock = clock
+        
+        self.buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self.throttled: Dict[Hashable, int] = {}
+        self.window_start = datetime.now().isoformat()
+        self._last_summary = clock()
+        self._lock = threading.Lock()
+    
+    def _bucket(self, key: Hashable, now: float) -> TokenBucket:
+        """Get the key's bucket, refilled to now (caller holds the lock)"""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.burst, now)
+            self._evict(now)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+            self.buckets.move_to_end(key)
+        return bucket
+    
+    def _evict(self, now: float):
+        """Drop idle keys and keep at most max_keys (caller holds the lock)"""
+        while self.buckets:
+            key, oldest = next(iter(self.buckets.items()))
+            if len(self.buckets) <= self.max_keys and now - oldest.updated < self.idle_seconds:
+                break
+            del self.buckets[key]
+    
+    def consume(self, key: Hashable) -> bool:
+        """
+        Spend one token for key
+        
+        Returns:
+            True if a token was available, False if the key is throttled
+        """
+        with self._lock:
+            bucket = self._bucket(key, self.clock())
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return True
+            return False
+    
+    def is_limited(self, key: Hashable) -> bool:
+        """Whether key is currently out of tokens (does not spend one)"""
+        with self._lock:
+            if key not in self.buckets:
+                return False
+            return self._bucket(key, self.clock()).tokens < 1
+    
+    def record_throttled(self, key: Hashable):
+        """Count a throttled attempt for the next summary"""
+        with self._lock:
+            self.throttled[key] = self.throttled.get(key, 0) + 1
+    
+    def drain_summary(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Take the throttled-attempt counts gathered since the last summary
+        
+        Args:
+            force: Return counts even if summary_interval has not elapsed
+        
+        Returns:
+            {'window_start', 'window_end', 'counts': {key: n}} or None
+        """
+        with self._lock:
+            now = self.clock()
+            if not self.throttled or (not force and now - self._last_summary < self.summary_interval):
+                return None
+            
+            summary = {
+                "window_start": self.window_start,
+                "window_end": datetime.now().isoformat(),
+                "counts": self.throttled
+            }
+            self.throttled = {}
+            self.window_start = summary["window_end"]
+            self._last_summary = now
+            return summary
+    
+    def stats(self) -> Dict[str, int]:
+        """Tracked keys and pending throttled attempts"""
+        with self._lock:
+            return {
+                "tracked_keys": len(self.buckets),
+                "pending_throttled": sum(self.throttled.values())
+            }
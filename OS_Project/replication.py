@@ -0,0 +1,413 @@
+"""
+============================================
+OS Project: Ledger Replication
+Leader/follower streaming of the audit chain over local TCP
+============================================
+
+Protocol (one JSON object per line):
+    
+    follower -> leader   {"type": "HELLO", "from_index": n, "tip_hash": h}
+    leader -> follower   {"type": "START", "from_index": n, "tip": t}
+    leader -> follower   {"type": "SEGMENT", "blocks": [...], "tip": t}
+    leader -> follower   {"type": "TIP", "tip": t}          (heartbeat)
+    follower -> leader   {"type": "ACK", "index": i}
+
+A follower resumes after its last block if that block matches the
+leader's; otherwise it resyncs from block 0. Missing blocks are sent in
+segments of up to segment_size blocks, then new blocks as they arrive.
+"""
+
+import json
+import socket
+import socketserver
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from blockchain import Blockchain, Block
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def send_message(stream, message: Dict[str, Any]):
+    """Write one protocol message"""
+    stream.write((json.dumps(message) + "\n").encode())
+    stream.flush()
+
+
+def read_message(stream) -> Optional[Dict[str, Any]]:
+    """Read one protocol message (None when the peer closed the connection)"""
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+# ============================================
+# Leader
+# ============================================
+
+class _ReplicationHandler(socketserver.StreamRequestHandler):
+    """Serves one follower connection"""
+    
+    def handle(self):
+        leader: "ReplicationLeader" = self.server.leader
+        peer = "%s:%d" % self.client_address
+        
+        hello = read_message(self.rfile)
+        if not hello or hello.get("type") != "HELLO":
+            return
+        from_index = leader.resume_index(hello.get("from_index", 0), hello.get("tip_hash"))
+        subscription = leader.blockchain.subscribe_queue(last_seen=from_index - 1,
+                                                         maxsize=leader.segment_size * 4)
+        leader._connected(peer, from_index - 1, subscription)
+        
+        acks = threading.Thread(target=self._read_acks, args=(leader, peer), daemon=True)
+        acks.start()
+        try:
+            send_message(self.wfile, {"type": "START", "from_index": from_index,
+                                      "tip": leader.tip()})
+            while not leader.stopped:
+                block = subscription.get(timeout=leader.heartbeat)
+                if block is None:
+                    if subscription.closed:
+                        break
+                    send_message(self.wfile, {"type": "TIP", "tip": leader.tip()})
+                    continue
+                
+                # Bulk catch-up: take whatever else is already available
+                blocks = [block.to_dict()]
+                while len(blocks) < leader.segment_size:
+                    block = subscription.get(timeout=0)
+                    if block is None:
+                        break
+                    blocks.append(block.to_dict())
+                send_message(self.wfile, {"type": "SEGMENT", "blocks": blocks,
+                                          "tip": leader.tip()})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            subscription.close()
+            leader._disconnected(peer)
+    
+    def _read_acks(self, leader: "ReplicationLeader", peer: str):
+        """Record the follower's progress as it acknowledges blocks"""
+        try:
+            while True:
+                message = read_message(self.rfile)
+                if message is None:
+                    return
+                if message.get("type") == "ACK":
+                    leader._acked(peer, message["index"])
+        except (OSError, ValueError):
+            return
+
+
+class _ReplicationServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ReplicationLeader:
+    """Streams a blockchain to any number of followers"""
+    
+    def __init__(self, blockchain: Blockchain, host: str = "127.0.0.1", port: int = 0,
+                 segment_size: int = 500, heartbeat: float = 1.0):
+        """
+        Initialize replication leader
+        
+        Args:
+            blockchain: Chain to replicate
+            host: Interface to listen on
+            port: TCP port (0 picks a free port)
+            segment_size: Most blocks sent in one SEGMENT message
+            heartbeat: Seconds between TIP messages when idle
+        """
+        self.blockchain = blockchain
+        self.segment_size = segment_size
+        self.heartbeat = heartbeat
+        self.stopped = False
+        self.followers: Dict[str, int] = {}  # peer -> last acknowledged index
+        self._subscriptions: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        
+        self.server = _ReplicationServer((host, port), _ReplicationHandler)
+        self.server.leader = self
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server.server_address
+    
+    def start(self):
+        """Accept followers in a background thread"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info("Replication leader listening on %s:%d", *self.address,
+                    extra={"event": "leader_started"})
+    
+    def stop(self):
+        """Disconnect followers and stop listening"""
+        self.stopped = True
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+        for subscription in subscriptions:
+            subscription.close()
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def tip(self) -> int:
+        """Index of the leader's latest block"""
+        return len(self.blockchain.chain) - 1
+    
+    def resume_index(self, from_index: int, tip_hash: Optional[str]) -> int:
+        """First index to send: after the follower's tip if it matches ours, else 0"""
+        chain = self.blockchain.chain
+        if 0 < from_index <= len(chain) and chain[from_index - 1].hash == tip_hash:
+            return from_index
+        return 0
+    
+    def _connected(self, peer: str, acked: int, subscription):
+        with self._lock:
+            self.followers[peer] = acked
+            self._subscriptions[peer] = subscription
+    
+    def _disconnected(self, peer: str):
+        with self._lock:
+            self.followers.pop(peer, None)
+            self._subscriptions.pop(peer, None)
+    
+    def _acked(self, peer: str, index: int):
+        with self._lock:
+            if peer in self.followers:
+                self.followers[peer] = index
+    
+    def status(self) -> Dict[str, Dict[str, int]]:
+        """Acknowledged index and lag (in blocks) for each connected follower"""
+        tip = self.tip()
+        with self._lock:
+            return {peer: {"acked": acked, "lag": tip - acked}
+                    for peer, acked in self.followers.items()}
+
+
+# ============================================
+# Follower
+# ============================================
+
+class ReplicationFollower:
+    """Keeps a local blockchain in sync with a leader"""
+    
+    def __init__(self, blockchain: Blockchain, host: str = "127.0.0.1", port: int = 9500,
+                 retry_interval: float = 1.0):
+        """
+        Initialize replication follower
+        
+        Args:
+            blockchain: Local replica (its own genesis is replaced on first sync)
+            host: Leader host
+            port: Leader port
+            retry_interval: Seconds to wait before reconnecting
+        """
+        self.blockchain = blockchain
+        self.host = host
+        self.port = port
+        self.retry_interval = retry_interval
+        self.leader_tip = -1
+        self.connected = False
+        self.error: Optional[str] = None
+        self.stopped = False
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Replicate in a background thread, reconnecting as needed"""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self.stopped = True
+        if self._socket:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread:
+            self._thread.join(timeout=5)
+    
+    def lag(self) -> int:
+        """Blocks the leader has that this replica does not (as last reported)"""
+        return max(0, self.leader_tip - (len(self.blockchain.chain) - 1))
+    
+    def wait_for(self, index: int, timeout: float = 30.0) -> bool:
+        """Wait until the replica holds block index"""
+        deadline = time.monotonic() + timeout
+        while len(self.blockchain.chain) <= index:
+            if self.error or time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+    
+    def run(self):
+        """Connect and apply blocks until stopped or verification fails"""
+        while not self.stopped and not self.error:
+            try:
+                self._session()
+            except (ConnectionError, OSError):
+                pass
+            self.connected = False
+            if not self.stopped and not self.error:
+                time.sleep(self.retry_interval)
+    
+    def _session(self):
+        """One connection: handshake, then apply segments as they arrive"""
+        with socket.create_connection((self.host, self.port)) as sock:
+            self._socket = sock
+            stream = sock.makefile("rwb")
+            chain = self.blockchain.chain
+            send_message(stream, {"type": "HELLO", "from_index": len(chain),
+                                  "tip_hash": chain[-1].hash if chain else None})
+            
+            while not self.stopped:
+                message = read_message(stream)
+                if message is None:
+                    return
+                self.leader_tip = message.get("tip", self.leader_tip)
+                
+                if message["type"] == "START":
+                    self.connected = True
+                    if message["from_index"] < len(self.blockchain.chain):
+                        # A fresh replica only drops its own genesis block
+                        if len(self.blockchain.chain) > 1:
+                            logger.warning("Replica diverged from leader; resyncing from block %d",
+                                           message['from_index'], extra={"event": "resync"})
+                        self.blockchain.truncate(message["from_index"])
+                
+                elif message["type"] == "SEGMENT":
+                    try:
+                        for block_data in message["blocks"]:
+                            self.blockchain.append_block(Block.from_dict(block_data))
+                    except ValueError as e:
+                        self.error = str(e)
+                        logger.error("Replication stopped: %s", e,
+                                     extra={"event": "replication_failed"})
+                        return
+                    send_message(stream, {"type": "ACK",
+                                          "index": len(self.blockchain.chain) - 1})
+
+
+# ============================================
+# Command Line / Multi-Process Demo
+# ============================================
+
+def run_leader(port: int, blocks: int, rate: float):
+    """Serve a chain that grows by `rate` blocks per second"""
+    bc = Blockchain()
+    leader = ReplicationLeader(bc, port=port)
+    leader.start()
+    try:
+        for i in range(blocks):
+            bc.add_block({"action": "READ", "file_id": f"file_{i % 100}.txt",
+                          "user_id": "user001", "status": "SUCCESS"})
+            if rate:
+                time.sleep(1 / rate)
+            if i % 100 == 0:
+                print(f"  tip={leader.tip()} followers={leader.status()}")
+        while True:
+            time.sleep(1)
+            print(f"  tip={leader.tip()} followers={leader.status()}")
+    except KeyboardInterrupt:
+        leader.stop()
+
+
+def run_follower(port: int, until: Optional[int]):
+    """Replicate from a leader; with until, exit once that block arrived"""
+    bc = Blockchain()
+    follower = ReplicationFollower(bc, port=port)
+    follower.start()
+    if until is not None:
+        ok = follower.wait_for(until)
+        follower.stop()
+        print(json.dumps({"ok": ok, "length": len(bc.chain), "tip_hash": bc.chain[-1].hash,
+                          "valid": bc.validate_chain(), "error": follower.error}))
+        return
+    try:
+        while True:
+            time.sleep(1)
+            print(f"  local tip={len(bc.chain) - 1} lag={follower.lag()}")
+    except KeyboardInterrupt:
+        follower.stop()
+
+
+def run_demo(followers: int, blocks: int):
+    """Leader in this process, followers in child processes"""
+    import subprocess
+    import sys
+    
+    print("\n" + "="*70)
+    print("DEMO: Ledger Replication")
+    print("="*70 + "\n")
+    
+    bc = Blockchain()
+    for i in range(blocks // 2):
+        bc.add_block({"action": "CREATE", "file_id": f"file_{i}.txt",
+                      "user_id": "admin001", "status": "SUCCESS"})
+    leader = ReplicationLeader(bc)
+    leader.start()
+    port = leader.address[1]
+    
+    # Followers join with half the chain already written (bulk catch-up) ...
+    processes = [subprocess.Popen([sys.executable, __file__, "follower", "--port", str(port),
+                                   "--until", str(blocks)],
+                                  stdout=subprocess.PIPE, text=True)
+                 for _ in range(followers)]
+    
+    # ... and receive the rest live
+    for i in range(blocks // 2, blocks):
+        bc.add_block({"action": "READ", "file_id": f"file_{i}.txt",
+                      "user_id": "user001", "status": "SUCCESS"})
+    print(f"Leader tip: {leader.tip()}, followers: {leader.status()}")
+    
+    all_ok = True
+    for process in processes:
+        output, _ = process.communicate(timeout=60)
+        result = json.loads(output.strip().splitlines()[-1])
+        match = result["tip_hash"] == bc.chain[-1].hash
+        all_ok &= result["ok"] and result["valid"] and match
+        print(f"{'✓' if result['ok'] and match else '✗'} Follower pid {process.pid}: "
+              f"{result['length']} blocks, valid={result['valid']}, tip matches={match}")
+    leader.stop()
+    return all_ok
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    
+    parser = argparse.ArgumentParser(description="Audit chain replication over local TCP")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    lead = sub.add_parser("leader", help="serve a growing demo chain")
+    lead.add_argument("--port", type=int, default=9500)
+    lead.add_argument("--blocks", type=int, default=1000, help="blocks to append")
+    lead.add_argument("--rate", type=float, default=100.0, help="blocks per second (0 = max)")
+    
+    follow = sub.add_parser("follower", help="replicate from a leader")
+    follow.add_argument("--port", type=int, default=9500)
+    follow.add_argument("--until", type=int, help="exit after receiving this block index")
+    
+    demo = sub.add_parser("demo", help="leader plus follower processes on localhost")
+    demo.add_argument("--followers", type=int, default=3)
+    demo.add_argument("--blocks", type=int, default=10000)
+    
+    args = parser.parse_args()
+    
+    import log_config
+    log_config.configure(stream=sys.stderr, use_queue=False)  # stdout carries follower results
+    
+    if args.command == "leader":
+        run_leader(args.port, args.blocks, args.rate)
+    elif args.command == "follower":
+        run_follower(args.port, args.until)
+    elif args.command == "demo":
+        if not run_demo(args.followers, args.blocks):
+            raise SystemExit(1)
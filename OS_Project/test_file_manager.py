@@ -0,0 +1,116 @@
+"""
+============================================
+OS Project: File Manager Regression Tests
+Run with: python -m unittest test_file_manager
+============================================
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from blockchain import Blockchain
+from file_manager import UserManager, FileManager, atomic_write, migrate_to_sharded, shard_path
+from access_control import AccessControl
+import log_config
+
+
+class CASRestartTest(unittest.TestCase):
+    """State that must survive a restart or a metadata reload"""
+    
+    def setUp(self):
+        log_config.configure(level="ERROR", use_queue=False)
+        self.cwd = os.getcwd()
+        self.workdir = tempfile.mkdtemp(prefix="fm_test_")
+        os.chdir(self.workdir)  # file_metadata.json and users.json live in the cwd
+    
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def start(self) -> FileManager:
+        """A fresh process's FileManager over the same data"""
+        bc = Blockchain()
+        um = UserManager()
+        fm = FileManager(bc, um, storage='cas')
+        fm.access_control = AccessControl(um, fm, bc)
+        return fm
+    
+    def test_duplicate_create_after_restart(self):
+        fm = self.start()
+        self.assertTrue(fm.create_file("existing.txt", "user001", "older data"))
+        
+        fm = self.start()  # Metadata not loaded yet
+        self.assertTrue(fm.create_file("a.txt", "user001", "same content"))
+        self.assertTrue(fm.create_file("b.txt", "user001", "same content"))
+        content_hash = fm.get_file_metadata("b.txt").content_hash
+        self.assertEqual(fm.blob_store.refcounts[content_hash], 2)
+        
+        self.assertTrue(fm.delete_file("a.txt", "user001"))
+        self.assertEqual(fm.read_file("b.txt", "user001"), "same content")
+        self.assertEqual(fm.read_file("existing.txt", "user001"), "older data")
+    
+    def test_reload_invalidates_cached_decisions(self):
+        fm = self.start()
+        self.assertTrue(fm.create_file("notes.txt", "user001", "mine", "private"))
+        self.assertTrue(fm.access_control.check_permission("user001", "notes.txt", "WRITE"))
+        
+        other = self.start()  # Another process hands the file to admin001
+        other.update_file_metadata("notes.txt", owner_id="admin001")
+        
+        fm.load_metadata()
+        self.assertFalse(fm.access_control.check_permission("user001", "notes.txt", "WRITE"))
+
+
+
+class AtomicWriteTest(unittest.TestCase):
+    """atomic_write replaces content without changing who can read it"""
+    
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="fm_test_")
+        self.path = os.path.join(self.workdir, "target.txt")
+    
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def test_keeps_existing_mode(self):
+        with open(self.path, "w") as f:
+            f.write("old")
+        os.chmod(self.path, 0o640)
+        atomic_write(self.path, "new")
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "new")
+    
+    def test_new_file_follows_umask(self):
+        atomic_write(self.path, "new")
+        control = os.path.join(self.workdir, "control.txt")
+        open(control, "w").close()
+        self.assertEqual(os.stat(self.path).st_mode & 0o777,
+                         os.stat(control).st_mode & 0o777)
+
+
+
+class MigrationTest(unittest.TestCase):
+    """migrate_to_sharded copes with flat names that look like shard directories"""
+    
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="fm_test_")
+    
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def test_two_character_names(self):
+        names = [f"{i:02x}" for i in range(256)] + ["report.txt"]
+        for name in names:
+            with open(os.path.join(self.workdir, name), "w") as f:
+                f.write("content of " + name)
+        
+        self.assertEqual(migrate_to_sharded(self.workdir, 2), len(names))
+        for name in names:
+            with open(shard_path(self.workdir, name, 2)) as f:
+                self.assertEqual(f.read(), "content of " + name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,303 @@
+"""
+============================================
+OS Project: Workload Generator & Replay
+Synthetic, reproducible load for capacity planning
+============================================
+"""
+
+import bisect
+import itertools
+import json
+import math
+import random
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from benchmark import scratch_system, summarize, percentile
+
+
+class WorkloadGenerator:
+    """
+    Generates a user/file population and a stream of operations
+    
+    File popularity is Zipfian (a few hot files get most requests), file
+    sizes are log-normal around size_median, and a denial_rate share of
+    operations are writes by users who may not write the file.
+    """
+    
+    def __init__(self, files: int = 1000, users: int = 100, zipf_s: float = 1.1,
+                 role_mix: Optional[Dict[str, float]] = None, read_ratio: float = 0.8,
+                 denial_rate: float = 0.05, public_ratio: float = 0.3,
+                 size_median: int = 4096, size_max: int = 1 << 20, seed: int = 42):
+        """
+        Initialize workload generator
+        
+        Args:
+            files: Number of files in the population
+            users: Number of users
+            zipf_s: Zipf exponent for file popularity (higher = more skewed)
+            role_mix: Share of users per role (default 5% Admin, 75% User, 20% Guest)
+            read_ratio: Share of allowed operations that are reads
+            denial_rate: Share of operations that should be denied
+            public_ratio: Share of files that are public
+            size_median: Median file size in bytes
+            size_max: Largest file size in bytes
+            seed: Random seed (same seed, same workload)
+        """
+        self.files = files
+        self.users = users
+        self.zipf_s = zipf_s
+        self.role_mix = role_mix or {'Admin': 0.05, 'User': 0.75, 'Guest': 0.2}
+        self.read_ratio = read_ratio
+        self.denial_rate = denial_rate
+        self.public_ratio = public_ratio
+        self.size_median = size_median
+        self.size_max = size_max
+        self.seed = seed
+        self.rng = random.Random(seed)
+        
+        # Cumulative Zipf weights: file rank k is requested with weight 1/k^s
+        self._zipf_cum = list(itertools.accumulate(1 / (k ** zipf_s)
+                                                   for k in range(1, files + 1)))
+    
+    def config(self) -> Dict[str, Any]:
+        """Parameters the workload was generated with"""
+        return {
+            "files": self.files, "users": self.users, "zipf_s": self.zipf_s,
+            "role_mix": self.role_mix, "read_ratio": self.read_ratio,
+            "denial_rate": self.denial_rate, "public_ratio": self.public_ratio,
+            "size_median": self.size_median, "size_max": self.size_max, "seed": self.seed
+        }
+    
+    def file_size(self) -> int:
+        """Log-normal file size around size_median"""
+        size = int(self.rng.lognormvariate(math.log(self.size_median), 1.0))
+        return max(1, min(size, self.size_max))
+    
+    def population(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Users with roles and files with owners, visibility and sizes"""
+        roles = list(self.role_mix)
+        weights = [self.role_mix[role] for role in roles]
+        users = [{"user_id": f"wl_user_{u}", "role": self.rng.choices(roles, weights)[0]}
+                 for u in range(self.users)]
+        
+        # Files are owned by users who are allowed to create them
+        owners = [u["user_id"] for u in users if u["role"] in ('Admin', 'User')] or ['admin001']
+        files = [{"file_id": f"wl_file_{f}.dat",
+                  "owner_id": self.rng.choice(owners),
+                  "permissions": 'public' if self.rng.random() < self.public_ratio else 'private',
+                  "size": self.file_size()}
+                 for f in range(self.files)]
+        return {"users": users, "files": files}
+    
+    def operations(self, population: Dict[str, List[Dict]], count: int) -> Iterable[Dict[str, Any]]:
+        """
+        Yield count operations against the population
+        
+        Allowed operations: owners and admins read/write any file; anyone
+        reads public files. Denied operations: writes by non-admins who do
+        not own the file.
+        """
+        users = population["users"]
+        files = population["files"]
+        admins = [u["user_id"] for u in users if u["role"] == 'Admin']
+        non_admins = [u["user_id"] for u in users if u["role"] != 'Admin']
+        everyone = [u["user_id"] for u in users]
+        
+        for _ in range(count):
+            rank = bisect.bisect_left(self._zipf_cum, self.rng.random() * self._zipf_cum[-1])
+            target = files[min(rank, len(files) - 1)]
+            file_id, owner = target["file_id"], target["owner_id"]
+            
+            if self.rng.random() < self.denial_rate:
+                intruders = [u for u in non_admins if u != owner]
+                if intruders:
+                    yield {"op": "write", "user_id": self.rng.choice(intruders),
+                           "file_id": file_id, "size": self.file_size(), "expect": "DENIED"}
+                    continue
+            
+            if self.rng.random() < self.read_ratio:
+                if target["permissions"] == 'public':
+                    user_id = self.rng.choice(everyone)
+                else:
+                    user_id = self.rng.choice(admins + [owner])
+                yield {"op": "read", "user_id": user_id, "file_id": file_id,
+                       "expect": "SUCCESS"}
+            else:
+                user_id = self.rng.choice(admins + [owner])
+                yield {"op": "write", "user_id": user_id, "file_id": file_id,
+                       "size": self.file_size(), "expect": "SUCCESS"}
+
+
+# ============================================
+# Traces
+# ============================================
+
+def save_trace(filename: str, config: Dict, population: Dict, operations: Iterable[Dict]) -> int:
+    """
+    Write a replayable trace (JSON lines: header, then one operation per line)
+    
+    Returns:
+        Number of operations written
+    """
+    count = 0
+    with open(filename, 'w') as f:
+        f.write(json.dumps({"config": config, "population": population}) + "\n")
+        for op in operations:
+            f.write(json.dumps(op) + "\n")
+            count += 1
+    return count
+
+
+def load_trace(filename: str):
+    """
+    Read a trace written by save_trace
+    
+    Returns:
+        (header, iterator over operations)
+    """
+    f = open(filename, 'r')
+    header = json.loads(f.readline())
+    
+    def operations():
+        with f:
+            for line in f:
+                yield json.loads(line)
+    
+    return header, operations()
+
+
+# ============================================
+# Replay
+# ============================================
+
+def replay(population: Dict, operations: Iterable[Dict], fsync_writes: bool = False) -> Dict:
+    """
+    Run operations against a fresh system and measure them
+    
+    Args:
+        population: Users and files to set up first (not measured)
+        operations: Operations to execute in order
+        fsync_writes: fsync every file write (slower, durable)
+    
+    Returns:
+        Throughput, per-operation latency, outcome counts and ledger growth
+    """
+    with scratch_system(fsync_writes=fsync_writes) as (bc, um, fm, ac):
+        for user in population["users"]:
+            um.register_user(user["user_id"], user["user_id"], user["role"])
+        
+        groups: Dict[tuple, Dict[str, str]] = {}
+        for spec in population["files"]:
+            groups.setdefault((spec["owner_id"], spec["permissions"]), {})[spec["file_id"]] = \
+                "x" * spec["size"]
+        for (owner_id, permissions), contents in groups.items():
+            fm.create_files(contents, owner_id, permissions)
+        
+        # Ledger growth measured from here on, via the block feed
+        growth = {"blocks": 0, "bytes": 0}
+        
+        def count_block(block):
+            growth["blocks"] += 1
+            growth["bytes"] += len(json.dumps(block.to_dict()))
+        
+        bc.subscribe(count_block)
+        
+        latencies: Dict[str, List[float]] = {"read": [], "write": []}
+        outcomes = {"SUCCESS": 0, "DENIED": 0, "UNEXPECTED": 0}
+        start = time.perf_counter()
+        for op in operations:
+            t0 = time.perf_counter()
+            if op["op"] == "read":
+                ok = fm.read_file(op["file_id"], op["user_id"]) is not None
+            else:
+                ok = fm.write_file(op["file_id"], op["user_id"], "y" * op["size"])
+            latencies[op["op"]].append(time.perf_counter() - t0)
+            
+            status = "SUCCESS" if ok else "DENIED"
+            outcomes[status] += 1
+            if status != op.get("expect", status):
+                outcomes["UNEXPECTED"] += 1
+        elapsed = time.perf_counter() - start
+        bc.unsubscribe(count_block)
+    
+    everything = latencies["read"] + latencies["write"]
+    total = len(everything)
+    return {
+        "operations": total,
+        "seconds": elapsed,
+        "ops_per_second": total / elapsed if elapsed else 0.0,
+        "latency": dict(summarize(everything), p999_us=percentile(everything, 99.9) * 1e6),
+        "by_op": {op: summarize(samples) for op, samples in latencies.items() if samples},
+        "outcomes": outcomes,
+        "ledger_blocks": growth["blocks"],
+        "ledger_bytes": growth["bytes"],
+        "ledger_bytes_per_op": growth["bytes"] / total if total else 0.0
+    }
+
+
+def print_report(result: Dict):
+    """Print replay results"""
+    latency = result["latency"]
+    print(f"\nReplayed {result['operations']:,} operations in {result['seconds']:.2f} s")
+    print(f"  Throughput:          {result['ops_per_second']:,.0f} ops/s")
+    print(f"  Latency p50/p99/p999: {latency['p50_us']:.0f} / {latency['p99_us']:.0f} / "
+          f"{latency['p999_us']:.0f} us")
+    for op, stats in result["by_op"].items():
+        print(f"    {op:<6} mean {stats['mean_us']:.0f} us, p99 {stats['p99_us']:.0f} us "
+              f"({stats['count']:,} ops)")
+    outcomes = result["outcomes"]
+    print(f"  Outcomes:            {outcomes['SUCCESS']:,} allowed, {outcomes['DENIED']:,} denied, "
+          f"{outcomes['UNEXPECTED']:,} unexpected")
+    print(f"  Ledger growth:       {result['ledger_blocks']:,} blocks, "
+          f"{result['ledger_bytes'] / 1e6:.2f} MB ({result['ledger_bytes_per_op']:.0f} B/op)")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Synthetic workload generator and replay")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    def add_generator_options(p):
+        p.add_argument("--ops", type=int, default=100000, help="operations to generate")
+        p.add_argument("--files", type=int, default=1000)
+        p.add_argument("--users", type=int, default=100)
+        p.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent")
+        p.add_argument("--roles", default="Admin=0.05,User=0.75,Guest=0.2",
+                       help="role mix, e.g. Admin=0.1,User=0.9")
+        p.add_argument("--read-ratio", type=float, default=0.8)
+        p.add_argument("--denial-rate", type=float, default=0.05)
+        p.add_argument("--size-median", type=int, default=4096, help="median file size (bytes)")
+        p.add_argument("--seed", type=int, default=42)
+    
+    gen = sub.add_parser("generate", help="write a trace file")
+    add_generator_options(gen)
+    gen.add_argument("--out", default="workload_trace.jsonl")
+    
+    run = sub.add_parser("run", help="generate and replay without saving a trace")
+    add_generator_options(run)
+    run.add_argument("--fsync", action="store_true", help="fsync every write")
+    
+    rep = sub.add_parser("replay", help="replay a trace file")
+    rep.add_argument("trace")
+    rep.add_argument("--fsync", action="store_true", help="fsync every write")
+    
+    args = parser.parse_args()
+    
+    if args.command in ("generate", "run"):
+        role_mix = {role: float(share) for role, share in
+                    (item.split("=") for item in args.roles.split(","))}
+        generator = WorkloadGenerator(files=args.files, users=args.users, zipf_s=args.zipf,
+                                      role_mix=role_mix, read_ratio=args.read_ratio,
+                                      denial_rate=args.denial_rate,
+                                      size_median=args.size_median, seed=args.seed)
+        population = generator.population()
+        operations = generator.operations(population, args.ops)
+        if args.command == "generate":
+            count = save_trace(args.out, generator.config(), population, operations)
+            print(f"✓ Trace with {count:,} operations written to {args.out}")
+        else:
+            print_report(replay(population, operations, args.fsync))
+    elif args.command == "replay":
+        header, operations = load_trace(args.trace)
+        print_report(replay(header["population"], operations, args.fsync))